@@ -0,0 +1,167 @@
+"""End-to-end benchmark of the MediGuard analysis pipeline.
+
+Times each stage of ``/api/analyze`` in isolation and the whole request
+through ``TestClient``, entirely offline (Gemini stub, in-memory SQLite,
+scratch directory for the chain).
+
+    python benchmarks/bench_pipeline.py --output bench.json
+    python benchmarks/bench_pipeline.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json --tolerance 0.25
+
+With ``--baseline`` the exit code is 1 if any stage's p50 regressed by more
+than the tolerance, so the run can gate a deploy.
+"""
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+import datetime
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import setup_offline_env, summarize, time_calls, compare_to_baseline, write_json, read_json
+
+SAMPLE_REPORTS = [
+    "Patient is a 45 year old male. BP 130/85. Fasting glucose 140 mg/dL, HbA1c 7.1%, BMI 31.",
+    "CBC: Hemoglobin 9.8 g/dL, RBC 3.9, WBC 7.2, Platelets 98000, Hematocrit 31, MCV 70, MCH 22, MCHC 30.",
+    "Lipid panel - Total cholesterol 240 mg/dL, LDL 160 mg/dL, HDL 38 mg/dL, Triglycerides 210 mg/dL.",
+    "62 year old female. ALT 56, AST 48, Creatinine 1.4, Troponin 0.02, CRP 12. Blood sugar 98.",
+]
+
+
+def run(iterations: int) -> dict:
+    from fastapi.testclient import TestClient
+    from sqlmodel import SQLModel, Session, create_engine
+    from sqlmodel.pool import StaticPool
+
+    import main
+    from intake_extraction_agent import regex_extract_all
+    from models import PatientReport
+
+    # Per-request INFO logging would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+
+    def get_bench_session():
+        with Session(engine) as session:
+            yield session
+
+    main.app.dependency_overrides[main.get_session] = get_bench_session
+    main.commit_queue.engine = engine
+    main.chain_index.engine = engine
+    client = TestClient(main.app)
+
+    # Measure real inference, not cache hits
+    main.prediction_cache.capacity = 0
+    loaded_model = main.model_manager.current()
+
+    # Fixed intermediate values per stage, computed once from the first sample
+    text = SAMPLE_REPORTS[0]
+    extraction = main.intake_agent.extract_from_text(text)
+    unified = main.intake_agent.unify_features(extraction)
+    mapped = main.map_intake_features(unified["features"])
+    clean = main.quality_agent.validate(mapped)["clean_features"]
+    scaled = main.scaling_bridge.scale_features(clean)["scaled_features"]
+    input_df = main.build_input_frame(scaled)
+    logits = loaded_model.model.predict(input_df, prediction_type="RawFormulaVal")[0]
+    predicted_idx = int(logits.argmax())
+    log_entry = {
+        "type": "ANALYSIS_RESULT",
+        "timestamp": datetime.datetime.now().isoformat(),
+        "health_score": 70,
+        "triage": "Yellow",
+        "features_hash": hashlib.md5(json.dumps(clean, sort_keys=True).encode()).hexdigest()
+    }
+
+    def db_insert():
+        with Session(engine) as session:
+            session.add(PatientReport(
+                health_score=70,
+                triage_category="Yellow",
+                features_json=json.dumps(clean),
+                predictions_json="{}",
+            ))
+            session.commit()
+
+    sample_cycle = {"i": 0}
+
+    def analyze_request():
+        body = SAMPLE_REPORTS[sample_cycle["i"] % len(SAMPLE_REPORTS)]
+        sample_cycle["i"] += 1
+        response = client.post("/api/analyze", data={"text": body, "mode": "text"})
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/analyze returned {response.status_code}: {response.text}")
+
+    stages = {
+        "regex_extract_all": lambda: regex_extract_all(text),
+        "extract_from_text": lambda: main.intake_agent.extract_from_text(text),
+        "unify_features": lambda: main.intake_agent.unify_features(extraction),
+        "data_quality_validate": lambda: main.quality_agent.validate(mapped),
+        "scale_features": lambda: main.scaling_bridge.scale_features(clean),
+        "build_input_frame": lambda: main.build_input_frame(scaled),
+        "catboost_predict": lambda: loaded_model.model.predict(input_df, prediction_type="RawFormulaVal"),
+        "explain_prediction": lambda: main.predictive_agent.explain_prediction(
+            loaded_model.model, input_df, predicted_idx, explainer=loaded_model.explainer
+        ),
+        "blockchain_append": lambda: main.blockchain_manager.append_block(log_entry),
+        "db_insert": db_insert,
+        "api_analyze": analyze_request,
+    }
+
+    results = {}
+    for name, fn in stages.items():
+        results[name] = summarize(time_calls(fn, iterations))
+        print(f"{name:24s} p50={results[name]['p50_ms']:9.3f}ms  p95={results[name]['p95_ms']:9.3f}ms")
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "iterations": iterations,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "model_version": loaded_model.version,
+        },
+        "stages": results,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Offline MediGuard pipeline benchmark")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--baseline", help="Compare against a saved results JSON")
+    parser.add_argument("--save-baseline", help="Write results JSON as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed p50 slowdown vs baseline before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    # Resolve paths before the benchmark switches to its scratch directory
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    save_baseline = os.path.abspath(args.save_baseline) if args.save_baseline else None
+
+    setup_offline_env()
+    results = run(args.iterations)
+
+    if output:
+        write_json(output, results)
+    if save_baseline:
+        write_json(save_baseline, results)
+
+    if baseline:
+        regressions = compare_to_baseline(results, read_json(baseline), args.tolerance)
+        if regressions:
+            print("\nPerformance regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
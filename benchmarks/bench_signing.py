@@ -0,0 +1,81 @@
+"""Sign / verify throughput per signing algorithm.
+
+Measures raw signature operations on a block-hash-sized payload and a full
+``validate_chain`` over a generated chain for each backend in ``signing``.
+
+    python benchmarks/bench_signing.py --iterations 200 --chain-blocks 500
+"""
+import os
+import sys
+import hashlib
+import argparse
+import datetime
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import setup_offline_env, summarize, time_calls, write_json
+
+
+def run(iterations: int, chain_blocks: int) -> dict:
+    from signing import SIGNER_CLASSES
+    from blockchain_manager import BlockchainManager
+
+    payload = hashlib.sha256(b"mediguard block").hexdigest().encode()
+    results = {}
+    for algorithm, cls in SIGNER_CLASSES.items():
+        signer = cls.generate()
+        signature = signer.sign(payload)
+
+        sign = summarize(time_calls(lambda: signer.sign(payload), iterations))
+        verify = summarize(time_calls(lambda: signer.verify(payload, signature), iterations))
+        entry = {
+            "sign": sign,
+            "verify": verify,
+            "sign_per_s": round(1000.0 / sign["mean_ms"], 1) if sign["mean_ms"] else None,
+            "verify_per_s": round(1000.0 / verify["mean_ms"], 1) if verify["mean_ms"] else None,
+        }
+
+        if chain_blocks:
+            manager = BlockchainManager(f"chain-{cls.__name__}.json", signing_algorithm=algorithm)
+            for i in range(chain_blocks):
+                manager.append_block({"type": "BENCH", "n": i})
+            entry["validate_chain"] = summarize(time_calls(manager.validate_chain, 3, warmup=1))
+            entry["validate_chain"]["blocks"] = chain_blocks
+
+        results[algorithm] = entry
+        line = (f"{algorithm:16s} sign p50={sign['p50_ms']:8.3f}ms ({entry['sign_per_s']}/s)  "
+                f"verify p50={verify['p50_ms']:8.3f}ms ({entry['verify_per_s']}/s)")
+        if chain_blocks:
+            line += f"  validate {chain_blocks} blocks p50={entry['validate_chain']['p50_ms']:.1f}ms"
+        print(line)
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "iterations": iterations,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "algorithms": results,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Signing backend benchmark")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--chain-blocks", type=int, default=200,
+                        help="Blocks to generate for the validate_chain timing (0 to skip)")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    # Keys and chains are generated in the scratch directory
+    setup_offline_env()
+    results = run(args.iterations, args.chain_blocks)
+    if output:
+        write_json(output, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,96 @@
+"""Shared helpers for the offline benchmarks.
+
+Every benchmark runs against the real server modules with Gemini stubbed out,
+SQLite instead of Postgres, and a throwaway working directory for the chain
+and key files, so nothing touches the network or the repo checkout.
+"""
+import os
+import sys
+import json
+import math
+import time
+import tempfile
+import statistics
+from typing import Callable, Dict, List, Any
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+
+
+def setup_offline_env(workdir: str = None) -> str:
+    """Point the server modules at stubs and a scratch directory. Call before importing them."""
+    os.environ["GEMINI_STUB"] = "1"
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("MODEL_DIR", os.path.abspath(SERVER_DIR))
+    os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+    os.environ.pop("GEMINI_API_KEY", None)
+
+    workdir = workdir or tempfile.mkdtemp(prefix="mediguard-bench-")
+    os.chdir(workdir)
+    if SERVER_DIR not in sys.path:
+        sys.path.insert(0, os.path.abspath(SERVER_DIR))
+    return workdir
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples_s: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    ms = [s * 1000.0 for s in samples_s]
+    return {
+        "iterations": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+        "min_ms": round(min(ms), 4) if ms else 0.0,
+    }
+
+
+def time_calls(fn: Callable[[], Any], iterations: int, warmup: int = 3) -> List[float]:
+    """Run ``fn`` repeatedly and return per-call wall times in seconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+                        metric: str = "p50_ms", min_delta_ms: float = 0.05) -> List[str]:
+    """
+    Return a message for every stage slower than baseline by more than ``tolerance``.
+
+    Differences below ``min_delta_ms`` are ignored so microsecond-scale stages
+    don't fail the run on timer noise.
+    """
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous or not previous.get(metric):
+            continue
+        ratio = current[metric] / previous[metric]
+        if ratio > 1.0 + tolerance and current[metric] - previous[metric] >= min_delta_ms:
+            regressions.append(
+                f"{stage}: {metric} {current[metric]:.3f}ms vs baseline {previous[metric]:.3f}ms (x{ratio:.2f})"
+            )
+    return regressions
+
+
+def write_json(path: str, payload: Dict[str, Any]):
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def read_json(path: str) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        return json.load(f)
@@ -0,0 +1,269 @@
+"""Offline load generator for the MediGuard API.
+
+Drives a local server with synthetic lab reports (see ``synthetic_corpus``)
+from an async HTTP client at a fixed concurrency and reports throughput,
+latency percentiles and error rates per endpoint.
+
+    # Start a throwaway server (Gemini stub, SQLite, scratch dir) and load it
+    python benchmarks/loadgen.py --spawn --concurrency 16 --requests 500
+
+    # Against a server you started yourself
+    python benchmarks/loadgen.py --base-url http://127.0.0.1:8000 --duration 60
+
+``--mix`` sets the relative weight of each operation, e.g.
+``--mix analyze=8,report=1,verify=1``. ``report`` fetches a report created
+earlier in the run, so it needs some ``analyze`` traffic.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import datetime
+import platform
+import subprocess
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import SERVER_DIR, summarize, write_json
+from synthetic_corpus import generate_report
+
+DEFAULT_MIX = "analyze=8,report=1,verify=1"
+OPERATIONS = ("analyze", "report", "verify", "model", "stats")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' (choose from {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class EndpointStats:
+    """Latencies and error counts for one operation."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+
+    def record(self, seconds: float, error: Optional[str]):
+        self.latencies.append(seconds)
+        if error:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        total = len(self.latencies)
+        failed = sum(self.errors.values())
+        result = summarize(self.latencies)
+        result.update({
+            "requests": total,
+            "errors": failed,
+            "error_rate": round(failed / total, 4) if total else 0.0,
+            "error_breakdown": self.errors,
+        })
+        return result
+
+
+class LoadGenerator:
+    def __init__(self, base_url: str, concurrency: int, mix: Dict[str, float], seed: int,
+                 pdf_fraction: float, abnormal_rate: float, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.rng = random.Random(seed)
+        self.pdf_fraction = pdf_fraction
+        self.abnormal_rate = abnormal_rate
+        self.timeout = timeout
+        self.report_ids: List[int] = []
+        self.stats: Dict[str, EndpointStats] = {name: EndpointStats() for name in self.operations}
+
+    async def _analyze(self, client: httpx.AsyncClient) -> httpx.Response:
+        report = generate_report(self.rng, self.pdf_fraction, self.abnormal_rate)
+        if report.kind == "pdf":
+            response = await client.post(
+                "/api/analyze",
+                data={"mode": "pdf"},
+                files={"file": ("synthetic_report.pdf", report.pdf_bytes, "application/pdf")},
+            )
+        else:
+            response = await client.post("/api/analyze", data={"mode": "text", "text": report.text})
+        if response.status_code == 200:
+            report_id = response.json().get("report_id")
+            if report_id is not None:
+                self.report_ids.append(report_id)
+        return response
+
+    async def _report(self, client: httpx.AsyncClient) -> Optional[httpx.Response]:
+        if not self.report_ids:
+            return None
+        return await client.get(f"/api/reports/{self.rng.choice(self.report_ids)}")
+
+    async def _call(self, client: httpx.AsyncClient, operation: str) -> Optional[httpx.Response]:
+        if operation == "analyze":
+            return await self._analyze(client)
+        if operation == "report":
+            return await self._report(client)
+        if operation == "verify":
+            return await client.get("/api/blockchain/verify")
+        if operation == "model":
+            return await client.get("/api/model")
+        return await client.get("/api/reports/stats")
+
+    async def _worker(self, client: httpx.AsyncClient, budget: Dict[str, Any]):
+        while True:
+            if budget["remaining"] is not None:
+                if budget["remaining"] <= 0:
+                    return
+                budget["remaining"] -= 1
+            if budget["deadline"] is not None and time.perf_counter() >= budget["deadline"]:
+                return
+
+            operation = self.rng.choices(self.operations, self.weights)[0]
+            started = time.perf_counter()
+            error = None
+            try:
+                response = await self._call(client, operation)
+                if response is None:
+                    # Nothing to fetch yet; fall back to creating a report
+                    operation = "analyze"
+                    response = await self._analyze(client)
+                if response.status_code >= 400:
+                    error = f"HTTP {response.status_code}"
+            except httpx.TimeoutException:
+                error = "timeout"
+            except httpx.HTTPError as e:
+                error = type(e).__name__
+            self.stats.setdefault(operation, EndpointStats()).record(time.perf_counter() - started, error)
+
+    async def run(self, requests: Optional[int], duration: Optional[float]) -> Dict[str, Any]:
+        budget = {
+            "remaining": requests,
+            "deadline": time.perf_counter() + duration if duration else None,
+        }
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(self._worker(client, budget) for _ in range(self.concurrency)))
+            elapsed = time.perf_counter() - started
+
+        endpoints = {name: s.summary() for name, s in self.stats.items() if s.latencies}
+        total = sum(e["requests"] for e in endpoints.values())
+        errors = sum(e["errors"] for e in endpoints.values())
+        return {
+            "meta": {
+                "timestamp": datetime.datetime.now().isoformat(),
+                "base_url": self.base_url,
+                "concurrency": self.concurrency,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "total": {
+                "requests": total,
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "elapsed_s": round(elapsed, 3),
+                "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            },
+            "endpoints": endpoints,
+        }
+
+
+def spawn_server(port: int, workers: int, workdir: str) -> subprocess.Popen:
+    """Start uvicorn with the Gemini stub and a SQLite file in ``workdir``."""
+    env = dict(os.environ)
+    env.pop("GEMINI_API_KEY", None)
+    env.update({
+        "GEMINI_STUB": "1",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'loadgen.db')}",
+        "MODEL_DIR": os.path.abspath(SERVER_DIR),
+        "MODEL_WATCH_INTERVAL": "0",
+    })
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--app-dir", os.path.abspath(SERVER_DIR),
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=workdir, env=env)
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} not ready after {timeout:.0f}s")
+
+
+def print_report(results: Dict[str, Any]):
+    total = results["total"]
+    print(f"\n{total['requests']} requests in {total['elapsed_s']}s "
+          f"({total['throughput_rps']} req/s), error rate {total['error_rate']:.2%}\n")
+    print(f"{'endpoint':10s} {'count':>6s} {'err%':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for name, e in results["endpoints"].items():
+        print(f"{name:10s} {e['requests']:6d} {e['error_rate']:7.2%} "
+              f"{e['p50_ms']:9.1f} {e['p95_ms']:9.1f} {e['p99_ms']:9.1f}")
+        for error, count in e["error_breakdown"].items():
+            print(f"{'':10s}   {error}: {count}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Offline load generator for the MediGuard API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="Start a local offline server for the run")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --spawn")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --spawn")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, help="Total requests (default 200 unless --duration)")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--pdf-fraction", type=float, default=0.2)
+    parser.add_argument("--abnormal-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    requests = args.requests if args.requests or args.duration else 200
+    generator = LoadGenerator(
+        args.base_url, args.concurrency, parse_mix(args.mix), args.seed,
+        args.pdf_fraction, args.abnormal_rate, args.timeout,
+    )
+
+    process = None
+    if args.spawn:
+        workdir = tempfile.mkdtemp(prefix="mediguard-loadgen-")
+        generator.base_url = f"http://127.0.0.1:{args.port}"
+        process = spawn_server(args.port, args.workers, workdir)
+    try:
+        if process is not None:
+            wait_until_ready(generator.base_url, process)
+        results = asyncio.run(generator.run(requests, args.duration))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print_report(results)
+    if args.output:
+        write_json(args.output, results)
+    return 1 if results["total"]["requests"] == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,275 @@
+"""Synthetic patient lab reports for load testing.
+
+Generates reports covering every feature the intake agent extracts and the
+model scores (``CANONICAL_FEATURES`` in both agents), grouped into the panels
+a lab would actually order (CBC, lipids, metabolic, liver, cardiac), with a
+configurable share of out-of-range and physiologically implausible values so
+the data quality agent's correction path gets exercised too.
+
+Each report is either free text in one of several phrasings or a PDF with a
+results table. The PDFs are written by hand (no reportlab dependency): one
+page, Helvetica text and stroked cell borders, which is enough for
+pdfplumber's line-based table extraction.
+
+    python benchmarks/synthetic_corpus.py --count 5 --seed 1
+"""
+import os
+import random
+import argparse
+from typing import Dict, Any, List, Optional, Tuple
+
+# key: (labels, unit, normal range, abnormal range, decimals)
+ANALYTES: Dict[str, Tuple[List[str], str, Tuple[float, float], Tuple[float, float], int]] = {
+    "bmi": (["BMI", "Body mass index (BMI)"], "kg/m2", (18.5, 24.9), (12.0, 55.0), 1),
+    "glucose": (["Glucose", "Fasting glucose", "Blood sugar", "FBS"], "mg/dL", (70, 99), (40, 450), 0),
+    "cholesterol_total": (["Total cholesterol"], "mg/dL", (125, 199), (200, 400), 0),
+    "ldl_cholesterol": (["LDL", "LDL cholesterol"], "mg/dL", (50, 129), (130, 260), 0),
+    "hdl_cholesterol": (["HDL", "HDL cholesterol"], "mg/dL", (40, 80), (15, 39), 0),
+    "triglycerides": (["Triglycerides", "TG"], "mg/dL", (50, 149), (150, 900), 0),
+    "hemoglobin": (["Hemoglobin", "Hb"], "g/dL", (12.0, 17.0), (5.0, 11.5), 1),
+    "platelets": (["Platelets", "Platelet count"], "/uL", (150000, 400000), (20000, 140000), 0),
+    "white_blood_cells": (["WBC", "White blood cells"], "x10^9/L", (4.0, 11.0), (1.0, 30.0), 1),
+    "red_blood_cells": (["RBC", "Red blood cells"], "x10^12/L", (4.2, 5.9), (2.5, 4.0), 2),
+    "hematocrit": (["Hematocrit", "HCT"], "%", (36.0, 50.0), (20.0, 34.0), 1),
+    "mean_corpuscular_volume": (["MCV", "Mean corpuscular volume"], "fL", (80, 100), (55, 78), 0),
+    "mean_corpuscular_hemoglobin": (["MCH"], "pg", (27.0, 33.0), (15.0, 25.0), 1),
+    "mean_corpuscular_hemoglobin_concentration": (["MCHC"], "g/dL", (32.0, 36.0), (25.0, 31.0), 1),
+    "hba1c": (["HbA1c", "A1C"], "%", (4.5, 5.6), (6.5, 13.0), 1),
+    "troponin": (["Troponin", "Troponin I"], "ng/mL", (0.0, 0.04), (0.1, 5.0), 3),
+    "alt": (["ALT", "ALT (SGPT)"], "U/L", (7, 40), (60, 400), 0),
+    "ast": (["AST", "AST (SGOT)"], "U/L", (10, 40), (60, 400), 0),
+    "creatinine": (["Creatinine"], "mg/dL", (0.6, 1.2), (1.5, 6.0), 2),
+    "c_reactive_protein": (["CRP", "C-reactive protein"], "mg/L", (0.0, 3.0), (10.0, 150.0), 1),
+    "insulin": (["Insulin", "Fasting insulin"], "uIU/mL", (2.6, 24.9), (30.0, 300.0), 1),
+    "heart_rate": (["Heart rate", "Pulse"], "bpm", (60, 100), (105, 180), 0),
+}
+
+# Blood pressure is reported as one "systolic/diastolic" reading
+BP_NORMAL = ((100, 129), (60, 84))
+BP_ABNORMAL = ((140, 210), (90, 130))
+
+PANELS = {
+    "cbc": ["hemoglobin", "platelets", "white_blood_cells", "red_blood_cells", "hematocrit",
+            "mean_corpuscular_volume", "mean_corpuscular_hemoglobin",
+            "mean_corpuscular_hemoglobin_concentration"],
+    "lipid": ["cholesterol_total", "ldl_cholesterol", "hdl_cholesterol", "triglycerides"],
+    "metabolic": ["glucose", "hba1c", "insulin", "creatinine", "bmi"],
+    "liver": ["alt", "ast"],
+    "cardiac": ["troponin", "c_reactive_protein", "heart_rate"],
+}
+
+TEXT_STYLES = ("narrative", "lab_list", "compact", "tabular")
+
+
+class SyntheticReport:
+    """One generated report: free text or PDF bytes, plus the values it encodes."""
+
+    def __init__(self, kind: str, style: str, values: Dict[str, Any], abnormal: List[str],
+                 text: Optional[str] = None, pdf_bytes: Optional[bytes] = None):
+        self.kind = kind
+        self.style = style
+        self.values = values
+        self.abnormal = abnormal
+        self.text = text
+        self.pdf_bytes = pdf_bytes
+
+
+def _draw(rng: random.Random, bounds: Tuple[float, float], decimals: int) -> float:
+    value = rng.uniform(*bounds)
+    return round(value, decimals) if decimals else int(round(value))
+
+
+def _format_value(value: float, decimals: int) -> str:
+    return f"{value:.{decimals}f}" if decimals else str(int(value))
+
+
+def generate_patient(rng: random.Random, abnormal_rate: float = 0.3,
+                     implausible_rate: float = 0.02) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Draw one patient's results for 1-3 panels.
+
+    Each analyte is out of range with probability ``abnormal_rate``; a small
+    share are scaled 10x to mimic unit or transcription errors that fall
+    outside human physiology.
+    """
+    values: Dict[str, Any] = {
+        "age": rng.randint(18, 90),
+        "sex": rng.choice(["male", "female"]),
+    }
+    abnormal: List[str] = []
+
+    if rng.random() < abnormal_rate:
+        values["blood_pressure_systolic"] = _draw(rng, BP_ABNORMAL[0], 0)
+        values["blood_pressure_diastolic"] = _draw(rng, BP_ABNORMAL[1], 0)
+        abnormal.append("blood_pressure")
+    else:
+        values["blood_pressure_systolic"] = _draw(rng, BP_NORMAL[0], 0)
+        values["blood_pressure_diastolic"] = _draw(rng, BP_NORMAL[1], 0)
+
+    panels = rng.sample(sorted(PANELS), rng.randint(1, 3))
+    for panel in panels:
+        for key in PANELS[panel]:
+            _, _, normal, out_of_range, decimals = ANALYTES[key]
+            if rng.random() < abnormal_rate:
+                value = _draw(rng, out_of_range, decimals)
+                abnormal.append(key)
+            else:
+                value = _draw(rng, normal, decimals)
+            if rng.random() < implausible_rate:
+                value = round(value * 10, decimals) if decimals else int(value * 10)
+                abnormal.append(key)
+            values[key] = value
+    return values, abnormal
+
+
+def _lab_items(rng: random.Random, values: Dict[str, Any]) -> List[Tuple[str, str, str, str]]:
+    """(label, value, unit, reference) for every analyte present, in a shuffled order."""
+    items = []
+    for key, (labels, unit, normal, _, decimals) in ANALYTES.items():
+        if key not in values:
+            continue
+        reference = f"{_format_value(normal[0], decimals)}-{_format_value(normal[1], decimals)}"
+        items.append((rng.choice(labels), _format_value(values[key], decimals), unit, reference))
+    rng.shuffle(items)
+    return items
+
+
+def render_text(rng: random.Random, values: Dict[str, Any], style: str) -> str:
+    bp = f"{values['blood_pressure_systolic']}/{values['blood_pressure_diastolic']}"
+    items = _lab_items(rng, values)
+
+    if style == "narrative":
+        opener = rng.choice([
+            f"Patient is a {values['age']} year old {values['sex']}.",
+            f"{values['age']} year old {values['sex']} presenting for routine follow-up.",
+            f"Seen today: {values['sex']}, {values['age']} years old.",
+        ])
+        sentences = [opener, f"Blood pressure {bp} mmHg."]
+        for label, value, unit, _ in items:
+            verb = rng.choice(["was", "is", "measured at", "came back at"])
+            sentences.append(f"{label} {verb} {value} {unit}.")
+        return " ".join(sentences)
+
+    if style == "lab_list":
+        lines = [f"Age: {values['age']} years", f"Sex: {values['sex']}", f"BP: {bp} mmHg"]
+        lines += [f"{label}: {value} {unit} (ref {ref})" for label, value, unit, ref in items]
+        return "\n".join(lines)
+
+    if style == "compact":
+        parts = [f"{values['age']}y {values['sex']}", f"BP {bp}"]
+        parts += [f"{label} {value}" for label, value, _, _ in items]
+        return ", ".join(parts)
+
+    if style == "tabular":
+        lines = [f"Patient: {values['age']} year old {values['sex']}", f"Blood pressure {bp}",
+                 "Test\tResult\tUnit\tReference"]
+        lines += [f"{label}\t{value}\t{unit}\t{ref}" for label, value, unit, ref in items]
+        return "\n".join(lines)
+
+    raise ValueError(f"Unknown text style: {style}")
+
+
+# --- Minimal PDF writer ---
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_pdf(header_lines: List[str], table: List[List[str]],
+               column_widths: Tuple[int, ...] = (190, 80, 80, 120)) -> bytes:
+    """
+    Write a single-page PDF with header text and a bordered table.
+
+    Cells are drawn as stroked rectangles so pdfplumber's default (lines)
+    table strategy finds the grid.
+    """
+    ops = []
+    y = 800
+    for i, line in enumerate(header_lines):
+        size = 14 if i == 0 else 10
+        ops.append(f"BT /F1 {size} Tf 50 {y} Td ({_pdf_escape(line)}) Tj ET")
+        y -= size + 8
+
+    row_height = 18
+    y -= 10
+    for row in table:
+        x = 50
+        for cell, width in zip(row, column_widths):
+            ops.append(f"{x} {y} {width} {row_height} re S")
+            ops.append(f"BT /F1 9 Tf {x + 4} {y + 5} Td ({_pdf_escape(cell)}) Tj ET")
+            x += width
+        y -= row_height
+
+    content = "\n".join(ops).encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length " + str(len(content)).encode() + b" >>\nstream\n" + content + b"\nendstream",
+    ]
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_at = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def render_report_pdf(rng: random.Random, values: Dict[str, Any]) -> bytes:
+    bp = f"{values['blood_pressure_systolic']}/{values['blood_pressure_diastolic']}"
+    header = [
+        "Laboratory Report",
+        f"Patient: {values['age']} year old {values['sex']}",
+        f"Blood pressure: {bp} mmHg",
+    ]
+    table = [["Test", "Result", "Unit", "Reference"]]
+    table += [list(item) for item in _lab_items(rng, values)]
+    return render_pdf(header, table)
+
+
+def generate_report(rng: random.Random, pdf_fraction: float = 0.2, abnormal_rate: float = 0.3,
+                    implausible_rate: float = 0.02) -> SyntheticReport:
+    values, abnormal = generate_patient(rng, abnormal_rate, implausible_rate)
+    if rng.random() < pdf_fraction:
+        return SyntheticReport("pdf", "table", values, abnormal, pdf_bytes=render_report_pdf(rng, values))
+    style = rng.choice(TEXT_STYLES)
+    return SyntheticReport("text", style, values, abnormal, text=render_text(rng, values, style))
+
+
+def generate_corpus(count: int, seed: int = 0, pdf_fraction: float = 0.2, abnormal_rate: float = 0.3,
+                    implausible_rate: float = 0.02) -> List[SyntheticReport]:
+    """Generate ``count`` reports deterministically from ``seed``."""
+    rng = random.Random(seed)
+    return [generate_report(rng, pdf_fraction, abnormal_rate, implausible_rate) for _ in range(count)]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Print synthetic lab reports")
+    parser.add_argument("--count", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pdf-dir", help="Also write PDF reports to this directory")
+    args = parser.parse_args()
+    if args.pdf_dir:
+        os.makedirs(args.pdf_dir, exist_ok=True)
+
+    for i, report in enumerate(generate_corpus(args.count, args.seed, pdf_fraction=0.5 if args.pdf_dir else 0.0)):
+        print(f"--- #{i} {report.kind}/{report.style} abnormal={report.abnormal}")
+        if report.kind == "pdf":
+            path = os.path.join(args.pdf_dir, f"report_{i}.pdf")
+            with open(path, "wb") as f:
+                f.write(report.pdf_bytes)
+            print(path)
+        else:
+            print(report.text)
+
+
+if __name__ == "__main__":
+    main_cli()
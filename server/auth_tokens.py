@@ -0,0 +1,147 @@
+"""Signed, expiring access tokens and bounded password hashing.
+
+``/api/auth/login`` checks the password once and returns an access token:
+
+    v1.<base64url(claims JSON)>.<base64url(HMAC-SHA256)>
+
+Requests then authenticate with ``Authorization: Bearer <token>``. Checking
+one is an HMAC and an expiry comparison - no database lookup and no bcrypt.
+The HMAC secret comes from AUTH_TOKEN_SECRET or a key file shared by every
+worker on the host.
+
+bcrypt is deliberately slow, so it runs on its own small thread pool (the
+bcrypt library releases the GIL while hashing) with a cap on queued work. A
+burst of logins waits for, or is turned away by, that pool instead of
+occupying the threads that serve the analysis endpoints.
+"""
+import os
+import json
+import time
+import hmac
+import base64
+import asyncio
+import hashlib
+import logging
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+import bcrypt
+
+from signing import publish_new_file
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = "v1"
+
+
+class AuthTokenError(Exception):
+    """Raised when an access token is malformed, forged or expired."""
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def load_or_generate_secret(key_file: str) -> bytes:
+    """Load the token HMAC secret from ``key_file``, creating it on first use."""
+    # Hex, so the file can also be pasted into AUTH_TOKEN_SECRET
+    secret = secrets.token_hex(32).encode("ascii")
+    try:
+        publish_new_file(key_file, secret)
+    except FileExistsError:
+        with open(key_file, "rb") as f:
+            existing = f.read().strip()
+        if not existing:
+            raise ValueError(f"Access token secret file {key_file} is empty")
+        return existing
+    logger.info(f"Generated access token secret {key_file}")
+    return secret
+
+
+class AccessTokenSigner:
+    """Issues and verifies HMAC-signed access tokens."""
+
+    def __init__(self, secret: bytes, ttl_seconds: int = 3600):
+        if not secret:
+            raise ValueError("Access token secret must not be empty")
+        self.secret = secret
+        self.ttl_seconds = ttl_seconds
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        return hmac.new(self.secret, signing_input, hashlib.sha256).digest()
+
+    def issue(self, claims: Dict[str, Any], issued_at: Optional[int] = None) -> str:
+        """Sign ``claims`` (``sub`` is the user id) with ``iat``/``exp`` added."""
+        issued_at = int(issued_at if issued_at is not None else time.time())
+        body = dict(claims, iat=issued_at, exp=issued_at + self.ttl_seconds)
+        payload = _b64encode(json.dumps(body, separators=(",", ":"), sort_keys=True).encode())
+        signing_input = f"{TOKEN_VERSION}.{payload}".encode("ascii")
+        return f"{TOKEN_VERSION}.{payload}.{_b64encode(self._sign(signing_input))}"
+
+    def verify(self, token: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """Return the claims of a valid token, or raise ``AuthTokenError``."""
+        parts = token.split(".")
+        if len(parts) != 3 or parts[0] != TOKEN_VERSION:
+            raise AuthTokenError("Malformed token")
+        version, payload, signature = parts
+
+        try:
+            valid = hmac.compare_digest(self._sign(f"{version}.{payload}".encode("ascii")), _b64decode(signature))
+        except (ValueError, UnicodeEncodeError):
+            valid = False
+        if not valid:
+            raise AuthTokenError("Invalid token signature")
+
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            raise AuthTokenError("Malformed claims")
+
+        now = now if now is not None else time.time()
+        if not isinstance(claims, dict) or now >= claims.get("exp", 0):
+            raise AuthTokenError("Token expired")
+        return claims
+
+
+class PasswordHasher:
+    """bcrypt on a dedicated, bounded thread pool."""
+
+    def __init__(self, workers: int = 2, max_pending: int = 32, rounds: int = 12):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        # Running plus queued jobs; beyond max_pending callers are refused instead of queued
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many password checks in progress")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(bcrypt.hashpw, password.encode("utf-8"), bcrypt.gensalt(rounds=self.rounds))
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        try:
+            return await self._run(bcrypt.checkpw, password.encode("utf-8"), password_hash.encode("utf-8"))
+        except ValueError:
+            # Not a bcrypt hash
+            return False
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -1,168 +1,303 @@
 import json
+import zlib
 import hashlib
 import datetime
 import os
-import base64
-from typing import List, Dict, Tuple, Optional, Any
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.exceptions import InvalidSignature
+from typing import List, Dict, Optional, Any, Iterator, Tuple
+
+from chain_store import ChainStore, FileChainStore, manifest_hash
+from merkle_tree import bulk_merkle_root
+from signing import (
+    RSA_PSS, SIGNER_CLASSES, RSAPSSSigner, SignatureVerifier, load_signer, normalize_algorithm,
+)
+
+# Block fields that are not covered by the block hash
+UNHASHED_FIELDS = ("hash", "signature", "rsa_signature", "is_valid")
 
 class BlockchainManager:
     """
-    Manages the blockchain with RSA signatures and integrity checks.
+    Manages the blockchain with signed blocks and integrity checks.
+
+    Blocks are signed with the configured algorithm (RSA-PSS or Ed25519, see
+    ``signing``); verification dispatches on each block's recorded algorithm.
+
+    Blocks are kept by a ``ChainStore`` (see ``chain_store``): the JSON file
+    by default, or a SQL table shared between nodes. Several processes may
+    append at once; appends take the store's writer lock and re-read the
+    chain tip under it, so no block is lost and ``prev_hash`` never forks.
     """
-    def __init__(self, chain_file: str = "blockchain.json"):
+    def __init__(self, chain_file: str = "blockchain.json", signing_algorithm: Optional[str] = None,
+                 store: Optional[ChainStore] = None):
         self.chain_file = chain_file
+        self.store = store if store is not None else FileChainStore(chain_file)
+        self.signing_algorithm = normalize_algorithm(signing_algorithm or os.getenv("SIGNING_ALGORITHM", "rsa"))
         self.private_key = None
         self.public_key = None
-        self._chain = []  # Internal storage
         
         self._load_or_generate_keys()
-        self.load_blockchain()
+        self.store.bind_signer(self.signer)
 
     @property
     def chain(self) -> List[Dict[str, Any]]:
-        """Returns a read-only copy of the blockchain."""
-        return list(self._chain) # Return copy to prevent direct modification
+        """Returns a copy of the whole blockchain. Prefer ``iter_blocks`` for large chains."""
+        return list(self.store.iter_blocks())
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def iter_blocks(self, start: int = 1, end: Optional[int] = None, reverse: bool = False) -> Iterator[Dict[str, Any]]:
+        """Stream blocks ``start..end`` (1-based, inclusive) without loading the whole chain."""
+        return self.store.iter_blocks(start, end, reverse)
 
     def _load_or_generate_keys(self):
-        """Loads RSA keys from env/files or generates them."""
-        # In a real app, load from secure storage. Here we use local files/env.
-        # For this demo, we'll generate if not present in memory (or save to file for persistence across restarts)
-        
-        key_file = "private_key.pem"
-        pub_file = "public_key.pem"
-        
-        if os.path.exists(key_file) and os.path.exists(pub_file):
-            with open(key_file, "rb") as f:
-                self.private_key = serialization.load_pem_private_key(
-                    f.read(), password=None
-                )
-            with open(pub_file, "rb") as f:
-                self.public_key = serialization.load_pem_public_key(f.read())
-        else:
-            # Generate new keys
-            self.private_key = rsa.generate_private_key(
-                public_exponent=65537,
-                key_size=4096,
-            )
-            self.public_key = self.private_key.public_key()
-            
-            # Save them
-            with open(key_file, "wb") as f:
-                f.write(self.private_key.private_bytes(
-                    encoding=serialization.Encoding.PEM,
-                    format=serialization.PrivateFormat.PKCS8,
-                    encryption_algorithm=serialization.NoEncryption()
-                ))
-            with open(pub_file, "wb") as f:
-                f.write(self.public_key.public_bytes(
-                    encoding=serialization.Encoding.PEM,
-                    format=serialization.PublicFormat.SubjectPublicKeyInfo
-                ))
+        """Loads signing keys from local files, generating the active algorithm's pair if missing."""
+        # In a real app, load from secure storage. Here we use local files.
+        signers = {}
+        for algorithm in SIGNER_CLASSES:
+            # Other algorithms are loaded only if keys exist, to verify older blocks
+            signer = load_signer(algorithm, generate=(algorithm == self.signing_algorithm))
+            if signer is not None:
+                signers[algorithm] = signer
+
+        self.signer = signers[self.signing_algorithm]
+        self.verifier = SignatureVerifier(signers)
+
+        # Kept for callers that use the RSA key objects directly
+        rsa_signer = signers.get(RSA_PSS)
+        if rsa_signer is not None:
+            self.private_key = rsa_signer.private_key
+            self.public_key = rsa_signer.public_key
 
     def sign_data(self, data: bytes) -> str:
-        """Signs data with private key and returns base64 signature."""
-        signature = self.private_key.sign(
-            data,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        return base64.b64encode(signature).decode('utf-8')
-
-    def verify_signature(self, data: bytes, signature_b64: str, public_key=None) -> bool:
-        """Verifies a signature."""
-        if public_key is None:
-            public_key = self.public_key
-            
-        try:
-            signature = base64.b64decode(signature_b64)
-            public_key.verify(
-                signature,
-                data,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return True
-        except (InvalidSignature, Exception):
-            return False
+        """Signs data with the active key and returns base64 signature."""
+        return self.signer.sign(data)
+
+    def private_key_pem(self) -> bytes:
+        """PEM of the active signing key, for handing to signing worker processes."""
+        return self.signer.private_pem()
+
+    def public_key_pem(self, algorithm: Optional[str] = None) -> Optional[bytes]:
+        """PEM of the public key for ``algorithm`` (the active one by default), if loaded."""
+        signer = self.verifier.signers.get(algorithm or self.signing_algorithm)
+        return signer.public_pem() if signer is not None else None
+
+    def verify_signature(self, data: bytes, signature_b64: str, public_key=None, algorithm: Optional[str] = None) -> bool:
+        """Verifies a signature made with ``algorithm`` (RSA-PSS when not recorded)."""
+        if public_key is not None:
+            # Explicit RSA public key (legacy call style)
+            return RSAPSSSigner(public_key=public_key).verify(data, signature_b64)
+        return self.verifier.verify(data, signature_b64, algorithm)
 
     def load_blockchain(self):
-        try:
-            with open(self.chain_file, "r") as f:
-                self._chain = json.load(f)
-        except FileNotFoundError:
-            self._chain = []
+        self.store.reload()
 
-    def _save_chain(self):
-        with open(self.chain_file, "w") as f:
-            json.dump(self._chain, f, indent=2)
+    def refresh_if_changed(self) -> bool:
+        """Pick up blocks appended by other processes (a no-op for the SQL store)."""
+        return self.store.refresh_if_changed()
+
+    def writer_lock(self):
+        """Exclusive, re-entrant lock on the chain across threads and processes."""
+        return self.store.writer_lock()
+
+    def get_block(self, index: int) -> Optional[Dict[str, Any]]:
+        """Block by its 1-based index."""
+        return self.store.get(index)
+
+    @staticmethod
+    def _expected_hash(block: Dict[str, Any]) -> str:
+        if not any(k in block for k in ("signature", "rsa_signature", "merkle_root")):
+            # Original unsigned format: hash over the block data only
+            return hashlib.sha256(json.dumps(block["data"], sort_keys=True).encode()).hexdigest()
+        content_to_hash = {k: v for k, v in block.items() if k not in UNHASHED_FIELDS}
+        return hashlib.sha256(json.dumps(content_to_hash, sort_keys=True).encode()).hexdigest()
 
     def append_block(self, data: dict, merkle_root: str = None) -> dict:
-        prev_hash = self._chain[-1]["hash"] if self._chain else "0" * 64
+        with self.writer_lock():
+            # Another worker may have appended since we last read the file
+            self.refresh_if_changed()
+            tip = self.store.last()
+            prev_hash = tip["hash"] if tip else "0" * 64
         
-        block_content = {
-            "index": len(self._chain) + 1,
-            "timestamp": datetime.datetime.now().isoformat(),
-            "data": data,
-            "prev_hash": prev_hash,
-            "merkle_root": merkle_root
-        }
+            block_content = {
+                "index": tip["index"] + 1 if tip else 1,
+                "timestamp": datetime.datetime.now().isoformat(),
+                "data": data,
+                "prev_hash": prev_hash,
+                "merkle_root": merkle_root,
+                # Hashed, so the algorithm cannot be swapped after the fact
+                "signature_algorithm": self.signing_algorithm
+            }
         
-        # Create hash of content (excluding signature and final hash)
-        block_json = json.dumps(block_content, sort_keys=True)
-        block_hash = hashlib.sha256(block_json.encode()).hexdigest()
+            # Create hash of content (excluding signature and final hash)
+            block_json = json.dumps(block_content, sort_keys=True)
+            block_hash = hashlib.sha256(block_json.encode()).hexdigest()
         
-        # Sign the hash
-        signature = self.sign_data(block_hash.encode())
+            # Sign the hash
+            signature = self.sign_data(block_hash.encode())
         
-        final_block = {
-            **block_content,
-            "rsa_signature": signature,
-            "hash": block_hash,
-            "is_valid": True 
-        }
+            final_block = {
+                **block_content,
+                "signature": signature,
+                "hash": block_hash,
+                "is_valid": True 
+            }
         
-        self._chain.append(final_block)
-        self._save_chain()
+            self.store.append(final_block)
         
-        return final_block
+            return final_block
 
-    def validate_chain(self) -> Dict[str, Any]:
-        """Validates the entire blockchain."""
-        report = {
-            "is_valid": True,
-            "length": len(self._chain),
-            "errors": []
-        }
+    def _manifest_error(self, manifest: Dict[str, Any]) -> Optional[str]:
+        """Checks a sealed segment's manifest hash and signature; returns the problem, if any."""
+        if manifest_hash(manifest) != manifest.get("manifest_hash"):
+            return "Manifest hash mismatch"
+        if not self.verify_signature(manifest["manifest_hash"].encode(), manifest.get("signature", ""),
+                                     algorithm=manifest.get("signature_algorithm")):
+            return "Invalid manifest signature"
+        return None
+
+    def _segment_file_error(self, manifest: Dict[str, Any]) -> Optional[str]:
+        """Checks a sealed segment's file against the checksum in its manifest, when the file is present."""
+        checksum = self.store.segment_file_sha256(manifest)
+        if checksum is not None and checksum != manifest.get("file_sha256"):
+            return "Segment file checksum mismatch"
+        return None
+
+    def _iter_readable_blocks(self, start: int, manifests: List[Dict[str, Any]]
+                              ) -> Iterator[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]:
+        """
+        Yields ``(block, None)`` for every block from ``start``, and
+        ``(None, manifest)`` in place of the blocks of a sealed segment whose
+        file is present but cannot be decoded (e.g. a corrupted gzip stream).
+        """
+        for manifest in manifests:
+            if manifest["last_index"] < start:
+                continue
+            try:
+                blocks = list(self.store.iter_blocks(max(start, manifest["first_index"]), manifest["last_index"]))
+            except FileNotFoundError:
+                raise
+            except (OSError, EOFError, ValueError, zlib.error):
+                blocks = None
+            start = manifest["last_index"] + 1
+            if blocks is None:
+                yield None, manifest
+                continue
+            for block in blocks:
+                yield block, None
+        for block in self.store.iter_blocks(start):
+            yield block, None
+
+    def iter_validation(self, full: bool = True, progress_every: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Validates the blockchain, streaming it from the store and reporting as it goes.
+
+        Yields ``{"type": "error", ...}`` events as problems are found,
+        ``{"type": "progress", "checked": n}`` every ``progress_every`` blocks
+        (0 disables them) and a final ``{"type": "result", ...}``.
+
+        With ``full=False``, sealed segments (segmented store only) are trusted
+        through their signed manifests and only the open segment is rescanned.
+        A full pass also checks every manifest against its segment's blocks
+        and, where the segment file is present, against the file's checksum.
+        """
+        is_valid = True
+        length = 0
+        trusted_segments = 0
+        manifests = self.store.sealed_segments()
+        
+        start = 1
+        prev_hash = None
+        if not full:
+            for manifest in manifests:
+                problem = self._manifest_error(manifest)
+                if problem is None and prev_hash is not None and manifest["prev_hash"] != prev_hash:
+                    problem = "Invalid prev_hash"
+                if problem is not None:
+                    is_valid = False
+                    yield {"type": "error", "segment": manifest["segment"], "message": f"Segment {manifest['segment']}: {problem}"}
+                prev_hash = manifest["tip_hash"]
+                start = manifest["last_index"] + 1
+                length += manifest["count"]
+                trusted_segments += 1
+            manifests = []
+            if trusted_segments and progress_every:
+                yield {"type": "progress", "checked": length, "trusted_segments": trusted_segments}
         
-        for i, block in enumerate(self._chain):
+        # Manifests still to check against the blocks they cover, keyed on their last block
+        pending_manifests = {m["last_index"]: m for m in manifests}
+        segment_hashes = []
+        for block, unreadable in self._iter_readable_blocks(start, manifests):
+            if unreadable is not None:
+                # Its blocks cannot be checked; the signed manifest still links the chain
+                is_valid = False
+                problems = [self._segment_file_error(unreadable), "Segment file cannot be read"]
+                for problem in (p for p in problems if p):
+                    yield {"type": "error", "segment": unreadable["segment"],
+                           "message": f"Segment {unreadable['segment']}: {problem}"}
+                pending_manifests.pop(unreadable["last_index"], None)
+                prev_hash = unreadable["tip_hash"]
+                length += unreadable["count"]
+                segment_hashes = []
+                continue
+            length += 1
+            problems = []
             # 1. Check prev_hash
-            if i > 0:
-                prev_block = self._chain[i-1]
-                if block["prev_hash"] != prev_block["hash"]:
-                    report["is_valid"] = False
-                    report["errors"].append(f"Block {block['index']}: Invalid prev_hash")
+            if prev_hash is not None and block["prev_hash"] != prev_hash:
+                problems.append("Invalid prev_hash")
             
             # 2. Re-calculate hash
-            content_to_hash = {k: v for k, v in block.items() if k not in ["hash", "rsa_signature", "is_valid"]}
-            calculated_hash = hashlib.sha256(json.dumps(content_to_hash, sort_keys=True).encode()).hexdigest()
-            
-            if calculated_hash != block["hash"]:
-                report["is_valid"] = False
-                report["errors"].append(f"Block {block['index']}: Hash mismatch")
+            if self._expected_hash(block) != block["hash"]:
+                problems.append("Hash mismatch")
                 
-            # 3. Verify Signature
-            if "rsa_signature" in block:
-                if not self.verify_signature(block["hash"].encode(), block["rsa_signature"]):
-                    report["is_valid"] = False
-                    report["errors"].append(f"Block {block['index']}: Invalid RSA signature")
-                    
+            # 3. Verify Signature (legacy blocks carry rsa_signature and no algorithm)
+            if "signature" in block or "rsa_signature" in block:
+                algorithm = block.get("signature_algorithm") or RSA_PSS
+                signature = block.get("signature") or block.get("rsa_signature")
+                if not self.verify_signature(block["hash"].encode(), signature, algorithm=algorithm):
+                    problems.append(f"Invalid {algorithm} signature")
+            prev_hash = block["hash"]
+            
+            for problem in problems:
+                is_valid = False
+                yield {"type": "error", "block_index": block["index"], "message": f"Block {block['index']}: {problem}"}
+            
+            # 4. Sealed segment boundary: the manifest must describe exactly these blocks
+            if pending_manifests:
+                segment_hashes.append(block["hash"])
+                manifest = pending_manifests.pop(block["index"], None)
+                if manifest is not None:
+                    try:
+                        root_matches = manifest["merkle_root"] == bulk_merkle_root(segment_hashes)
+                    except ValueError:
+                        # A tampered block hash that is not even hex
+                        root_matches = False
+                    if self._manifest_error(manifest) or manifest["tip_hash"] != block["hash"] or not root_matches:
+                        is_valid = False
+                        yield {"type": "error", "segment": manifest["segment"],
+                               "message": f"Segment {manifest['segment']}: Manifest does not match its blocks"}
+                    file_problem = self._segment_file_error(manifest)
+                    if file_problem is not None:
+                        is_valid = False
+                        yield {"type": "error", "segment": manifest["segment"],
+                               "message": f"Segment {manifest['segment']}: {file_problem}"}
+                    segment_hashes = []
+            
+            if progress_every and length % progress_every == 0:
+                yield {"type": "progress", "checked": length}
+        
+        yield {"type": "result", "is_valid": is_valid, "length": length, "trusted_segments": trusted_segments}
+
+    def validate_chain(self, full: bool = True) -> Dict[str, Any]:
+        """Validates the blockchain (see ``iter_validation``) and returns one report."""
+        report = {
+            "is_valid": True,
+            "length": 0,
+            "errors": [],
+            "trusted_segments": 0
+        }
+        for event in self.iter_validation(full, progress_every=0):
+            if event["type"] == "error":
+                report["errors"].append(event["message"])
+            elif event["type"] == "result":
+                report.update(is_valid=event["is_valid"], length=event["length"], trusted_segments=event["trusted_segments"])
         return report
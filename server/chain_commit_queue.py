@@ -0,0 +1,311 @@
+"""Asynchronous, durable commit pipeline for the audit blockchain.
+
+``/api/analyze`` used to sign and append its block (and rewrite the chain
+file) before responding. Now the request only inserts a ``ChainCommitEntry``
+in the same transaction as its ``PatientReport`` and returns a pending block
+reference. A background worker drains the queue in insertion order, appends
+each entry through ``BlockchainManager`` and writes the block hash and index
+back onto the report.
+
+Durability: an entry exists exactly when its report does. Appended blocks
+carry the entry's ``commit_id``, so if the process dies between appending a
+block and marking the entry committed, the next pass finds the block on the
+chain and only completes the bookkeeping instead of appending it twice.
+
+Every worker process runs its own queue thread. A pass holds the chain's
+cross-process writer lock from the pending-entry query until its last entry
+is marked committed, so two processes never append the same entry.
+
+With a ``MerkleStore`` attached, each entry also becomes a leaf of the
+reports Merkle tree (``merkle_leaf`` of its block data). The block records
+the leaf position and the tree root after the append, and the report gets
+the inclusion proof for that root, so the proof checks against the signed
+block without the tree.
+
+Every node keeps its own tree file, including nodes that share one SQL
+chain. The chain is the source of truth: under the writer lock, before a
+pass appends anything, the tree is brought in line with the leaves the
+chain records. Leaves appended by other nodes are added from their blocks'
+data, and leaves whose block never reached the chain are dropped. A node
+that falls far behind pays for the catch-up once, on its next pass. If a
+tree cannot be reconciled (the chain's leaf positions are not contiguous),
+the pass refuses to append until the tree is rebuilt with
+``rebuild_merkle_store.py``.
+"""
+import json
+import hashlib
+import time
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable
+
+from sqlmodel import Session, select, func
+
+import metrics
+from models import ChainCommitEntry, PatientReport
+
+logger = logging.getLogger(__name__)
+
+COMMIT_LAG_SECONDS = metrics.histogram(
+    "mediguard_chain_commit_lag_seconds", "Time from enqueue until the block is on the chain"
+)
+COMMIT_FAILURES = metrics.counter("mediguard_chain_commit_failures_total", "Failed block append attempts")
+
+
+def merkle_leaf(data: Dict[str, Any]) -> str:
+    """Leaf hash for a block's data: canonical JSON, without the leaf position itself."""
+    content = {k: v for k, v in data.items() if k != "merkle_leaf"}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+class ChainCommitQueue:
+    """Background worker that moves queued audit entries onto the chain, in order."""
+
+    def __init__(self, blockchain_manager, engine, poll_interval: float = 1.0,
+                 batch_size: int = 100, max_attempts: int = 5, on_commit: Optional[Callable[[], Any]] = None,
+                 merkle_store=None):
+        self.blockchain_manager = blockchain_manager
+        self.engine = engine
+        self.merkle_store = merkle_store
+        self.on_commit = on_commit  # Called after a pass that committed anything (e.g. index sync)
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        # commit_id -> block for the newest blocks only; see _committed_index
+        self._committed: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._committed_window = 4 * batch_size
+        self._indexed_upto = 0  # Highest block index already scanned into _committed
+        self._merkle_leaves: Optional[int] = None  # Tree size recorded by the newest scanned block
+        self._merkle_tip: Optional[str] = None  # And that block's leaf hash
+
+    # --- Producer side ---
+
+    @staticmethod
+    def enqueue(session: Session, payload: Dict[str, Any], report_id: Optional[int] = None) -> ChainCommitEntry:
+        """Add an entry to ``session``. It becomes durable when the caller commits."""
+        entry = ChainCommitEntry(patient_report_id=report_id, payload_json=json.dumps(payload, sort_keys=True))
+        session.add(entry)
+        return entry
+
+    def notify(self):
+        """Wake the worker now instead of at the next poll."""
+        self._wake.set()
+
+    # --- Worker ---
+
+    def _committed_index(self) -> Dict[str, Dict[str, Any]]:
+        """commit_id -> block for recent blocks, scanning only blocks added since the last call."""
+        if self._indexed_upto == 0:
+            # Entries are appended in order and committed one at a time under the
+            # writer lock, so an appended-but-unmarked entry is always near the tip.
+            # Skipping the rest keeps startup from reading the whole chain, and
+            # the index keeps only a window of recent blocks for the same reason.
+            self._indexed_upto = max(len(self.blockchain_manager) - self.batch_size, 0)
+        for block in self.blockchain_manager.iter_blocks(start=self._indexed_upto + 1):
+            data = block.get("data")
+            commit_id = data.get("commit_id") if isinstance(data, dict) else None
+            if commit_id:
+                self._remember(commit_id, block)
+            if isinstance(data, dict) and "merkle_leaf" in data:
+                self._merkle_leaves = data["merkle_leaf"] + 1
+                self._merkle_tip = merkle_leaf(data)
+            self._indexed_upto = block["index"]
+        return self._committed
+
+    def _remember(self, commit_id: str, block: Dict[str, Any]):
+        """Index a block, forgetting the oldest so memory stays flat as the chain grows."""
+        self._committed[commit_id] = block
+        while len(self._committed) > self._committed_window:
+            self._committed.popitem(last=False)
+
+    def process_pending(self) -> int:
+        """Append up to ``batch_size`` pending entries. Returns how many were committed."""
+        committed = 0
+        with self._lock, self.blockchain_manager.writer_lock(), Session(self.engine) as session:
+            entries = session.exec(
+                select(ChainCommitEntry)
+                .where(ChainCommitEntry.status == "pending")
+                .order_by(ChainCommitEntry.id)
+                .limit(self.batch_size)
+            ).all()
+            if not entries:
+                return 0
+
+            # Blocks another process appended are indexed too, so their entries are not re-appended
+            self.blockchain_manager.refresh_if_changed()
+            index = self._committed_index()
+            self._reconcile_merkle()
+            for entry in entries:
+                block = index.get(entry.commit_id)
+                if block is None:
+                    data = json.loads(entry.payload_json)
+                    data["commit_id"] = entry.commit_id
+                    merkle_root = None
+                    if self.merkle_store is not None:
+                        leaf = merkle_leaf(data)
+                        data["merkle_leaf"] = self.merkle_store.append(leaf)
+                        merkle_root = self.merkle_store.root()
+                    started = time.perf_counter()
+                    try:
+                        block = self.blockchain_manager.append_block(data, merkle_root=merkle_root)
+                    except Exception as e:
+                        if merkle_root is not None:
+                            self.merkle_store.truncate(data["merkle_leaf"])
+                        self._record_failure(session, entry, e)
+                        if entry.status == "pending":
+                            # Keep order: retry this entry before anything queued after it
+                            break
+                        continue
+                    metrics.record_duration(metrics.BLOCKCHAIN_APPEND_SECONDS, time.perf_counter() - started)
+                    metrics.record_value(metrics.BLOCKCHAIN_LENGTH, block["index"])
+                    self._remember(entry.commit_id, block)
+                    self._indexed_upto = block["index"]
+                    if merkle_root is not None:
+                        self._merkle_leaves = data["merkle_leaf"] + 1
+                        self._merkle_tip = leaf
+
+                self._mark_committed(session, entry, block)
+                committed += 1
+
+        if committed and self.on_commit is not None:
+            try:
+                self.on_commit()
+            except Exception as e:
+                logger.error(f"Post-commit hook failed: {e}")
+        return committed
+
+    def _reconcile_merkle(self):
+        """
+        Make the tree hold exactly the leaves the chain records. Called under the writer lock.
+
+        Adds leaves other nodes appended to a shared chain and drops leaves
+        whose block never reached the chain (a crash between the two appends).
+        """
+        store = self.merkle_store
+        if store is None or self._merkle_leaves is None:
+            return
+        leaves = len(store)
+        if leaves >= self._merkle_leaves and store.leaf(self._merkle_leaves - 1) == self._merkle_tip:
+            if leaves > self._merkle_leaves:
+                logger.warning(f"Dropping {leaves - self._merkle_leaves} Merkle leaves with no block")
+                store.truncate(self._merkle_leaves)
+            return
+
+        # Walk back from the tip to the newest leaf the tree and the chain agree on
+        keep = 0
+        missing = []
+        for block in self.blockchain_manager.iter_blocks(reverse=True):
+            data = block.get("data")
+            if not isinstance(data, dict) or "merkle_leaf" not in data:
+                continue
+            leaf = merkle_leaf(data)
+            if data["merkle_leaf"] < leaves and store.leaf(data["merkle_leaf"]) == leaf:
+                keep = data["merkle_leaf"] + 1
+                break
+            missing.append(leaf)
+        if keep + len(missing) != self._merkle_leaves:
+            raise RuntimeError("Chain Merkle leaf positions are not contiguous; rebuild with rebuild_merkle_store.py")
+
+        logger.info(f"Merkle store: keeping {keep} of {leaves} leaves, adding {len(missing)} from the chain")
+        store.truncate(keep)
+        store.extend(reversed(missing))
+
+    def _merkle_proof(self, block: Dict[str, Any]) -> Optional[List[Dict[str, str]]]:
+        """Proof for the block's leaf against the root the block recorded."""
+        data = block.get("data")
+        leaf_index = data.get("merkle_leaf") if isinstance(data, dict) else None
+        # Only while the tree is still the size it was when the block was appended
+        if self.merkle_store is None or leaf_index is None or len(self.merkle_store) != leaf_index + 1:
+            return None
+        return self.merkle_store.get_proof_with_direction(leaf_index)
+
+    def _mark_committed(self, session: Session, entry: ChainCommitEntry, block: Dict[str, Any]):
+        entry.status = "committed"
+        entry.block_index = block["index"]
+        entry.block_hash = block["hash"]
+        entry.committed_at = datetime.datetime.utcnow()
+        session.add(entry)
+
+        if entry.patient_report_id is not None:
+            report = session.get(PatientReport, entry.patient_report_id)
+            if report is not None:
+                report.blockchain_hash = block["hash"]
+                report.blockchain_block_index = block["index"]
+                proof = self._merkle_proof(block)
+                if proof is not None:
+                    report.merkle_proof_json = json.dumps(proof)
+                session.add(report)
+
+        # One transaction per entry: a crash leaves at most one block to reconcile
+        session.commit()
+        metrics.record_duration(COMMIT_LAG_SECONDS, (entry.committed_at - entry.created_at).total_seconds())
+
+    def _record_failure(self, session: Session, entry: ChainCommitEntry, error: Exception):
+        entry.attempts += 1
+        entry.last_error = str(error)
+        if entry.attempts >= self.max_attempts:
+            entry.status = "failed"
+            logger.error(f"Chain commit {entry.commit_id} failed permanently: {error}")
+        else:
+            logger.warning(f"Chain commit {entry.commit_id} failed (attempt {entry.attempts}): {error}")
+        session.add(entry)
+        session.commit()
+        metrics.record_count(COMMIT_FAILURES)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Drain everything queued, then wait for a notify or the next poll
+                while self.process_pending() >= self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"Chain commit worker error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self):
+        """Start the worker thread (idempotent)."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="chain-commit", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout=self.poll_interval + 5)
+            self._worker = None
+
+    # --- Status ---
+
+    @staticmethod
+    def describe(entry: ChainCommitEntry) -> Dict[str, Any]:
+        return {
+            "commit_id": entry.commit_id,
+            "status": entry.status,
+            "patient_report_id": entry.patient_report_id,
+            "block_index": entry.block_index,
+            "block_hash": entry.block_hash,
+            "attempts": entry.attempts,
+            "last_error": entry.last_error,
+            "created_at": entry.created_at.isoformat() if entry.created_at else None,
+            "committed_at": entry.committed_at.isoformat() if entry.committed_at else None,
+        }
+
+    @staticmethod
+    def stats(session: Session) -> Dict[str, int]:
+        rows = session.exec(
+            select(ChainCommitEntry.status, func.count()).group_by(ChainCommitEntry.status)
+        ).all()
+        counts = {"pending": 0, "committed": 0, "failed": 0}
+        counts.update({status: count for status, count in rows})
+        return counts
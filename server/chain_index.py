@@ -0,0 +1,145 @@
+"""Provenance lookups: which block carries a given block hash or features_hash?
+
+Every block's hash and its ``features_hash`` (for analysis blocks) are
+recorded in the ``ChainHashIndex`` table, so a lookup is one indexed query
+instead of a scan of the chain. A Bloom filter over the same values sits in
+front of the table: most lookups for hashes that were never on the chain are
+answered in memory, without touching the database.
+
+The index is brought up to date from the chain store itself (``sync``), so
+it also covers blocks written before it existed and blocks appended by other
+processes. The commit worker syncs after each pass.
+"""
+import math
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Iterable
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, func
+
+import metrics
+from models import ChainHashIndex
+
+logger = logging.getLogger(__name__)
+
+LOOKUPS = metrics.counter(
+    "mediguard_chain_lookups_total", "Provenance lookups by outcome", ["result"]
+)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one SHA-256)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.num_bits = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str) -> Iterable[int]:
+        digest = hashlib.sha256(value.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, value: str):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+def _index_rows(block: Dict[str, Any]) -> List[ChainHashIndex]:
+    rows = [ChainHashIndex(hash=block["hash"], kind="block", block_index=block["index"])]
+    data = block.get("data")
+    features_hash = data.get("features_hash") if isinstance(data, dict) else None
+    if features_hash:
+        rows.append(ChainHashIndex(hash=features_hash, kind="features", block_index=block["index"]))
+    return rows
+
+
+class ChainIndex:
+    """Block hash / features_hash -> block index, with a Bloom filter for fast negatives."""
+
+    def __init__(self, blockchain_manager, engine, bloom_capacity: int = 1_000_000, error_rate: float = 0.01):
+        self.blockchain_manager = blockchain_manager
+        self.engine = engine
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self.bloom: Optional[BloomFilter] = None
+        self.indexed_upto = 0  # Highest block index in the table and the filter
+        self._lock = threading.Lock()
+
+    def _load_bloom(self, session: Session):
+        """(Re)build the filter from the table, sized for at least twice its current contents."""
+        total = session.exec(select(func.count()).select_from(ChainHashIndex)).one()
+        self.bloom = BloomFilter(max(self.bloom_capacity, 2 * total), self.error_rate)
+        for value in session.exec(select(ChainHashIndex.hash).execution_options(yield_per=10000)):
+            self.bloom.add(value)
+        self.indexed_upto = session.exec(select(func.max(ChainHashIndex.block_index))).one() or 0
+
+    def sync(self) -> int:
+        """Index blocks appended since the last sync. Returns how many were added."""
+        with self._lock, Session(self.engine) as session:
+            if self.bloom is None:
+                self._load_bloom(session)
+            # Another process may have indexed further than this one has seen
+            table_upto = session.exec(select(func.max(ChainHashIndex.block_index))).one() or 0
+
+            added = 0
+            for block in self.blockchain_manager.iter_blocks(start=self.indexed_upto + 1):
+                rows = _index_rows(block)
+                if block["index"] > table_upto:
+                    session.add_all(rows)
+                for row in rows:
+                    self.bloom.add(row.hash)
+                self.indexed_upto = block["index"]
+                added += 1
+            try:
+                session.commit()
+            except IntegrityError:
+                # Another process indexed some of these blocks at the same time.
+                # Start again from what the table holds; the next sync fills in the rest.
+                session.rollback()
+                self._load_bloom(session)
+                return 0
+
+            if self.bloom.count > self.bloom.capacity:
+                # Past capacity the false-positive rate climbs; resize
+                self._load_bloom(session)
+        return added
+
+    def lookup(self, value: str, session: Session) -> List[ChainHashIndex]:
+        """Index rows for ``value`` (a block hash or features_hash), oldest block first."""
+        if self.bloom is None or value not in self.bloom:
+            # A negative is only trusted once the filter covers the whole chain
+            self.blockchain_manager.refresh_if_changed()
+            if self.bloom is None or self.indexed_upto < len(self.blockchain_manager):
+                self.sync()
+            if value not in self.bloom and self.indexed_upto >= len(self.blockchain_manager):
+                metrics.record_count(LOOKUPS, result="bloom_negative")
+                return []
+
+        rows = session.exec(
+            select(ChainHashIndex).where(ChainHashIndex.hash == value).order_by(ChainHashIndex.block_index)
+        ).all()
+        metrics.record_count(LOOKUPS, result="hit" if rows else "false_positive")
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        if self.bloom is None:
+            return {"indexed_upto": self.indexed_upto, "bloom_loaded": False}
+        return {
+            "indexed_upto": self.indexed_upto,
+            "bloom_loaded": True,
+            "bloom_entries": self.bloom.count,
+            "bloom_capacity": self.bloom.capacity,
+            "bloom_bytes": len(self.bloom.bits),
+            "bloom_hashes": self.bloom.num_hashes,
+        }
@@ -16,9 +16,11 @@ import logging
 import os
 import re
 from typing import Dict, Any, Tuple, List, Optional
-import google.generativeai as genai
 from dotenv import load_dotenv
 
+import metrics
+from gemini_client import create_gemini_model
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -95,13 +97,9 @@ class DataQualityAgent:
     """Validate and repair clinical features using rules and Gemini."""
 
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-        else:
-            self.model = None
+        self.model = create_gemini_model(agent="quality")
 
+    @metrics.timed(metrics.AGENT_SECONDS, agent="quality", operation="validate")
     def validate(self, raw_features: Dict[str, Any]) -> Dict[str, Any]:
         clean_features = {k: None for k in CANONICAL_FEATURES}
         missing_fields = []
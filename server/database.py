@@ -3,9 +3,12 @@
 Uses SQLModel (Pydantic + SQLAlchemy) to connect to Postgres via DATABASE_URL.
 """
 import os
+import time
 from sqlmodel import SQLModel, create_engine, Session
 from dotenv import load_dotenv
 
+import metrics
+
 load_dotenv()
 
 # Get DATABASE_URL from environment
@@ -20,6 +23,11 @@ if not DATABASE_URL:
 # Create engine
 engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True, pool_recycle=1800)
 
+if hasattr(engine.pool, "checkedout"):
+    metrics.gauge(
+        "mediguard_db_pool_checked_out", "Connections currently checked out of the pool"
+    ).labels().set_function(engine.pool.checkedout)
+
 def drop_all_tables():
     """Drop all tables - use with caution!"""
     SQLModel.metadata.drop_all(engine)
@@ -36,4 +44,9 @@ def reset_database():
 def get_session():
     """Dependency for FastAPI to get a database session."""
     with Session(engine) as session:
+        if metrics.enabled():
+            # Acquire the connection up front so pool wait is measured on its own
+            started = time.perf_counter()
+            session.connection()
+            metrics.record_duration(metrics.DB_CHECKOUT_SECONDS, time.perf_counter() - started)
         yield session
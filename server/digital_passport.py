@@ -1,31 +1,59 @@
+import os
 import json
+import time
+import uuid
 import hashlib
 import hmac
+import logging
 import datetime
-from typing import Dict, Any
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from sqlmodel import Session, select
-from models import PatientReport, DigitalPassport
+from models import PatientReport, DigitalPassport, PassportAuditEvent
 from blockchain_manager import BlockchainManager
+from signing import signer_from_pem
 from merkle_tree import MerkleTree
 from qr_code_generator import QRCodeGenerator
+from passport_token import PassportTokenSigner, TokenError
+from verification_cache import VerificationCache
+
+logger = logging.getLogger(__name__)
+
+# Signer loaded once per pool worker by _init_signing_worker
+_worker_signer = None
+
+def _init_signing_worker(algorithm: str, private_key_pem: bytes):
+    global _worker_signer
+    _worker_signer = signer_from_pem(algorithm, private_key_pem)
+
+def _sign_in_worker(data: bytes) -> str:
+    return _worker_signer.sign(data)
 
 class PassportManager:
     """
     Manages the issuance and verification of Digital Passports.
     """
-    def __init__(self, blockchain_manager: BlockchainManager, secret_key: str = "super_secret_key"):
+    def __init__(self, blockchain_manager: BlockchainManager, secret_key: str = "super_secret_key",
+                 signing_workers: int = None, parallel_threshold: int = 8,
+                 token_signer: Optional[PassportTokenSigner] = None, compact_tokens: bool = False,
+                 verification_cache: Optional[VerificationCache] = None):
         self.blockchain_manager = blockchain_manager
         self.secret_key = secret_key
+        # Repeat scans of a valid (passport_id, token) are answered from memory
+        self.verification_cache = verification_cache
+        # Compact tokens put the signed claims in the QR URL so scans verify without the DB
+        self.token_signer = token_signer
+        self.compact_tokens = compact_tokens and token_signer is not None
+        # Signing (RSA-4096 especially) is CPU bound; bulk issuance spreads it across processes
+        self.signing_workers = signing_workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self._signing_pool = None
+        self._pool_lock = threading.Lock()
 
-    def issue_passport(self, report_id: int, session: Session) -> Dict[str, Any]:
-        """
-        Issues a new Digital Passport for a given patient report.
-        """
-        # 1. Fetch Report
-        report = session.get(PatientReport, report_id)
-        if not report:
-            raise ValueError("Report not found")
-            
+    def _prepare(self, report: PatientReport) -> Dict[str, Any]:
+        """Build the signed payload, its hash and HMAC token for a report."""
         if not report.blockchain_block_index:
             raise ValueError("Report not yet on blockchain")
 
@@ -67,54 +95,203 @@ class PassportManager:
             passport_json.encode(), 
             hashlib.sha256
         ).hexdigest()
-        
-        # 5. Sign with RSA
-        rsa_signature = self.blockchain_manager.sign_data(passport_hash.encode())
-        
-        # 6. Generate QR Code
-        # Create a temporary passport ID to include in URL (will be overwritten by DB default, but we need it now)
-        # Actually, we should let DB generate ID or generate it here.
-        # Let's generate it here to be safe.
-        import uuid
+
+        return {
+            "passport_data": passport_data,
+            "passport_hash": passport_hash,
+            "hmac_token": hmac_token,
+        }
+
+    def _build_passport(self, report: PatientReport, prepared: Dict[str, Any], signature: str) -> DigitalPassport:
+        passport_data = prepared["passport_data"]
         passport_id = str(uuid.uuid4())
-        
-        verification_url = QRCodeGenerator.create_verification_url(passport_id, hmac_token)
-        qr_png = QRCodeGenerator.generate_png_base64(verification_url)
-        qr_svg = QRCodeGenerator.generate_svg(verification_url)
-        
-        # 7. Save to DB
-        passport = DigitalPassport(
+
+        expiry_timestamp = None
+        url_token = prepared["hmac_token"]
+        if self.compact_tokens:
+            issued_at = int(time.time())
+            url_token = self.token_signer.issue({
+                "pid": passport_id,
+                "rid": report.id,
+                "hs": report.health_score,
+                "tc": report.triage_category,
+                "pc": passport_data["predicted_class"],
+                "bi": report.blockchain_block_index,
+                "ph": prepared["passport_hash"],
+            }, issued_at=issued_at)
+            expiry_timestamp = datetime.datetime.fromtimestamp(issued_at + self.token_signer.ttl_seconds).isoformat()
+
+        # The QR image itself is rendered on demand from this URL (GET /api/passport/{id}/qr)
+        verification_url = QRCodeGenerator.create_verification_url(passport_id, url_token)
+
+        return DigitalPassport(
             passport_id=passport_id,
             patient_report_id=report.id,
             health_score=report.health_score,
             triage_category=report.triage_category,
             predicted_class=passport_data["predicted_class"],
             issued_timestamp=passport_data["issued_timestamp"],
+            expiry_timestamp=expiry_timestamp,
             blockchain_block_index=report.blockchain_block_index,
-            merkle_proof_json=json.dumps(merkle_proof),
-            passport_hash=passport_hash,
-            hmac_token=hmac_token,
-            rsa_signature=rsa_signature,
-            qr_code_png_base64=qr_png,
-            qr_code_svg=qr_svg,
+            merkle_proof_json=json.dumps(passport_data["merkle_proof"]),
+            passport_hash=prepared["passport_hash"],
+            hmac_token=prepared["hmac_token"],
+            rsa_signature=signature,
+            signature_algorithm=self.blockchain_manager.signing_algorithm,
             verification_url=verification_url,
-            audit_trail_json=json.dumps([{"action": "issued", "timestamp": datetime.datetime.now().isoformat()}])
         )
-        
+
+    def issue_passport(self, report_id: int, session: Session) -> Dict[str, Any]:
+        """
+        Issues a new Digital Passport for a given patient report.
+        """
+        # 1. Fetch Report
+        report = session.get(PatientReport, report_id)
+        if not report:
+            raise ValueError("Report not found")
+
+        prepared = self._prepare(report)
+
+        # 5. Sign with the chain's signing key
+        signature = self.blockchain_manager.sign_data(prepared["passport_hash"].encode())
+
+        # 6. Save to DB
+        passport = self._build_passport(report, prepared, signature)
         session.add(passport)
+        self.record_event(session, passport.passport_id, "issued")
         session.commit()
         session.refresh(passport)
         
         return passport
 
+    def issue_passports_bulk(self, report_ids: List[int], session: Session) -> Dict[str, Any]:
+        """
+        Issue passports for many reports at once.
+
+        Reports are fetched in one query, signatures are computed across the
+        signing process pool, and all passports are inserted in a single
+        transaction. Reports that cannot be issued are reported individually;
+        if the commit itself fails, every report is marked failed.
+        """
+        report_ids = list(dict.fromkeys(report_ids))
+        reports = session.exec(select(PatientReport).where(PatientReport.id.in_(report_ids))).all()
+        by_id = {report.id: report for report in reports}
+
+        results: Dict[int, Dict[str, Any]] = {}
+        pending = []
+        for report_id in report_ids:
+            report = by_id.get(report_id)
+            if report is None:
+                results[report_id] = {"report_id": report_id, "status": "error", "error": "Report not found"}
+                continue
+            try:
+                pending.append((report, self._prepare(report)))
+            except ValueError as e:
+                results[report_id] = {"report_id": report_id, "status": "error", "error": str(e)}
+
+        hashes = [prepared["passport_hash"].encode() for _, prepared in pending]
+        signatures = self._sign_many(hashes)
+
+        passports = []
+        for (report, prepared), signature in zip(pending, signatures):
+            if isinstance(signature, Exception):
+                results[report.id] = {"report_id": report.id, "status": "error", "error": f"Signing failed: {signature}"}
+                continue
+            passport = self._build_passport(report, prepared, signature)
+            passports.append(passport)
+            results[report.id] = {"report_id": report.id, "status": "issued", "passport_id": passport.passport_id}
+
+        if passports:
+            try:
+                session.add_all(passports)
+                for passport in passports:
+                    self.record_event(session, passport.passport_id, "issued")
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Bulk passport insert failed: {e}")
+                for passport in passports:
+                    results[passport.patient_report_id] = {
+                        "report_id": passport.patient_report_id,
+                        "status": "error",
+                        "error": f"Database error: {e}",
+                    }
+
+        ordered = [results[report_id] for report_id in report_ids]
+        issued = sum(1 for r in ordered if r["status"] == "issued")
+        return {"requested": len(report_ids), "issued": issued, "failed": len(ordered) - issued, "results": ordered}
+
+    def _sign_many(self, payloads: List[bytes]) -> List[Any]:
+        """Sign each payload, in the process pool when the batch is large enough to pay for it."""
+        if len(payloads) < self.parallel_threshold or self.signing_workers <= 1:
+            signatures = []
+            for payload in payloads:
+                try:
+                    signatures.append(self.blockchain_manager.sign_data(payload))
+                except Exception as e:
+                    signatures.append(e)
+            return signatures
+
+        pool = self._get_signing_pool()
+        futures = [pool.submit(_sign_in_worker, payload) for payload in payloads]
+        signatures = []
+        for future in futures:
+            try:
+                signatures.append(future.result())
+            except Exception as e:
+                signatures.append(e)
+        return signatures
+
+    def _get_signing_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._signing_pool is None:
+                # spawn: forking a server process with live threads is not safe
+                self._signing_pool = ProcessPoolExecutor(
+                    max_workers=self.signing_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_signing_worker,
+                    initargs=(self.blockchain_manager.signing_algorithm, self.blockchain_manager.private_key_pem()),
+                )
+            return self._signing_pool
+
+    def shutdown(self):
+        """Stop the signing pool, if one was started."""
+        with self._pool_lock:
+            if self._signing_pool is not None:
+                self._signing_pool.shutdown(wait=True)
+                self._signing_pool = None
+
     def verify_passport(self, passport_id: str, token: str, session: Session) -> Dict[str, Any]:
         """
         Verifies a passport's validity.
         """
+        cache = self.verification_cache
+        if cache is not None:
+            cached = cache.get(passport_id, token)
+            if cached is not None:
+                # One indexed column read, so a revocation by any worker is seen at once
+                still_valid = session.exec(
+                    select(DigitalPassport.is_valid).where(DigitalPassport.passport_id == passport_id)
+                ).first()
+                if still_valid:
+                    self.log_verification(session, passport_id, cached)
+                    return cached
+                cache.invalidate(passport_id)
+
         passport = session.exec(select(DigitalPassport).where(DigitalPassport.passport_id == passport_id)).first()
         
         if not passport:
             return {"status": "Invalid", "reason": "Passport not found"}
+
+        result = self._check_passport(passport, token)
+        if cache is not None and result["status"] == "Valid":
+            cache.put(passport_id, token, result)
+        self.log_verification(session, passport_id, result)
+        return result
+
+    def _check_passport(self, passport: DigitalPassport, token: str) -> Dict[str, Any]:
+        if not passport.is_valid:
+            return {"status": "Revoked", "reason": "Passport has been revoked"}
             
         # 1. Verify HMAC
         # Reconstruct data
@@ -144,16 +321,131 @@ class PassportManager:
             if not hmac.compare_digest(passport.hmac_token, token):
                 return {"status": "Tampered", "reason": "Invalid HMAC token"}
 
-        # 2. Verify RSA Signature
+        # 2. Verify Signature (rows without an algorithm predate Ed25519 and are RSA)
         passport_hash = hashlib.sha256(passport_json.encode()).hexdigest()
-        if not self.blockchain_manager.verify_signature(passport_hash.encode(), passport.rsa_signature):
-             return {"status": "Tampered", "reason": "Invalid RSA signature"}
+        if not self.blockchain_manager.verify_signature(
+            passport_hash.encode(), passport.rsa_signature, algorithm=passport.signature_algorithm
+        ):
+             return {"status": "Tampered", "reason": "Invalid signature"}
              
         # 3. Verify Blockchain (Optional but recommended)
         # Check if block exists and hash matches...
         
         return {
             "status": "Valid",
-            "passport": passport,
+            # A snapshot, so the result can be cached and outlive the session
+            "passport": passport.model_dump(),
             "details": "All security checks passed."
         }
+
+    def verify_token(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a compact passport token without touching the database.
+
+        Only the signature, expiry and in-memory revocation list are checked.
+        """
+        if self.token_signer is None:
+            return {"status": "Invalid", "reason": "Token verification is not configured"}
+        try:
+            claims = self.token_signer.verify(token)
+        except TokenError as e:
+            return {"status": e.status, "reason": e.reason}
+        return {
+            "status": "Valid",
+            "passport": {
+                "passport_id": claims["pid"],
+                "patient_report_id": claims.get("rid"),
+                "health_score": claims.get("hs"),
+                "triage_category": claims.get("tc"),
+                "predicted_class": claims.get("pc"),
+                "blockchain_block_index": claims.get("bi"),
+                "passport_hash": claims.get("ph"),
+                "issued_at": datetime.datetime.fromtimestamp(claims["iat"]).isoformat(),
+                "expires_at": datetime.datetime.fromtimestamp(claims["exp"]).isoformat(),
+            },
+            "details": "Token signature verified offline.",
+        }
+
+    def revoke(self, passport_id: str, session: Session) -> DigitalPassport:
+        """Mark a passport invalid and add it to this worker's revocation list."""
+        passport = session.exec(select(DigitalPassport).where(DigitalPassport.passport_id == passport_id)).first()
+        if not passport:
+            raise ValueError("Passport not found")
+
+        if passport.is_valid:
+            passport.is_valid = False
+            session.add(passport)
+            self.record_event(session, passport_id, "revoked")
+            session.commit()
+            session.refresh(passport)
+
+        if self.verification_cache is not None:
+            self.verification_cache.invalidate(passport_id)
+        if self.token_signer is not None:
+            self.token_signer.revocations.revoke(passport_id, _expiry_epoch(passport.expiry_timestamp))
+        return passport
+
+    @staticmethod
+    def record_event(session: Session, passport_id: str, action: str, status: Optional[str] = None,
+                     detail: Optional[str] = None):
+        """Add an audit event to ``session``; it is written with the caller's commit."""
+        session.add(PassportAuditEvent(passport_id=passport_id, action=action, status=status, detail=detail))
+
+    def log_verification(self, session: Session, passport_id: str, result: Dict[str, Any]):
+        """Record a scan: one insert, and a failed audit write does not fail the scan."""
+        try:
+            self.record_event(session, passport_id, "verified", result.get("status"), result.get("reason"))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Could not record verification of passport {passport_id}: {e}")
+
+    @staticmethod
+    def audit_history(passport: DigitalPassport, session: Session, limit: int = 50,
+                      before_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        A page of the passport's audit events, newest first. Pass the returned
+        ``next_before_id`` as ``before_id`` for the next page (keyset
+        pagination on the (passport_id, id) index, so deep pages stay cheap).
+        """
+        query = select(PassportAuditEvent).where(PassportAuditEvent.passport_id == passport.passport_id)
+        if before_id is not None:
+            query = query.where(PassportAuditEvent.id < before_id)
+        rows = session.exec(query.order_by(PassportAuditEvent.id.desc()).limit(limit + 1)).all()
+        events = rows[:limit]
+
+        history = {
+            "passport_id": passport.passport_id,
+            "events": [
+                {
+                    "id": event.id,
+                    "action": event.action,
+                    "status": event.status,
+                    "detail": event.detail,
+                    "timestamp": event.created_at.isoformat(),
+                }
+                for event in events
+            ],
+            "next_before_id": events[-1].id if len(rows) > limit else None,
+        }
+        if before_id is None and passport.audit_trail_json:
+            # Events recorded before the audit table existed
+            history["legacy_events"] = json.loads(passport.audit_trail_json)
+        return history
+
+    @staticmethod
+    def revoked_passports(session: Session) -> List[Tuple[str, Optional[float]]]:
+        """(passport_id, expiry epoch) of every revoked passport, for the revocation list."""
+        rows = session.exec(
+            select(DigitalPassport.passport_id, DigitalPassport.expiry_timestamp).where(DigitalPassport.is_valid == False)  # noqa: E712
+        ).all()
+        return [(passport_id, _expiry_epoch(expiry)) for passport_id, expiry in rows]
+
+
+def _expiry_epoch(expiry_timestamp: Optional[str]) -> Optional[float]:
+    if not expiry_timestamp:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(expiry_timestamp).timestamp()
+    except ValueError:
+        return None
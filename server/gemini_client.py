@@ -0,0 +1,95 @@
+"""Gemini model factory shared by the agents.
+
+Returns a configured ``GenerativeModel`` when ``GEMINI_API_KEY`` is set, or
+``None`` so the agents fall back to their regex/mock paths.
+
+Setting ``GEMINI_STUB=1`` returns an offline stub instead. It answers the
+agents' prompts with realistic JSON (optionally after ``GEMINI_STUB_LATENCY_MS``
+of simulated network delay) so benchmarks and load tests exercise the same
+parsing code as production without any network access.
+
+Every model handed out is wrapped so calls, failures and latency are counted
+per agent in the metrics registry.
+"""
+import os
+import json
+import time
+import logging
+from typing import Optional
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL_NAME = "gemini-1.5-flash"
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGeminiModel:
+    """Offline stand-in for ``genai.GenerativeModel`` used by benchmarks."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+
+    def generate_content(self, prompt: str) -> _StubResponse:
+        if self.latency:
+            time.sleep(self.latency)
+
+        if prompt.startswith("Extract clinical parameters"):
+            # Answer like Gemini would, using the regex extractor on the text
+            from intake_extraction_agent import regex_extract_all
+            text = prompt.split("Text: ", 1)[-1]
+            return _StubResponse("```json\n" + json.dumps(regex_extract_all(text)) + "\n```")
+
+        if "physiology range" in prompt:
+            return _StubResponse("None")
+
+        if prompt.startswith("Act as an advanced medical AI"):
+            return _StubResponse(json.dumps({
+                "persistence_risks": [],
+                "improvement_gains": [],
+                "novel_insights": []
+            }))
+
+        return _StubResponse("{}")
+
+
+class InstrumentedGeminiModel:
+    """Counts and times ``generate_content`` calls for one agent."""
+
+    def __init__(self, model, agent: str):
+        self._model = model
+        self.agent = agent
+
+    def generate_content(self, prompt: str):
+        metrics.record_count(metrics.GEMINI_CALLS, agent=self.agent)
+        started = time.perf_counter()
+        try:
+            return self._model.generate_content(prompt)
+        except Exception:
+            metrics.record_count(metrics.GEMINI_FAILURES, agent=self.agent)
+            raise
+        finally:
+            metrics.record_duration(metrics.GEMINI_SECONDS, time.perf_counter() - started, agent=self.agent)
+
+
+def create_gemini_model(agent: str = "unknown") -> Optional[object]:
+    """Return the Gemini model for the agents, an offline stub, or None."""
+    if os.getenv("GEMINI_STUB") == "1":
+        model = StubGeminiModel(latency_ms=float(os.getenv("GEMINI_STUB_LATENCY_MS", "0")))
+    else:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return None
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return InstrumentedGeminiModel(model, agent)
@@ -0,0 +1,65 @@
+"""Gunicorn configuration for running MediGuard with several worker processes.
+
+    cd server && gunicorn -c gunicorn_conf.py main:app
+
+With ``preload_app`` the master imports ``main`` once, so the CatBoost model,
+its SHAP explainer and pandas are built before forking and every worker
+shares those pages copy-on-write instead of loading its own copy. Set
+``PRELOAD_APP=0`` to fall back to per-worker loading.
+
+Environment:
+    WEB_CONCURRENCY       number of workers (default: CPU count)
+    BIND                  listen address (default: 0.0.0.0:8000)
+    PRELOAD_APP           1 to build the model in the master (default: 1)
+    MEMORY_REPORT_DELAY   seconds after startup to log the per-worker
+                          memory report (default: 10, 0 disables)
+"""
+import gc
+import os
+import logging
+import threading
+import multiprocessing
+
+from memory_report import log_memory_report, process_memory
+
+logger = logging.getLogger("MediGuard-Server")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_APP", "1") == "1"
+
+MEMORY_REPORT_DELAY = float(os.getenv("MEMORY_REPORT_DELAY", "10"))
+
+
+def _log_startup_report(server):
+    """Log resident and shared memory for the master and every live worker."""
+    master = log_memory_report("master")
+    total_pss = master.get("pss_mb", 0)
+    for pid in list(server.WORKERS.keys()):
+        stats = log_memory_report("worker", pid)
+        total_pss += stats.get("pss_mb", 0)
+    logger.info(
+        f"Memory [total]: {len(server.WORKERS)} workers, proportional footprint {round(total_pss, 1)} MB"
+    )
+
+
+def when_ready(server):
+    if preload_app:
+        # Move everything loaded so far into the permanent generation so the
+        # collector never touches (and un-shares) those pages in the workers
+        gc.freeze()
+        logger.info(f"Preloaded app in master, {gc.get_freeze_count()} objects frozen")
+    log_memory_report("master")
+
+    if MEMORY_REPORT_DELAY > 0:
+        timer = threading.Timer(MEMORY_REPORT_DELAY, _log_startup_report, args=(server,))
+        timer.daemon = True
+        timer.start()
+
+
+def post_worker_init(worker):
+    stats = process_memory()
+    logger.info(
+        f"Worker {worker.pid} booted: rss={stats.get('rss_mb')} MB, shared={stats.get('shared_mb')} MB"
+    )
@@ -0,0 +1,169 @@
+"""Dynamic micro-batching for CatBoost inference.
+
+Concurrent ``/api/analyze`` requests each score a single row. Instead of one
+``predict`` call per request, rows are queued and a collector task gathers
+them for at most ``max_wait_ms`` or until ``max_batch_size`` rows are
+waiting, scores them with one ``predict`` call in a worker thread, and hands
+every caller back its own row of logits.
+
+Rows are grouped by the model snapshot the caller holds, so a hot swap in
+the middle of a batch never scores a request with a different model.
+"""
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+BATCH_SIZE = metrics.histogram(
+    "mediguard_inference_batch_size", "Rows scored per CatBoost predict call", buckets=BATCH_SIZE_BUCKETS
+)
+BATCH_WAIT_SECONDS = metrics.histogram(
+    "mediguard_inference_queue_wait_seconds", "Time a row waits in the batch queue"
+)
+
+
+class _Pending:
+    __slots__ = ("loaded_model", "row", "columns", "future", "enqueued_at")
+
+    def __init__(self, loaded_model, row: np.ndarray, columns: List[str], future: asyncio.Future):
+        self.loaded_model = loaded_model
+        self.row = row
+        self.columns = columns
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceBatcher:
+    """Collects single-row predict calls from concurrent requests into batches."""
+
+    def __init__(self, max_batch_size: int = 32, max_wait_ms: float = 2.0, enabled: bool = True):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.enabled = enabled and self.max_batch_size > 1
+
+        self._queue: "asyncio.Queue[_Pending]" = None
+        self._loop = None
+        self._task = None
+
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_time = Histogram()
+        self.predict_time = Histogram()
+        self.batches = 0
+        self.rows = 0
+
+    # --- Public API ---
+
+    async def predict(self, loaded_model, input_df: pd.DataFrame) -> np.ndarray:
+        """Return the raw logits (RawFormulaVal) for the single row in ``input_df``."""
+        if not self.enabled:
+            started = time.perf_counter()
+            logits = loaded_model.model.predict(input_df, prediction_type="RawFormulaVal")[0]
+            self._record(1, [0.0], time.perf_counter() - started)
+            return np.asarray(logits)
+
+        self._ensure_running()
+        future = self._loop.create_future()
+        row = input_df.iloc[0].to_numpy(dtype=np.float64)
+        await self._queue.put(_Pending(loaded_model, row, list(input_df.columns), future))
+        return await future
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self.queue_depth(),
+            "batches": self.batches,
+            "rows": self.rows,
+            "batch_size": self.batch_size.snapshot(),
+            "wait_time_seconds": self.wait_time.snapshot(),
+            "predict_time_seconds": self.predict_time.snapshot(),
+        }
+
+    # --- Collector ---
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        # First use, or the previous event loop is gone (e.g. test clients)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._task = loop.create_task(self._collect())
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already queued before waiting for more
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._score(batch)
+            except Exception as e:
+                logger.error(f"Batched inference failed: {e}")
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+
+    async def _score(self, batch: List[_Pending]):
+        started = time.perf_counter()
+        waits = [started - item.enqueued_at for item in batch]
+
+        # Group by model snapshot so each request is scored by the model it started with
+        groups: Dict[int, List[_Pending]] = {}
+        for item in batch:
+            groups.setdefault(id(item.loaded_model), []).append(item)
+
+        loop = asyncio.get_running_loop()
+        for items in groups.values():
+            results = await loop.run_in_executor(None, self._predict_group, items)
+            for item, logits in zip(items, results):
+                if not item.future.done():
+                    item.future.set_result(logits)
+
+        self._record(len(batch), waits, time.perf_counter() - started)
+
+    @staticmethod
+    def _predict_group(items: List[_Pending]) -> np.ndarray:
+        frame = pd.DataFrame(np.vstack([item.row for item in items]), columns=items[0].columns)
+        return np.asarray(items[0].loaded_model.model.predict(frame, prediction_type="RawFormulaVal"))
+
+    def _record(self, size: int, waits: List[float], predict_seconds: float):
+        self.batches += 1
+        self.rows += size
+        self.batch_size.observe(size)
+        for w in waits:
+            self.wait_time.observe(w)
+        self.predict_time.observe(predict_seconds)
+        if metrics.enabled():
+            BATCH_SIZE.labels().observe(size)
+            for w in waits:
+                BATCH_WAIT_SECONDS.labels().observe(w)
@@ -15,9 +15,11 @@ import json
 import os
 import logging
 from typing import Dict, Any, Optional, List
-import google.generativeai as genai
 from dotenv import load_dotenv
 
+import metrics
+from gemini_client import create_gemini_model
+
 # Load environment variables
 load_dotenv()
 
@@ -114,6 +116,7 @@ def regex_extract_all(text: str) -> Dict[str, Any]:
 
     return results
 
+@metrics.timed(metrics.AGENT_SECONDS, agent="intake", operation="pdf_text")
 def extract_text_from_pdf(pdf_path: str) -> str:
     """Extract text from a PDF file using pdfplumber."""
     if pdfplumber is None:
@@ -135,15 +138,12 @@ class IntakeExtractionAgent:
     """Agent that extracts structured clinical features using Gemini."""
 
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-        else:
-            self.model = None
+        self.model = create_gemini_model(agent="intake")
+        if self.model is None:
             logger.warning("No GEMINI_API_KEY found. Using regex fallback only.")
         logger.info(f"IntakeExtractionAgent initialized. Gemini available: {self.model is not None}")
 
+    @metrics.timed(metrics.AGENT_SECONDS, agent="intake", operation="extract_from_text")
     def extract_from_text(self, raw_text: str) -> Dict[str, Any]:
         """Extract features from raw text using Gemini + Regex."""
         mode = "RAW_TEXT_MODE"
@@ -196,6 +196,7 @@ class IntakeExtractionAgent:
         result["mode"] = "PDF_MODE"
         return result
 
+    @metrics.timed(metrics.AGENT_SECONDS, agent="intake", operation="unify_features")
     def unify_features(self, extraction_result: Dict[str, Any]) -> Dict[str, Any]:
         """Unify extracted data into canonical format."""
         raw = extraction_result.get("raw_extraction", {})
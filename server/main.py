@@ -1,23 +1,52 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import json
+import hmac
 import hashlib
 import datetime
 import logging
 import os
 from dotenv import load_dotenv
-import joblib
 import pandas as pd
 import numpy as np
 from sqlmodel import Session, select
 from passlib.context import CryptContext
-import bcrypt
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CATBOOST_MODEL_PATH = os.path.join(BASE_DIR, "mediguard_catboost.pkl")
-catboost_model = joblib.load(CATBOOST_MODEL_PATH)
+MODEL_DIR = os.getenv("MODEL_DIR", BASE_DIR)
+
+import metrics
+from model_manager import ModelManager
+from prediction_cache import PredictionCache
+from inference_batcher import InferenceBatcher
+from request_profiler import RequestProfiler, ProfileStore, ProfilingMiddleware
+from memory_diagnostics import MemoryDiagnostics, deep_sizeof
+
+# Native .cbm model with hot reload; MODEL_VERSION pins a specific artifact
+model_manager = ModelManager(
+    MODEL_DIR,
+    pinned_version=os.getenv("MODEL_VERSION"),
+    watch_interval=float(os.getenv("MODEL_WATCH_INTERVAL", "5")),
+)
+model_manager.load()
+
+# Scored results keyed on the scaled feature vector + model version
+prediction_cache = PredictionCache(capacity=int(os.getenv("PREDICTION_CACHE_SIZE", "1024")))
+
+# Concurrent single-row predicts are scored together in one CatBoost call
+inference_batcher = InferenceBatcher(
+    max_batch_size=int(os.getenv("INFERENCE_BATCH_MAX_SIZE", "32")),
+    max_wait_ms=float(os.getenv("INFERENCE_BATCH_MAX_WAIT_MS", "2")),
+    enabled=os.getenv("INFERENCE_BATCHING", "1") == "1",
+)
+
+# Values read at scrape time from components that already track them
+metrics.gauge("mediguard_inference_queue_depth", "Rows waiting in the inference batch queue").labels().set_function(inference_batcher.queue_depth)
+metrics.gauge("mediguard_prediction_cache_size", "Entries in the prediction cache").labels().set_function(lambda: len(prediction_cache))
 
 LABEL_MAP = {0: 'Anemia', 1: 'Diabetes', 2: 'Healthy', 3: 'Thalasse', 4: 'Thromboc'}
 
@@ -28,8 +57,19 @@ from scaling_bridge import ScalingBridge
 from predictive_agent import PredictiveAgent
 
 # Import Database
-from database import create_db_and_tables, get_session
-from models import PatientReport, User
+from database import create_db_and_tables, get_session, engine
+from models import PatientReport, User, DigitalPassport, ChainCommitEntry
+from qr_code_generator import QRCodeGenerator
+from blockchain_manager import BlockchainManager
+from signing import RSA_PSS
+from chain_store import create_chain_store
+from digital_passport import PassportManager
+from chain_commit_queue import ChainCommitQueue, merkle_leaf
+from chain_index import ChainIndex
+from merkle_store import MerkleStore
+from passport_token import PassportTokenSigner, load_or_generate_key, is_compact_token
+from verification_cache import VerificationCache
+from auth_tokens import AccessTokenSigner, AuthTokenError, PasswordHasher, PasswordHasherBusy, load_or_generate_secret
 
 load_dotenv()
 
@@ -47,6 +87,70 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 def on_startup():
     create_db_and_tables()
     logger.info("Database tables created successfully")
+    # Started per worker process so the watcher survives forking servers
+    model_manager.start_watching()
+    # Revocations made on other workers reach this one via the database
+    passport_token_signer.revocations.replace(_load_revoked_passports())
+    passport_token_signer.revocations.start_refreshing(
+        _load_revoked_passports, float(os.getenv("PASSPORT_REVOCATION_REFRESH", "30"))
+    )
+    commit_queue.start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    commit_queue.stop()
+    passport_manager.shutdown()
+    password_hasher.shutdown()
+    passport_token_signer.revocations.stop_refreshing()
+
+# Admin-only endpoints require this token in the X-Admin-Token header
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency guarding admin endpoints. Disabled entirely when ADMIN_TOKEN is unset."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+# Access tokens issued at login. Every worker must share the secret: set
+# AUTH_TOKEN_SECRET when running on several hosts.
+access_tokens = AccessTokenSigner(
+    os.getenv("AUTH_TOKEN_SECRET", "").encode()
+    or load_or_generate_secret(os.getenv("AUTH_TOKEN_SECRET_FILE", "auth_token_secret.key")),
+    ttl_seconds=int(os.getenv("AUTH_TOKEN_TTL", "3600")),
+)
+
+# bcrypt gets its own bounded pool so login bursts cannot starve other endpoints
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("BCRYPT_WORKERS", "2")),
+    max_pending=int(os.getenv("BCRYPT_MAX_PENDING", "32")),
+    rounds=int(os.getenv("BCRYPT_ROUNDS", "12")),
+)
+
+async def get_current_user(authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Dependency: claims of the Bearer access token (sub, pid, name, email). No database lookup."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return access_tokens.verify(token.strip())
+    except AuthTokenError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+async def get_optional_user(authorization: Optional[str] = Header(None)) -> Optional[Dict[str, Any]]:
+    """Like get_current_user, but anonymous requests get None (an invalid token is still rejected)."""
+    if not authorization:
+        return None
+    return await get_current_user(authorization)
+
+# On-demand profiling: X-Profile-Token: <ADMIN_TOKEN>, or a random sample of requests
+request_profiler = RequestProfiler(
+    ProfileStore(os.getenv("PROFILE_DIR", "profiles")),
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "5")),
+)
+app.add_middleware(ProfilingMiddleware, admin_token=ADMIN_TOKEN)
 
 # CORS
 app.add_middleware(
@@ -65,31 +169,204 @@ predictive_agent = PredictiveAgent()
 
 # Blockchain Simulation
 BLOCKCHAIN_FILE = "blockchain.json"
+# "file" (JSON file, single host), "sql" (BlockRecord table shared by all nodes)
+# or "segmented" (sealed, signed segments under BLOCKCHAIN_SEGMENT_DIR)
+BLOCKCHAIN_BACKEND = os.getenv("BLOCKCHAIN_BACKEND", "file")
+BLOCKCHAIN_VERIFY_PROGRESS_EVERY = int(os.getenv("BLOCKCHAIN_VERIFY_PROGRESS_EVERY", "1000"))
 
-def load_blockchain():
-    try:
-        with open(BLOCKCHAIN_FILE, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
-
-def append_to_blockchain(data: dict):
-    chain = load_blockchain()
-    prev_hash = chain[-1]["hash"] if chain else "0" * 64
-    
-    block = {
-        "index": len(chain) + 1,
-        "timestamp": datetime.datetime.now().isoformat(),
-        "data": data,
-        "prev_hash": prev_hash,
-        "hash": hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+# Passport signing uses the same RSA key as the chain
+blockchain_manager = BlockchainManager(
+    BLOCKCHAIN_FILE,
+    store=create_chain_store(
+        BLOCKCHAIN_BACKEND, BLOCKCHAIN_FILE, engine,
+        segment_dir=os.getenv("BLOCKCHAIN_SEGMENT_DIR", "blockchain_segments"),
+        segment_size=int(os.getenv("BLOCKCHAIN_SEGMENT_SIZE", "10000")),
+        compress_segments=os.getenv("BLOCKCHAIN_SEGMENT_COMPRESS", "1") == "1",
+    ),
+)
+
+# Block hash / features_hash -> block, kept current by the commit worker
+chain_index = ChainIndex(
+    blockchain_manager, engine, bloom_capacity=int(os.getenv("CHAIN_INDEX_BLOOM_CAPACITY", "1000000"))
+)
+
+# Reports Merkle tree (memory-mapped); empty MERKLE_STORE_FILE disables per-report proofs
+MERKLE_STORE_FILE = os.getenv("MERKLE_STORE_FILE", "merkle_tree.bin")
+merkle_store = MerkleStore(MERKLE_STORE_FILE) if MERKLE_STORE_FILE else None
+
+# Analysis blocks are appended by a background worker, off the request path
+commit_queue = ChainCommitQueue(
+    blockchain_manager,
+    engine,
+    on_commit=chain_index.sync,
+    merkle_store=merkle_store,
+    poll_interval=float(os.getenv("CHAIN_COMMIT_POLL_INTERVAL", "1.0")),
+    batch_size=int(os.getenv("CHAIN_COMMIT_BATCH_SIZE", "100")),
+    max_attempts=int(os.getenv("CHAIN_COMMIT_MAX_ATTEMPTS", "5")),
+)
+
+# Compact Ed25519 tokens in the QR URL let scans verify without a database lookup.
+# The signer is always loaded so tokens already issued stay verifiable if issuance is switched off.
+passport_token_signer = PassportTokenSigner(
+    load_or_generate_key(os.getenv("PASSPORT_TOKEN_KEY_FILE", "passport_token_key.pem")),
+    ttl_seconds=int(os.getenv("PASSPORT_TOKEN_TTL_DAYS", "365")) * 86400,
+)
+passport_manager = PassportManager(
+    blockchain_manager,
+    secret_key=os.getenv("PASSPORT_SECRET_KEY", "super_secret_key"),
+    signing_workers=int(os.getenv("PASSPORT_SIGNING_WORKERS", "0")) or None,
+    token_signer=passport_token_signer,
+    compact_tokens=os.getenv("PASSPORT_COMPACT_TOKENS", "1") == "1",
+    verification_cache=VerificationCache(
+        capacity=int(os.getenv("PASSPORT_VERIFY_CACHE_SIZE", "10000")),
+        ttl_seconds=float(os.getenv("PASSPORT_VERIFY_CACHE_TTL", "300")),
+    ),
+)
+
+def _load_revoked_passports():
+    with Session(engine) as session:
+        return PassportManager.revoked_passports(session)
+PASSPORT_BULK_MAX = int(os.getenv("PASSPORT_BULK_MAX", "500"))
+
+# Long-lived structures reported by /api/admin/memory
+memory_diagnostics = MemoryDiagnostics()
+
+def _blockchain_memory() -> Dict[str, Any]:
+    blockchain_manager.refresh_if_changed()
+    stats = blockchain_manager.store.stats()
+    if blockchain_manager.store.backend == "file":
+        # The file store keeps the parsed chain resident; this is its size
+        stats["parsed_bytes"] = deep_sizeof(blockchain_manager.store.blocks)
+    return stats
+
+def _prediction_cache_memory() -> Dict[str, Any]:
+    stats = prediction_cache.stats()
+    stats["approx_bytes"] = deep_sizeof(prediction_cache.values())
+    return stats
+
+def _model_memory() -> Dict[str, Any]:
+    loaded_model = model_manager.current()
+    return {
+        "version": loaded_model.version,
+        "artifact_bytes": os.path.getsize(loaded_model.path) if os.path.exists(loaded_model.path) else 0,
+        "explainer_loaded": loaded_model.explainer is not None,
     }
+
+memory_diagnostics.register_structure("blockchain", _blockchain_memory)
+memory_diagnostics.register_structure("prediction_cache", _prediction_cache_memory)
+memory_diagnostics.register_structure("model", _model_memory)
+memory_diagnostics.register_structure("inference_batcher", lambda: {"queue_depth": inference_batcher.queue_depth()})
+memory_diagnostics.register_structure("qr_cache", QRCodeGenerator.cache_info)
+memory_diagnostics.register_structure("verification_cache", passport_manager.verification_cache.stats)
+memory_diagnostics.register_structure("chain_index", lambda: chain_index.stats())
+if merkle_store is not None:
+    memory_diagnostics.register_structure("merkle_store", merkle_store.stats)
+
+# Translate IntakeExtractionAgent keys to DataQualityAgent keys
+INTAKE_KEY_MAPPING = {
+    "blood_pressure_systolic": "systolic_blood_pressure",
+    "blood_pressure_diastolic": "diastolic_blood_pressure",
+    "cholesterol_total": "cholesterol",
+    "age": None,  # Remove age and sex as they're not in the model
+    "sex": None
+}
+
+def map_intake_features(raw_features: Dict[str, Any]) -> Dict[str, Any]:
+    """Rename intake feature keys to the data quality agent's canonical names."""
+    mapped_features = {}
+    for key, value in raw_features.items():
+        if key in INTAKE_KEY_MAPPING:
+            new_key = INTAKE_KEY_MAPPING[key]
+            if new_key is not None:  # Skip None mappings (age, sex)
+                mapped_features[new_key] = value
+        else:
+            mapped_features[key] = value
+    return mapped_features
+
+# Training feature order expected by the CatBoost model
+FEATURE_ORDER = [
+    'Glucose','Cholesterol','Hemoglobin','Platelets','White Blood Cells',
+    'Red Blood Cells','Hematocrit','Mean Corpuscular Volume','Mean Corpuscular Hemoglobin',
+    'Mean Corpuscular Hemoglobin Concentration','Insulin','BMI','Systolic Blood Pressure',
+    'Diastolic Blood Pressure','Triglycerides','HbA1c','LDL Cholesterol','HDL Cholesterol',
+    'ALT','AST','Heart Rate','Creatinine','Troponin','C-reactive Protein'
+]
+
+FEATURE_KEY_MAP = {
+    'Glucose': 'Glucose',
+    'Cholesterol': 'Cholesterol',
+    'Hemoglobin': 'Hemoglobin',
+    'Platelets': 'Platelets',
+    'White Blood Cells': 'White Blood Cells',
+    'Red Blood Cells': 'Red Blood Cells',
+    'Hematocrit': 'Hematocrit',
+    'Mean Corpuscular Volume': 'Mean Corpuscular Volume',
+    'Mean Corpuscular Hemoglobin': 'Mean Corpuscular Hemoglobin',
+    'Mean Corpuscular Hemoglobin Concentration': 'Mean Corpuscular Hemoglobin Concentration',
+    'Insulin': 'Insulin',
+    'BMI': 'BMI',
+    'Systolic Blood Pressure': 'Systolic Blood Pressure',
+    'Diastolic Blood Pressure': 'Diastolic Blood Pressure',
+    'Triglycerides': 'Triglycerides',
+    'HbA1c': 'HbA1c',
+    'LDL Cholesterol': 'LDL Cholesterol',
+    'HDL Cholesterol': 'HDL Cholesterol',
+    'ALT': 'ALT',
+    'AST': 'AST',
+    'Heart Rate': 'Heart Rate',
+    'Creatinine': 'Creatinine',
+    'Troponin': 'Troponin',
+    'C-reactive Protein': 'C-reactive Protein'
+}
+
+def build_input_frame(scaled_features: Dict[str, Any]) -> pd.DataFrame:
+    """Build the single-row model input in training feature order."""
+    return pd.DataFrame(
+        [[scaled_features.get(FEATURE_KEY_MAP[f], 0) for f in FEATURE_ORDER]],
+        columns=FEATURE_ORDER
+    )
+
+def run_inference(loaded_model, input_df: pd.DataFrame, raw_logits: np.ndarray) -> Dict[str, Any]:
+    """Turn one row of CatBoost logits into disease probabilities and explain the top class with SHAP."""
+    # Convert logits to probabilities using SOFTMAX (for multiclass)
+    # This ensures probabilities sum to 1 and are mutually exclusive
+    logits_array = np.array(raw_logits)
+    exp_logits = np.exp(logits_array - np.max(logits_array))  # Subtract max for numerical stability
+    softmax_probs = exp_logits / exp_logits.sum()
     
-    chain.append(block)
-    with open(BLOCKCHAIN_FILE, "w") as f:
-        json.dump(chain, f, indent=2)
+    all_predictions = {LABEL_MAP[c]: float(softmax_probs[c]) for c in range(len(LABEL_MAP))}
     
-    return block
+    # FILTER OUT "Healthy" class since it wasn't trained well
+    # Keep only disease classes: Anemia, Diabetes, Thalasse, Thromboc
+    disease_predictions = {k: v for k, v in all_predictions.items() if k != 'Healthy'}
+    
+    # Renormalize disease probabilities to sum to 1
+    total_disease_prob = sum(disease_predictions.values())
+    if total_disease_prob > 0:
+        predictions = {k: v / total_disease_prob for k, v in disease_predictions.items()}
+    else:
+        # Fallback if somehow all disease probs are 0
+        predictions = disease_predictions
+
+    # Pick the highest probability disease class
+    predicted_class = max(predictions, key=predictions.get)
+    
+     
+    # Get the index of the predicted class for SHAP
+    # We need to find the key in LABEL_MAP that corresponds to predicted_class
+    predicted_class_idx = next(k for k, v in LABEL_MAP.items() if v == predicted_class)
+    
+    # Generate SHAP explanation
+    explanation = predictive_agent.explain_prediction(
+        loaded_model.model, input_df, predicted_class_idx, explainer=loaded_model.explainer
+    )
+
+    return {
+        "raw_logits": [float(v) for v in logits_array],
+        "predictions": predictions,
+        "predicted_class": predicted_class,
+        "explanation": explanation
+    }
 
 # Models
 class AnalysisRequest(BaseModel):
@@ -110,36 +387,45 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
+class BulkPassportRequest(BaseModel):
+    report_ids: List[int]
+
 # Endpoints
 @app.get("/")
 def read_root():
     return {"status": "MediGuard System Operational", "agents": ["Intake", "Quality", "Scaling", "Predictive"]}
 
+def _user_by_email(session: Session, email: str) -> Optional[User]:
+    return session.exec(select(User).where(User.email == email)).first()
+
+def _save_user(session: Session, user: User) -> User:
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+# The auth handlers are async so a login waiting on bcrypt holds no worker
+# thread; their (blocking) database calls go to the threadpool instead.
 @app.post("/api/auth/signup")
-def signup(request: SignupRequest, session: Session = Depends(get_session)):
+async def signup(request: SignupRequest, session: Session = Depends(get_session)):
     """Create a new user account and store in Neon database."""
     logger.info(f"Signup request for email: {request.email}")
     
     try:
         # Check if email already exists
-        existing_user = session.exec(select(User).where(User.email == request.email)).first()
+        existing_user = await run_in_threadpool(_user_by_email, session, request.email)
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
-        # Hash password using bcrypt directly
-        salt = bcrypt.gensalt()
-        hashed_password_bytes = bcrypt.hashpw(request.password.encode('utf-8'), salt)
-        hashed_password = hashed_password_bytes.decode('utf-8') # Store as string
+        # bcrypt runs on the dedicated password pool
+        hashed_password = await password_hasher.hash(request.password)
         
         # Create new user in database
-        new_user = User(
+        new_user = await run_in_threadpool(_save_user, session, User(
             name=request.name,
             email=request.email,
             password_hash=hashed_password
-        )
-        session.add(new_user)
-        session.commit()
-        session.refresh(new_user)
+        ))
         
         logger.info(f"User created successfully: {new_user.id}")
         
@@ -155,24 +441,26 @@ def signup(request: SignupRequest, session: Session = Depends(get_session)):
         }
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many requests, try again shortly", headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Signup failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to create account")
 
 @app.post("/api/auth/login")
-def login(request: LoginRequest, session: Session = Depends(get_session)):
-    """Validate user credentials against Neon database."""
+async def login(request: LoginRequest, session: Session = Depends(get_session)):
+    """Validate user credentials against Neon database and issue an access token."""
     logger.info(f"Login attempt for email: {request.email}")
     
     try:
         # Find user by email
-        user = session.exec(select(User).where(User.email == request.email)).first()
+        user = await run_in_threadpool(_user_by_email, session, request.email)
         
         if not user:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        # Verify password using bcrypt directly
-        if not bcrypt.checkpw(request.password.encode('utf-8'), user.password_hash.encode('utf-8')):
+        # bcrypt runs on the dedicated password pool
+        if not await password_hasher.verify(request.password, user.password_hash):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
         logger.info(f"Login successful for user: {user.id}")
@@ -185,25 +473,52 @@ def login(request: LoginRequest, session: Session = Depends(get_session)):
                 "patient_id": user.patient_id,
                 "name": user.name,
                 "email": user.email
-            }
+            },
+            # Send as "Authorization: Bearer <access_token>" instead of re-sending patient_id
+            "access_token": access_tokens.issue(
+                {"sub": user.id, "pid": user.patient_id, "name": user.name, "email": user.email}
+            ),
+            "token_type": "bearer",
+            "expires_in": access_tokens.ttl_seconds,
         }
 
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many login attempts, try again shortly", headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Login failed: {e}")
         raise HTTPException(status_code=500, detail="Login failed")
 
+@app.get("/api/auth/me")
+async def auth_me(user: Dict[str, Any] = Depends(get_current_user)):
+    """The signed-in user, straight from the access token."""
+    return {
+        "id": user["sub"],
+        "patient_id": user["pid"],
+        "name": user.get("name"),
+        "email": user.get("email"),
+        "expires_at": datetime.datetime.fromtimestamp(user["exp"]).isoformat(),
+    }
+
 @app.post("/api/analyze")
+@request_profiler.profiled("analyze")
 async def analyze_symptoms(
     text: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
     mode: str = Form("text"),
     patient_id: Optional[str] = Form(None),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    user: Optional[Dict[str, Any]] = Depends(get_optional_user)
 ):
     logger.info(f"Received analysis request. Mode: {mode}")
+    if patient_id is None and user is not None:
+        patient_id = user["pid"]
+    stage_timer = metrics.StageTimer(metrics.PIPELINE_STAGE_SECONDS)
     
+    # Snapshot the active model so a hot swap never changes it mid-request
+    loaded_model = model_manager.current()
+
     try:
         # --- Step 1: Intake & Extraction (Agent 1) ---
         if mode == "pdf" and file:
@@ -224,29 +539,16 @@ async def analyze_symptoms(
             extraction_result = intake_agent.extract_from_text(text)
         else:
              raise HTTPException(status_code=400, detail="No text or file provided")
+        stage_timer.mark("extraction")
             
         unified_data = intake_agent.unify_features(extraction_result)
         raw_features = unified_data["features"]
+        stage_timer.mark("unify")
         
         logger.info(f"Raw extracted features: {raw_features}")
         
         # KEY MAPPING FIX: Translate IntakeExtractionAgent keys to DataQualityAgent keys
-        key_mapping = {
-            "blood_pressure_systolic": "systolic_blood_pressure",
-            "blood_pressure_diastolic": "diastolic_blood_pressure",
-            "cholesterol_total": "cholesterol",
-            "age": None,  # Remove age and sex as they're not in the model
-            "sex": None
-        }
-        
-        mapped_features = {}
-        for key, value in raw_features.items():
-            if key in key_mapping:
-                new_key = key_mapping[key]
-                if new_key is not None:  # Skip None mappings (age, sex)
-                    mapped_features[new_key] = value
-            else:
-                mapped_features[key] = value
+        mapped_features = map_intake_features(raw_features)
         
         logger.info(f"Mapped features: {mapped_features}")
         
@@ -254,12 +556,14 @@ async def analyze_symptoms(
         validation_result = quality_agent.validate(mapped_features)
         clean_features = validation_result["clean_features"]
         quality_report = validation_result["data_quality_report"]
+        stage_timer.mark("validation")
         
         logger.info(f"Clean features: {clean_features}")
         
         # --- Step 3: Scaling Bridge (Agent 3) ---
         scaling_result = scaling_bridge.scale_features(clean_features)
         scaled_features = scaling_result["scaled_features"]
+        stage_timer.mark("scaling")
         
         logger.info(f"Scaled features: {scaled_features}")
         
@@ -269,78 +573,25 @@ async def analyze_symptoms(
         # This is just a heuristic for demo purposes
         # --- Step 4: CatBoost ML Prediction ---
 
-        # Convert scaled features to DataFrame (make sure the keys match training features)
-        feature_order = [
-            'Glucose','Cholesterol','Hemoglobin','Platelets','White Blood Cells',
-            'Red Blood Cells','Hematocrit','Mean Corpuscular Volume','Mean Corpuscular Hemoglobin',
-            'Mean Corpuscular Hemoglobin Concentration','Insulin','BMI','Systolic Blood Pressure',
-            'Diastolic Blood Pressure','Triglycerides','HbA1c','LDL Cholesterol','HDL Cholesterol',
-            'ALT','AST','Heart Rate','Creatinine','Troponin','C-reactive Protein'
-        ]
-
-        feature_key_map = {
-            'Glucose': 'Glucose',
-            'Cholesterol': 'Cholesterol',
-            'Hemoglobin': 'Hemoglobin',
-            'Platelets': 'Platelets',
-            'White Blood Cells': 'White Blood Cells',
-            'Red Blood Cells': 'Red Blood Cells',
-            'Hematocrit': 'Hematocrit',
-            'Mean Corpuscular Volume': 'Mean Corpuscular Volume',
-            'Mean Corpuscular Hemoglobin': 'Mean Corpuscular Hemoglobin',
-            'Mean Corpuscular Hemoglobin Concentration': 'Mean Corpuscular Hemoglobin Concentration',
-            'Insulin': 'Insulin',
-            'BMI': 'BMI',
-            'Systolic Blood Pressure': 'Systolic Blood Pressure',
-            'Diastolic Blood Pressure': 'Diastolic Blood Pressure',
-            'Triglycerides': 'Triglycerides',
-            'HbA1c': 'HbA1c',
-            'LDL Cholesterol': 'LDL Cholesterol',
-            'HDL Cholesterol': 'HDL Cholesterol',
-            'ALT': 'ALT',
-            'AST': 'AST',
-            'Heart Rate': 'Heart Rate',
-            'Creatinine': 'Creatinine',
-            'Troponin': 'Troponin',
-            'C-reactive Protein': 'C-reactive Protein'
-        }
-
-        # Build a single-row DataFrame
-        input_df = pd.DataFrame([[scaled_features.get(feature_key_map[f], 0) for f in feature_order]], columns=feature_order)
+        # Convert scaled features to a single-row DataFrame in training feature order
+        input_df = build_input_frame(scaled_features)
 
-        # Predict raw logits
-        raw_logits = catboost_model.predict(input_df, prediction_type='RawFormulaVal')
+        # Identical scaled vectors (common for sparse panels) skip inference entirely
+        cache_key = PredictionCache.make_key(input_df, loaded_model.version)
+        inference = prediction_cache.get(cache_key)
+        stage_timer.mark("cache_lookup")
+        if inference is None:
+            # Predict raw logits (micro-batched with concurrent requests)
+            raw_logits = await inference_batcher.predict(loaded_model, input_df)
+            stage_timer.mark("predict")
+            inference = run_inference(loaded_model, input_df, raw_logits)
+            stage_timer.mark("explain")
+            if "error" not in inference["explanation"]:
+                prediction_cache.put(cache_key, inference)
 
-        # Convert logits to probabilities using SOFTMAX (for multiclass)
-        # This ensures probabilities sum to 1 and are mutually exclusive
-        logits_array = np.array(raw_logits[0])
-        exp_logits = np.exp(logits_array - np.max(logits_array))  # Subtract max for numerical stability
-        softmax_probs = exp_logits / exp_logits.sum()
-        
-        all_predictions = {LABEL_MAP[c]: float(softmax_probs[c]) for c in range(len(LABEL_MAP))}
-        
-        # FILTER OUT "Healthy" class since it wasn't trained well
-        # Keep only disease classes: Anemia, Diabetes, Thalasse, Thromboc
-        disease_predictions = {k: v for k, v in all_predictions.items() if k != 'Healthy'}
-        
-        # Renormalize disease probabilities to sum to 1
-        total_disease_prob = sum(disease_predictions.values())
-        if total_disease_prob > 0:
-            predictions = {k: v / total_disease_prob for k, v in disease_predictions.items()}
-        else:
-            # Fallback if somehow all disease probs are 0
-            predictions = disease_predictions
-
-        # Pick the highest probability disease class
-        predicted_class = max(predictions, key=predictions.get)
-        
-         
-        # Get the index of the predicted class for SHAP
-        # We need to find the key in LABEL_MAP that corresponds to predicted_class
-        predicted_class_idx = next(k for k, v in LABEL_MAP.items() if v == predicted_class)
-        
-        # Generate SHAP explanation
-        explanation = predictive_agent.explain_prediction(catboost_model, input_df, predicted_class_idx)
+        predictions = inference["predictions"]
+        predicted_class = inference["predicted_class"]
+        explanation = inference["explanation"]
 
         # Calculate health score based on disease probability
         # Higher disease probability = Lower health score
@@ -364,7 +615,8 @@ async def analyze_symptoms(
                 "warnings": unified_data["warnings"] + quality_report["warnings"],
                 "predictions": predictions,
                 "predicted_class": predicted_class,
-                "explanation": explanation
+                "explanation": explanation,
+                "model_version": loaded_model.version
             }
         }
 
@@ -377,10 +629,9 @@ async def analyze_symptoms(
             "triage": triage_category,
             "features_hash": hashlib.md5(json.dumps(clean_features, sort_keys=True).encode()).hexdigest()
         }
-        block = append_to_blockchain(log_entry)
-        result["blockchain_log"] = block
-        
         # --- Step 6: Save to Database ---
+        # The report and its queued audit entry are committed together; the
+        # commit worker signs the block and fills in blockchain_hash/index.
         db_report = PatientReport(
             patient_id=patient_id,
             patient_name=clean_features.get("name"),
@@ -393,11 +644,21 @@ async def analyze_symptoms(
             raw_text=text[:500] if text else "PDF Upload",  # Store first 500 chars or PDF label
             features_json=json.dumps(clean_features),
             warnings_json=json.dumps(unified_data["warnings"] + quality_report["warnings"]),
-            blockchain_hash=block["hash"]
+            model_version=loaded_model.version
         )
         session.add(db_report)
+        session.flush()
+        commit_entry = ChainCommitQueue.enqueue(session, log_entry, db_report.id)
         session.commit()
         session.refresh(db_report)
+        commit_queue.notify()
+        stage_timer.mark("database")
+        
+        result["blockchain_log"] = {
+            "status": commit_entry.status,
+            "commit_id": commit_entry.commit_id,
+            "status_url": f"/api/blockchain/commits/{commit_entry.commit_id}"
+        }
         
         result["report_id"] = db_report.id
         logger.info(f"Saved report to database with ID: {db_report.id}")
@@ -419,13 +680,87 @@ def get_detailed_analysis(request: PredictionRequest):
         logger.error(f"Detailed analysis failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/model")
+def get_model_info():
+    """Report the model version currently serving predictions."""
+    info = model_manager.current().info()
+    info["pinned_version"] = model_manager.pinned_version
+    info["prediction_cache"] = prediction_cache.stats()
+    info["inference_batcher"] = inference_batcher.stats()
+    return info
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    """List saved request profiles, newest first."""
+    return {"profiles": request_profiler.store.list()}
+
+@app.get("/api/admin/profiles/{name}", dependencies=[Depends(require_admin)])
+def download_profile(name: str):
+    """Download one profile as collapsed stacks (flamegraph.pl / speedscope input)."""
+    path = request_profiler.store.path_for(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=os.path.basename(path))
+
+@app.get("/api/admin/memory", dependencies=[Depends(require_admin)])
+def memory_report():
+    """Process memory, GC counts, tracemalloc status and sizes of long-lived structures."""
+    return memory_diagnostics.report()
+
+@app.post("/api/admin/memory/tracemalloc/start", dependencies=[Depends(require_admin)])
+def start_tracemalloc(frames: int = 10):
+    """Start allocation tracing. Slows the worker; stop it when done."""
+    if not 1 <= frames <= 100:
+        raise HTTPException(status_code=400, detail="frames must be between 1 and 100")
+    return memory_diagnostics.start(frames)
+
+@app.post("/api/admin/memory/tracemalloc/stop", dependencies=[Depends(require_admin)])
+def stop_tracemalloc():
+    return memory_diagnostics.stop()
+
+@app.post("/api/admin/memory/baseline", dependencies=[Depends(require_admin)])
+def take_memory_baseline():
+    """Snapshot current allocations; /top then reports growth since this point."""
+    try:
+        return memory_diagnostics.take_baseline()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/api/admin/memory/top", dependencies=[Depends(require_admin)])
+def top_allocations(limit: int = 25, group_by: str = "lineno", diff: bool = True):
+    """Largest allocation sites, ranked by growth since the baseline when one exists."""
+    try:
+        return memory_diagnostics.top(limit=limit, group_by=group_by, diff=diff)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint. Disabled (404) unless METRICS_ENABLED=1."""
+    if not metrics.enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+def _stream_json_array(items):
+    yield "["
+    for i, item in enumerate(items):
+        yield ("," if i else "") + json.dumps(item)
+    yield "]"
+
 @app.get("/api/blockchain")
 def get_blockchain():
-    return load_blockchain()
+    # Streamed block by block so the SQL backend never materialises the chain
+    blockchain_manager.refresh_if_changed()
+    return StreamingResponse(_stream_json_array(blockchain_manager.iter_blocks()), media_type="application/json")
 
 @app.get("/api/reports")
-def get_reports(patient_id: Optional[str] = None, session: Session = Depends(get_session)):
-    """Fetch reports, optionally filtered by patient_id, ordered by most recent first."""
+def get_reports(patient_id: Optional[str] = None, session: Session = Depends(get_session),
+                user: Optional[Dict[str, Any]] = Depends(get_optional_user)):
+    """Fetch reports, optionally filtered by patient_id (or the signed-in user's), most recent first."""
+    if patient_id is None and user is not None:
+        patient_id = user["pid"]
     logger.info(f"Fetching reports. Patient ID: {patient_id}")
     try:
         query = select(PatientReport).order_by(PatientReport.created_at.desc())
@@ -453,8 +788,11 @@ def get_reports(patient_id: Optional[str] = None, session: Session = Depends(get
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/reports/stats")
-def get_reports_stats(patient_id: Optional[str] = None, session: Session = Depends(get_session)):
-    """Calculate average health score and vitals from reports, optionally filtered by patient_id."""
+def get_reports_stats(patient_id: Optional[str] = None, session: Session = Depends(get_session),
+                      user: Optional[Dict[str, Any]] = Depends(get_optional_user)):
+    """Calculate average health score and vitals from reports, optionally filtered by patient_id (or the signed-in user's)."""
+    if patient_id is None and user is not None:
+        patient_id = user["pid"]
     logger.info(f"Calculating report statistics. Patient ID: {patient_id}")
     try:
         query = select(PatientReport)
@@ -538,7 +876,8 @@ def get_report(report_id: int, session: Session = Depends(get_session)):
             "features": json.loads(report.features_json) if report.features_json else {},
             "warnings": json.loads(report.warnings_json) if report.warnings_json else [],
             "created_at": report.created_at.isoformat(),
-            "blockchain_hash": report.blockchain_hash
+            "blockchain_hash": report.blockchain_hash,
+            "model_version": report.model_version
         }
     except HTTPException:
         raise
@@ -546,6 +885,41 @@ def get_report(report_id: int, session: Session = Depends(get_session)):
         logger.error(f"Failed to fetch report: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/reports/{report_id}/proof")
+def get_report_proof(report_id: int, session: Session = Depends(get_session)):
+    """
+    Inclusion proof for a report: its Merkle leaf and path, and the signed
+    block whose merkle_root the path leads to. proof_verifier.py checks it
+    offline without downloading the chain.
+    """
+    report = session.get(PatientReport, report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if report.blockchain_block_index is None or not report.merkle_proof_json:
+        raise HTTPException(status_code=404, detail="No inclusion proof for this report yet")
+
+    block = blockchain_manager.get_block(report.blockchain_block_index)
+    if block is None and blockchain_manager.refresh_if_changed():
+        # Appended by another worker process since this one last read the chain
+        block = blockchain_manager.get_block(report.blockchain_block_index)
+    data = block.get("data") if block else None
+    if not isinstance(data, dict) or "merkle_leaf" not in data:
+        raise HTTPException(status_code=404, detail="No inclusion proof for this report yet")
+
+    algorithm = block.get("signature_algorithm") or RSA_PSS
+    public_key = blockchain_manager.public_key_pem(algorithm)
+    return {
+        "report_id": report.id,
+        "leaf": merkle_leaf(data),
+        "leaf_index": data["merkle_leaf"],
+        "proof": json.loads(report.merkle_proof_json),
+        "merkle_root": block["merkle_root"],
+        "signature": block["signature"],
+        "signature_algorithm": algorithm,
+        "public_key": public_key.decode() if public_key else None,
+        "block": block,
+    }
+
 @app.patch("/api/reports/{report_id}")
 def update_report(report_id: int, request: dict, session: Session = Depends(get_session)):
     """Update a report's title."""
@@ -658,15 +1032,16 @@ def get_blockchain_view(limit: Optional[int] = 100, offset: Optional[int] = 0):
     Returns recent blocks in reverse chronological order (newest first).
     """
     try:
-        chain = load_blockchain()
+        blockchain_manager.refresh_if_changed()
+        total_blocks = len(blockchain_manager)
         
-        # Reverse to show newest first, then apply pagination
-        reversed_chain = list(reversed(chain))
-        paginated_blocks = reversed_chain[offset:offset + limit]
+        # Newest first: a range query over the block index, not a slice of the whole chain
+        end = total_blocks - offset
+        paginated_blocks = list(blockchain_manager.iter_blocks(max(end - limit + 1, 1), end, reverse=True)) if end > 0 and limit > 0 else []
         
         return {
             "blocks": paginated_blocks,
-            "total_blocks": len(chain),
+            "total_blocks": total_blocks,
             "showing": len(paginated_blocks),
             "offset": offset
         }
@@ -674,60 +1049,213 @@ def get_blockchain_view(limit: Optional[int] = 100, offset: Optional[int] = 0):
         logger.error(f"Failed to load blockchain: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/passport/issue")
+def issue_passport(report_id: int, session: Session = Depends(get_session)):
+    """Issue a signed Digital Passport for one report."""
+    try:
+        passport = passport_manager.issue_passport(report_id, session)
+    except ValueError as e:
+        status = 404 if "not found" in str(e).lower() else 400
+        raise HTTPException(status_code=status, detail=str(e))
+    return {"passport": passport}
+
+@app.post("/api/passport/issue/bulk")
+def issue_passports_bulk(request: BulkPassportRequest, session: Session = Depends(get_session)):
+    """
+    Issue passports for many reports in one call.
+
+    Returns a result per report; failures for individual reports do not
+    prevent the others from being issued.
+    """
+    if not request.report_ids:
+        raise HTTPException(status_code=400, detail="report_ids must not be empty")
+    if len(request.report_ids) > PASSPORT_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {PASSPORT_BULK_MAX} reports per request")
+    return passport_manager.issue_passports_bulk(request.report_ids, session)
+
+@app.get("/api/passport/verify-token")
+def verify_passport_token(token: str):
+    """Verify a compact passport token offline: signature, expiry and revocation list only."""
+    return passport_manager.verify_token(token)
+
+@app.get("/api/passport/verify/{passport_id}")
+def verify_passport(passport_id: str, token: str, session: Session = Depends(get_session)):
+    """
+    Verify a scanned passport.
+
+    Compact tokens are checked without the database; legacy HMAC tokens fall
+    back to the full database check.
+    """
+    if is_compact_token(token):
+        result = passport_manager.verify_token(token)
+        if result["status"] == "Valid" and result["passport"]["passport_id"] != passport_id:
+            return {"status": "Tampered", "reason": "Token was issued for a different passport"}
+        if result["status"] == "Valid":
+            # The only database work on this path: one audit insert
+            passport_manager.log_verification(session, passport_id, result)
+        return result
+    return passport_manager.verify_passport(passport_id, token, session)
+
+@app.post("/api/passport/{passport_id}/revoke", dependencies=[Depends(require_admin)])
+def revoke_passport(passport_id: str, session: Session = Depends(get_session)):
+    """Revoke a passport. Other workers pick it up on their next revocation refresh."""
+    try:
+        passport = passport_manager.revoke(passport_id, session)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"passport_id": passport.passport_id, "is_valid": passport.is_valid}
+
+@app.get("/api/passport/{passport_id}/audit")
+def get_passport_audit(passport_id: str, limit: int = 50, before_id: Optional[int] = None,
+                       session: Session = Depends(get_session)):
+    """A passport's audit history, newest first; page with next_before_id."""
+    passport = session.exec(select(DigitalPassport).where(DigitalPassport.passport_id == passport_id)).first()
+    if not passport:
+        raise HTTPException(status_code=404, detail="Passport not found")
+    return PassportManager.audit_history(passport, session, limit=max(1, min(limit, 500)), before_id=before_id)
+
+@app.get("/api/passport/{passport_id}/qr")
+def get_passport_qr(
+    passport_id: str,
+    format: str = "png",
+    if_none_match: Optional[str] = Header(None),
+    session: Session = Depends(get_session)
+):
+    """Render a passport's QR code (PNG or SVG) from its verification URL."""
+    media_type = QRCodeGenerator.MEDIA_TYPES.get(format)
+    if media_type is None:
+        raise HTTPException(status_code=400, detail="format must be 'png' or 'svg'")
+
+    # Only the URL is needed; avoid loading legacy rows' stored images
+    verification_url = session.exec(
+        select(DigitalPassport.verification_url).where(DigitalPassport.passport_id == passport_id)
+    ).first()
+    if not verification_url:
+        raise HTTPException(status_code=404, detail="Passport not found")
+
+    # The image is a pure function of the URL and format, so they make a strong validator
+    etag = '"' + hashlib.sha256(f"{format}:{verification_url}".encode()).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    return Response(QRCodeGenerator.render(verification_url, format), media_type=media_type, headers=headers)
+
 @app.get("/api/blockchain/verify")
-def verify_blockchain_integrity():
+@request_profiler.profiled("blockchain_verify")
+def verify_blockchain_integrity(full: bool = False):
     """
     Verify the integrity of the blockchain.
     Checks that all hashes are valid and blocks are properly linked.
+    Sealed segments are trusted through their signed manifests unless full=true.
     """
     try:
-        chain = load_blockchain()
-        
-        if not chain:
-            return {"valid": True, "message": "Blockchain is empty", "total_blocks": 0}
+        blockchain_manager.refresh_if_changed()
         
-        for i, block in enumerate(chain):
-            # Verify hash matches data
-            expected_hash = hashlib.sha256(
-                json.dumps(block["data"], sort_keys=True).encode()
-            ).hexdigest()
-            
-            if block["hash"] != expected_hash:
-                return {
-                    "valid": False,
-                    "error": f"Block {block['index']} has corrupted hash",
-                    "block_index": block["index"]
-                }
-            
-            # Verify chain linkage (except genesis block)
-            if i > 0:
-                if block["prev_hash"] != chain[i-1]["hash"]:
-                    return {
-                        "valid": False,
-                        "error": f"Block {block['index']} has broken chain link",
-                        "block_index": block["index"]
-                    }
+        # Hashes, links and signatures of every block, streamed from the store
+        report = blockchain_manager.validate_chain(full=full)
+        sealed = blockchain_manager.store.sealed_segments()
+        if report["length"] == 0:
+            return {"valid": True, "is_valid": True, "message": "Blockchain is empty", "total_blocks": 0, "errors": []}
         
         return {
-            "valid": True,
-            "message": "Blockchain integrity verified ✓",
-            "total_blocks": len(chain),
-            "first_block": chain[0]["timestamp"] if chain else None,
-            "last_block": chain[-1]["timestamp"] if chain else None
+            "valid": report["is_valid"],
+            "is_valid": report["is_valid"],
+            "message": "Blockchain integrity verified ✓" if report["is_valid"] else report["errors"][0],
+            "errors": report["errors"],
+            "total_blocks": report["length"],
+            "trusted_segments": report["trusted_segments"],
+            # Read from the manifest so an archived first segment is not needed
+            "first_block": sealed[0]["first_timestamp"] if sealed else blockchain_manager.get_block(1)["timestamp"],
+            "last_block": blockchain_manager.store.last()["timestamp"]
         }
         
     except Exception as e:
         logger.error(f"Blockchain verification failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _ndjson_lines(items):
+    for item in items:
+        yield json.dumps(item) + "\n"
+
+@app.get("/api/blockchain/export")
+def export_blockchain(start: int = 1, end: Optional[int] = None):
+    """
+    Export blocks ``start..end`` as NDJSON, one block per line.
+
+    Blocks are written as they are read from the store, so memory use is
+    constant and the first line arrives at once however long the chain is.
+    """
+    blockchain_manager.refresh_if_changed()
+    return StreamingResponse(
+        _ndjson_lines(blockchain_manager.iter_blocks(start, end)),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=blockchain.ndjson"}
+    )
+
+def _verification_events(full: bool):
+    # Sent before any block is read so clients see the stream open immediately
+    yield {"type": "start", "total_blocks": len(blockchain_manager), "full": full}
+    try:
+        yield from blockchain_manager.iter_validation(full=full, progress_every=BLOCKCHAIN_VERIFY_PROGRESS_EVERY)
+    except Exception as e:
+        # Headers are already sent; report the failure in-band
+        logger.error(f"Streaming blockchain verification failed: {e}")
+        yield {"type": "failed", "message": str(e)}
+
+@app.get("/api/blockchain/verify/stream")
+def verify_blockchain_stream(full: bool = False):
+    """
+    Verify the chain as an NDJSON stream: a start event, errors as they are
+    found, progress every BLOCKCHAIN_VERIFY_PROGRESS_EVERY blocks and a
+    final result event.
+    """
+    blockchain_manager.refresh_if_changed()
+    return StreamingResponse(_ndjson_lines(_verification_events(full)), media_type="application/x-ndjson")
+
+@app.get("/api/blockchain/commits/{commit_id}")
+def get_chain_commit_status(commit_id: str, session: Session = Depends(get_session)):
+    """Status of a queued audit entry: pending, committed (with its block) or failed."""
+    entry = session.exec(select(ChainCommitEntry).where(ChainCommitEntry.commit_id == commit_id)).first()
+    if not entry:
+        raise HTTPException(status_code=404, detail="Commit not found")
+    return ChainCommitQueue.describe(entry)
+
+@app.get("/api/blockchain/lookup")
+def lookup_blockchain_hash(hash: str, session: Session = Depends(get_session)):
+    """
+    Find where a block hash or features_hash is on the chain, and the
+    reports recorded in those blocks.
+    """
+    value = hash.strip().lower()
+    if len(value) not in (32, 64) or any(c not in "0123456789abcdef" for c in value):
+        raise HTTPException(status_code=400, detail="hash must be a hex block hash or features_hash")
+
+    rows = chain_index.lookup(value, session)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Hash not found on the chain")
+
+    matches = []
+    for row in rows:
+        block = blockchain_manager.get_block(row.block_index)
+        report_ids = session.exec(
+            select(PatientReport.id).where(PatientReport.blockchain_hash == block["hash"])
+        ).all() if block else []
+        matches.append({
+            "kind": row.kind,
+            "block_index": row.block_index,
+            "block_hash": block["hash"] if block else None,
+            "timestamp": block["timestamp"] if block else None,
+            "report_ids": report_ids,
+        })
+    return {"hash": value, "matches": matches}
+
 @app.get("/api/blockchain/block/{block_index}")
 def get_blockchain_block_by_index(block_index: int):
     """Get a specific block by its index."""
     try:
-        chain = load_blockchain()
-        
-        # Find block with matching index
-        block = next((b for b in chain if b["index"] == block_index), None)
+        blockchain_manager.refresh_if_changed()
+        block = blockchain_manager.get_block(block_index)
         
         if not block:
             raise HTTPException(status_code=404, detail=f"Block {block_index} not found")
@@ -0,0 +1,219 @@
+"""Runtime memory diagnostics.
+
+Backs the admin ``/api/admin/memory`` endpoints used to chase RSS growth in
+long-running workers:
+
+* ``tracemalloc`` control (start/stop), a baseline snapshot, and the top
+  allocation sites diffed against that baseline.
+* Approximate sizes of long-lived structures (chain, caches, ...) registered
+  by the application through ``register_structure``.
+
+tracemalloc is off by default. Tracing slows allocation-heavy code and holds
+its own bookkeeping memory (reported as ``tracemalloc_overhead_mb``), so only
+start it on the worker being investigated and stop it afterwards.
+"""
+import gc
+import sys
+import datetime
+import threading
+import tracemalloc
+import logging
+from typing import Dict, Any, List, Callable, Optional
+
+from memory_report import process_memory
+
+logger = logging.getLogger(__name__)
+
+GROUP_BY_CHOICES = ("lineno", "filename", "traceback")
+
+# Allocations made by the diagnostics machinery itself
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _mb(value: float) -> float:
+    return round(value / (1024 * 1024), 3)
+
+
+def deep_sizeof(obj: Any, max_objects: int = 200000) -> int:
+    """
+    Approximate retained size in bytes of a Python object graph.
+
+    Follows dict/list/tuple/set containers and object ``__dict__``s; numpy
+    arrays and pandas objects are counted by their buffers. Shared objects are
+    counted once. Stops after ``max_objects`` to bound the cost on huge graphs.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < max_objects:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+
+        memory_usage = getattr(current, "memory_usage", None)
+        if callable(memory_usage) and hasattr(current, "columns"):
+            # pandas DataFrame
+            total += int(memory_usage(deep=True).sum())
+            continue
+        nbytes = getattr(current, "nbytes", None)
+        if isinstance(nbytes, int):
+            # numpy arrays / pandas Series
+            total += sys.getsizeof(current) + nbytes
+            continue
+
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__") and not isinstance(current, type):
+            stack.append(current.__dict__)
+    return total
+
+
+class MemoryDiagnostics:
+    """tracemalloc control, baseline diffs and structure sizes for one process."""
+
+    def __init__(self):
+        self._structures: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_taken_at: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def register_structure(self, name: str, fn: Callable[[], Dict[str, Any]]):
+        """Register a callable returning size information for a long-lived structure."""
+        self._structures[name] = fn
+
+    # --- tracemalloc ---
+
+    def start(self, frames: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            if tracemalloc.is_tracing():
+                if tracemalloc.get_traceback_limit() != frames:
+                    logger.warning("tracemalloc already running; keeping its traceback limit")
+            else:
+                tracemalloc.start(frames)
+                logger.info(f"tracemalloc started ({frames} frames)")
+            # A baseline from before tracing started would be empty
+            self._baseline = None
+            self._baseline_taken_at = None
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logger.info("tracemalloc stopped")
+            self._baseline = None
+            self._baseline_taken_at = None
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        status = {
+            "tracing": tracing,
+            "baseline_taken_at": self._baseline_taken_at,
+        }
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            status.update({
+                "traceback_frames": tracemalloc.get_traceback_limit(),
+                "traced_current_mb": _mb(current),
+                "traced_peak_mb": _mb(peak),
+                "tracemalloc_overhead_mb": _mb(tracemalloc.get_tracemalloc_memory()),
+            })
+        return status
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def take_baseline(self) -> Dict[str, Any]:
+        """Snapshot current allocations as the reference for later diffs."""
+        snapshot = self._snapshot()
+        with self._lock:
+            self._baseline = snapshot
+            self._baseline_taken_at = datetime.datetime.now().isoformat()
+        total = sum(stat.size for stat in snapshot.statistics("filename"))
+        return {"baseline_taken_at": self._baseline_taken_at, "traced_mb": _mb(total)}
+
+    def top(self, limit: int = 25, group_by: str = "lineno", diff: bool = True) -> Dict[str, Any]:
+        """
+        Return the largest allocation sites.
+
+        With ``diff`` and a baseline, sites are ranked by growth since the
+        baseline; otherwise by current size.
+        """
+        if group_by not in GROUP_BY_CHOICES:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY_CHOICES)}")
+        snapshot = self._snapshot()
+        baseline = self._baseline if diff else None
+
+        sites: List[Dict[str, Any]] = []
+        if baseline is not None:
+            stats = snapshot.compare_to(baseline, group_by)
+            for stat in stats[:limit]:
+                sites.append({
+                    "site": self._format_traceback(stat.traceback, group_by),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                })
+        else:
+            for stat in snapshot.statistics(group_by)[:limit]:
+                sites.append({
+                    "site": self._format_traceback(stat.traceback, group_by),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                })
+
+        return {
+            "group_by": group_by,
+            "compared_to_baseline": baseline is not None,
+            "baseline_taken_at": self._baseline_taken_at if baseline is not None else None,
+            "sites": sites,
+        }
+
+    @staticmethod
+    def _format_traceback(traceback: tracemalloc.Traceback, group_by: str):
+        if group_by == "traceback":
+            # Oldest frame first (most recent call last), like a normal Python traceback
+            return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+        frame = traceback[0]
+        if group_by == "filename":
+            return frame.filename
+        return f"{frame.filename}:{frame.lineno}"
+
+    # --- Structures ---
+
+    def structures(self) -> Dict[str, Any]:
+        sizes = {}
+        for name, fn in self._structures.items():
+            try:
+                sizes[name] = fn()
+            except Exception as e:
+                sizes[name] = {"error": str(e)}
+        return sizes
+
+    def report(self) -> Dict[str, Any]:
+        """Process memory, tracemalloc status, GC state and structure sizes."""
+        return {
+            "process": process_memory(),
+            "tracemalloc": self.status(),
+            "gc": {
+                "counts": gc.get_count(),
+                "tracked_objects": len(gc.get_objects()),
+                "frozen_objects": gc.get_freeze_count(),
+            },
+            "structures": self.structures(),
+        }
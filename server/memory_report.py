@@ -0,0 +1,80 @@
+"""Process memory reporting.
+
+Reads resident and shared memory for a process from ``/proc`` so preloaded
+(copy-on-write) workers can be checked for how much of the model, SHAP
+explainer and pandas state they actually share with the master.
+"""
+import os
+import resource
+import logging
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_ROLLUP_FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_clean_mb",
+    "Shared_Dirty": "shared_dirty_mb",
+    "Private_Clean": "private_clean_mb",
+    "Private_Dirty": "private_dirty_mb",
+}
+
+
+def _read_smaps_rollup(pid: Union[int, str]) -> Optional[Dict[str, float]]:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    stats = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in _ROLLUP_FIELDS:
+            stats[_ROLLUP_FIELDS[parts[0].rstrip(":")]] = round(int(parts[1]) / 1024, 1)
+    return stats
+
+
+def _read_statm(pid: Union[int, str]) -> Optional[Dict[str, float]]:
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            _, resident, shared = f.read().split()[:3]
+    except OSError:
+        return None
+    page_mb = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    return {
+        "rss_mb": round(int(resident) * page_mb, 1),
+        "shared_mb": round(int(shared) * page_mb, 1),
+    }
+
+
+def process_memory(pid: Union[int, str] = "self") -> Dict[str, float]:
+    """
+    Return resident/shared/private memory in MB for a process.
+
+    Uses ``smaps_rollup`` when available (shared vs private split and PSS),
+    falls back to ``statm`` and finally to the peak RSS from ``getrusage``
+    on platforms without ``/proc``.
+    """
+    stats = _read_smaps_rollup(pid)
+    if stats:
+        stats["shared_mb"] = round(stats.get("shared_clean_mb", 0) + stats.get("shared_dirty_mb", 0), 1)
+        stats["private_mb"] = round(stats.get("private_clean_mb", 0) + stats.get("private_dirty_mb", 0), 1)
+        return stats
+
+    stats = _read_statm(pid)
+    if stats:
+        return stats
+
+    # ru_maxrss is KB on Linux and bytes on macOS; this branch only runs off Linux
+    return {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024), 1)}
+
+
+def log_memory_report(role: str, pid: Optional[int] = None):
+    """Log a one-line memory summary for the given process."""
+    pid = pid or os.getpid()
+    stats = process_memory(pid)
+    summary = ", ".join(f"{k}={v}" for k, v in stats.items())
+    logger.info(f"Memory [{role} pid={pid}]: {summary}")
+    return stats
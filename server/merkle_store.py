@@ -0,0 +1,242 @@
+"""Persistent, memory-mapped Merkle tree.
+
+Same tree as ``MerkleTree`` (leaves are SHA-256 hex strings, a parent is
+``sha256(left_hex + right_hex)``, the last node of an odd level is paired
+with itself), so roots and proofs are interchangeable with it. Instead of
+lists of hex strings rebuilt from every leaf, nodes are stored as raw
+32-byte values in one file, level by level:
+
+    header (32 bytes): magic, capacity, leaf_count
+    level 0: capacity nodes (the leaves)
+    level 1: capacity / 2 nodes
+    ...
+    level log2(capacity): 1 node
+
+Space is reserved for ``capacity`` leaves (a power of two) so every level
+has a fixed offset; when the tree outgrows it the file is rewritten at
+double the capacity. An append rewrites only the new leaf's path to the
+root, and a proof reads one sibling per level - O(log n) pages of the
+mapped file, with no rebuild. ``from_leaves`` writes a whole tree at once
+from ``build_levels``.
+"""
+import os
+import mmap
+import struct
+import hashlib
+import tempfile
+import threading
+from typing import List, Dict, Iterable, Optional
+
+from merkle_tree import build_levels
+
+MAGIC = b"MGMERKL1"
+HEADER = struct.Struct("<8sQQ")  # magic, capacity, leaf_count
+HEADER_SIZE = 32
+NODE_SIZE = 32
+
+
+def _parent(left: bytes, right: bytes) -> bytes:
+    # Hex concatenation, to stay compatible with MerkleTree
+    return hashlib.sha256((left.hex() + right.hex()).encode()).digest()
+
+
+def _level_size(level: int, leaf_count: int) -> int:
+    return (leaf_count + (1 << level) - 1) >> level
+
+
+def _height(leaf_count: int) -> int:
+    """Number of levels, leaves included."""
+    return (leaf_count - 1).bit_length() + 1 if leaf_count else 0
+
+
+def _file_size(capacity: int) -> int:
+    return HEADER_SIZE + (2 * capacity - 1) * NODE_SIZE
+
+
+class MerkleStore:
+    """Append-only Merkle tree in a memory-mapped file."""
+
+    def __init__(self, path: str, initial_capacity: int = 1024):
+        self.path = path
+        self._lock = threading.RLock()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._inode = None
+        if not os.path.exists(path):
+            self._create(path, 1 << max(initial_capacity - 1, 1).bit_length(), [])
+        self._open()
+
+    @classmethod
+    def from_leaves(cls, path: str, leaves: Iterable[str], workers: int = 1) -> "MerkleStore":
+        """Write a new tree file for ``leaves`` in one pass (replacing ``path``) and open it."""
+        levels = build_levels(leaves, workers)
+        leaf_count = len(levels[0]) // NODE_SIZE if levels else 0
+        cls._create(path, 1 << max(leaf_count - 1, 1).bit_length(), levels, leaf_count)
+        return cls(path)
+
+    # --- File handling ---
+
+    @staticmethod
+    def _create(path: str, capacity: int, levels: List[bytes], leaf_count: int = 0):
+        """Write a new tree file atomically; ``levels`` holds each level's used bytes."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".merkle-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.truncate(_file_size(capacity))
+                f.write(HEADER.pack(MAGIC, capacity, leaf_count))
+                offset = HEADER_SIZE
+                for level in range(capacity.bit_length()):
+                    if level < len(levels):
+                        f.seek(offset)
+                        f.write(levels[level])
+                    offset += (capacity >> level) * NODE_SIZE
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _open(self):
+        self.close()
+        self._file = open(self.path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        magic, self.capacity, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a Merkle tree file")
+        self._offsets = []
+        offset = HEADER_SIZE
+        for level in range(self.capacity.bit_length()):
+            self._offsets.append(offset)
+            offset += (self.capacity >> level) * NODE_SIZE
+
+    def _ensure_current(self):
+        # Another process may have grown the tree, which replaces the file
+        try:
+            if os.stat(self.path).st_ino != self._inode:
+                self._open()
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _grow(self, leaf_count: int):
+        capacity = self.capacity
+        while capacity < leaf_count:
+            capacity *= 2
+        current = len(self)
+        levels = [
+            bytes(self._map[self._offsets[level]:self._offsets[level] + _level_size(level, current) * NODE_SIZE])
+            for level in range(_height(current))
+        ]
+        self._create(self.path, capacity, levels, current)
+        self._open()
+
+    # --- Nodes ---
+
+    def _node(self, level: int, index: int) -> bytes:
+        offset = self._offsets[level] + index * NODE_SIZE
+        return self._map[offset:offset + NODE_SIZE]
+
+    def _set_node(self, level: int, index: int, value: bytes):
+        offset = self._offsets[level] + index * NODE_SIZE
+        self._map[offset:offset + NODE_SIZE] = value
+
+    def _set_leaf_count(self, leaf_count: int):
+        struct.pack_into("<Q", self._map, 16, leaf_count)
+
+    def _update_path(self, index: int, leaf_count: int):
+        """Recompute the ancestors of leaf ``index`` in a tree of ``leaf_count`` leaves."""
+        for level in range(_height(leaf_count) - 1):
+            parent = index >> 1
+            left = self._node(level, parent * 2)
+            right_index = parent * 2 + 1
+            right = self._node(level, right_index) if right_index < _level_size(level, leaf_count) else left
+            self._set_node(level + 1, parent, _parent(left, right))
+            index = parent
+
+    # --- Public API ---
+
+    def __len__(self) -> int:
+        return HEADER.unpack_from(self._map, 0)[2]
+
+    def root(self) -> str:
+        with self._lock:
+            self._ensure_current()
+            leaf_count = len(self)
+            if not leaf_count:
+                return ""
+            return self._node(_height(leaf_count) - 1, 0).hex()
+
+    def leaf(self, index: int) -> str:
+        with self._lock:
+            self._ensure_current()
+            if not 0 <= index < len(self):
+                raise ValueError("Leaf index out of bounds")
+            return self._node(0, index).hex()
+
+    def extend(self, leaves: Iterable[str]) -> int:
+        """Append hex leaves; returns the index of the first. Synced to disk once at the end."""
+        leaves = [bytes.fromhex(leaf) for leaf in leaves]
+        for leaf in leaves:
+            if len(leaf) != NODE_SIZE:
+                raise ValueError("Leaves must be SHA-256 hex digests")
+        with self._lock:
+            self._ensure_current()
+            first = len(self)
+            if first + len(leaves) > self.capacity:
+                self._grow(first + len(leaves))
+            for offset, leaf in enumerate(leaves):
+                self._set_node(0, first + offset, leaf)
+                self._update_path(first + offset, first + offset + 1)
+            # The count is written last: a crash before it leaves the old tree intact
+            self._set_leaf_count(first + len(leaves))
+            self._map.flush()
+            return first
+
+    def append(self, leaf: str) -> int:
+        """Append one hex leaf and return its index."""
+        return self.extend([leaf])
+
+    def truncate(self, leaf_count: int):
+        """Drop leaves past ``leaf_count`` (e.g. ones whose block never made it to the chain)."""
+        with self._lock:
+            self._ensure_current()
+            if leaf_count >= len(self):
+                return
+            if leaf_count:
+                self._update_path(leaf_count - 1, leaf_count)
+            self._set_leaf_count(leaf_count)
+            self._map.flush()
+
+    def get_proof_with_direction(self, leaf_index: int) -> List[Dict[str, str]]:
+        """Same proof as ``MerkleTree.get_proof_with_direction``, against the current root."""
+        with self._lock:
+            self._ensure_current()
+            leaf_count = len(self)
+            if leaf_index < 0 or leaf_index >= leaf_count:
+                raise ValueError("Leaf index out of bounds")
+
+            proof = []
+            index = leaf_index
+            for level in range(_height(leaf_count) - 1):
+                is_left_node = index % 2 == 0
+                sibling = index + 1 if is_left_node else index - 1
+                if sibling >= _level_size(level, leaf_count):
+                    proof.append({"hash": self._node(level, index).hex(), "direction": "right"})
+                else:
+                    proof.append({"hash": self._node(level, sibling).hex(), "direction": "right" if is_left_node else "left"})
+                index >>= 1
+            return proof
+
+    def stats(self) -> Dict[str, int]:
+        return {"leaves": len(self), "capacity": self.capacity, "file_bytes": _file_size(self.capacity)}
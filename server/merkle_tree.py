@@ -1,6 +1,10 @@
 import hashlib
 import math
-from typing import List
+import binascii
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Iterable
 
 class MerkleTree:
     """
@@ -151,3 +155,90 @@ class MerkleTree:
             current_hash = hashlib.sha256(combined.encode()).hexdigest()
             
         return current_hash == root
+
+
+
+# Pairs hashed per chunk by build_levels; bounds the temporary hex buffer to ~8 MB
+BULK_CHUNK_PAIRS = 65536
+DIGEST_SIZE = 32
+_NODE_HEX = 2 * DIGEST_SIZE
+_PAIR_HEX = 2 * _NODE_HEX
+
+
+def _leaf_bytes(leaves: Iterable[str]) -> bytes:
+    buffer = bytearray()
+    leaves = iter(leaves)
+    while True:
+        batch = list(itertools.islice(leaves, BULK_CHUNK_PAIRS))
+        if not batch:
+            break
+        buffer += bytes.fromhex("".join(batch))
+    if len(buffer) % DIGEST_SIZE:
+        raise ValueError("Leaves must be SHA-256 hex digests")
+    return bytes(buffer)
+
+
+def _parent_level(level: bytes) -> bytes:
+    """Hashes a level of raw digests into the next one, BULK_CHUNK_PAIRS pairs at a time."""
+    sha256 = hashlib.sha256
+    view = memoryview(level)
+    chunk = BULK_CHUNK_PAIRS * 2 * DIGEST_SIZE
+    parents = []
+    for start in range(0, len(level), chunk):
+        # One hexlify per chunk; pairs are hashed straight from the buffer
+        hexed = binascii.hexlify(view[start:start + chunk])
+        if len(hexed) % _PAIR_HEX:
+            # Odd number of nodes: pair the last one with itself
+            hexed += hexed[-_NODE_HEX:]
+        pairs = memoryview(hexed)
+        parents.append(b"".join([sha256(pairs[i:i + _PAIR_HEX]).digest() for i in range(0, len(hexed), _PAIR_HEX)]))
+    return b"".join(parents)
+
+
+def _subtree_levels(leaves: bytes, height: int) -> List[bytes]:
+    """Levels 1..height-1 of an aligned subtree, padded as the full tree pads its last subtree."""
+    levels = [leaves]
+    while len(levels) < height:
+        levels.append(_parent_level(levels[-1]))
+    return levels[1:]
+
+
+def build_levels(leaves: Iterable[str], workers: int = 1) -> List[bytes]:
+    """
+    Builds the same tree as MerkleTree for SHA-256 hex leaves, keeping each
+    level as one contiguous buffer of raw 32-byte digests (leaves first, root
+    last) instead of a list of hex strings.
+
+    Each node is a separate small SHA-256 call, and hashlib only releases the
+    GIL for large inputs, so threads do not help. With workers > 1 the leaves
+    are split into aligned power-of-two subtrees that are built in a process
+    pool; the levels above them are built here.
+    """
+    level = _leaf_bytes(leaves)
+    if not level:
+        return []
+    levels = [level]
+
+    count = len(level) // DIGEST_SIZE
+    if workers > 1 and count > BULK_CHUNK_PAIRS:
+        # A few subtrees per worker, each at least one chunk
+        subtree = 1 << (max(count // (4 * workers), BULK_CHUNK_PAIRS) - 1).bit_length()
+        if subtree < count:
+            height = subtree.bit_length()
+            step = subtree * DIGEST_SIZE
+            # spawn: forking a server process with live threads is not safe
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                subtrees = list(pool.map(
+                    _subtree_levels, [level[i:i + step] for i in range(0, len(level), step)], itertools.repeat(height)
+                ))
+            levels.extend(b"".join(parts) for parts in zip(*subtrees))
+
+    while len(levels[-1]) > DIGEST_SIZE:
+        levels.append(_parent_level(levels[-1]))
+    return levels
+
+
+def bulk_merkle_root(leaves: Iterable[str], workers: int = 1) -> str:
+    """Root of MerkleTree(leaves), computed with build_levels."""
+    levels = build_levels(leaves, workers)
+    return levels[-1].hex() if levels else ""
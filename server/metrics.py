@@ -0,0 +1,298 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Counters, gauges and fixed-bucket histograms, optionally labelled, kept in a
+module-level registry and rendered by ``render_prometheus()`` for the
+``/metrics`` endpoint.
+
+Recording is gated on ``METRICS_ENABLED`` (env, default off): when disabled,
+``StageTimer``, ``timed`` and the ``record_*`` helpers return immediately,
+so instrumentation costs a flag check per call. The raw ``Histogram`` class is
+always live because components such as the inference batcher report it
+through their own stats endpoints.
+
+Each worker process keeps its own registry; scrape every worker (or a single
+worker deployment) to get complete numbers.
+"""
+import os
+import time
+import bisect
+import functools
+import threading
+from typing import Dict, Any, Sequence, Tuple, Callable, Optional, List
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+
+# Seconds; tuned for in-process stages from sub-millisecond to a few seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def enabled() -> bool:
+    return METRICS_ENABLED
+
+
+def set_enabled(value: bool):
+    global METRICS_ENABLED
+    METRICS_ENABLED = value
+
+
+class Histogram:
+    """A fixed-bucket histogram (upper bounds inclusive, plus +Inf)."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cumulative bucket counts keyed by upper bound, with sum and count."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = {}
+        running = 0
+        for bound, c in zip(list(self.buckets) + [float("inf")], counts):
+            running += c
+            cumulative["+Inf" if bound == float("inf") else repr(bound)] = running
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+
+class _CounterValue:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeValue:
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, fn: Callable[[], float]):
+        """Compute the value at scrape time instead of storing it."""
+        self.function = fn
+
+    def read(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class MetricFamily:
+    """A named metric with optional labels; children are created on first use."""
+
+    def __init__(self, kind: str, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        if self.kind == "counter":
+            return _CounterValue()
+        if self.kind == "gauge":
+            return _GaugeValue()
+        return Histogram(self.buckets)
+
+    def labels(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+_REGISTRY: Dict[str, MetricFamily] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _register(kind: str, name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+    with _REGISTRY_LOCK:
+        family = _REGISTRY.get(name)
+        if family is None:
+            family = MetricFamily(kind, name, documentation, labelnames, buckets)
+            _REGISTRY[name] = family
+        return family
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+    return _register("counter", name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+    return _register("gauge", name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+    return _register("histogram", name, documentation, labelnames, buckets)
+
+
+# --- Recording helpers (no-ops while metrics are disabled) ---
+
+def record_count(family: MetricFamily, amount: float = 1.0, **labels):
+    if METRICS_ENABLED:
+        family.labels(**labels).inc(amount)
+
+
+def record_value(family: MetricFamily, value: float, **labels):
+    if METRICS_ENABLED:
+        family.labels(**labels).set(value)
+
+
+def record_duration(family: MetricFamily, seconds: float, **labels):
+    if METRICS_ENABLED:
+        family.labels(**labels).observe(seconds)
+
+
+class timed:
+    """Context manager / decorator that observes elapsed seconds into a histogram family."""
+
+    def __init__(self, family: MetricFamily, **labels):
+        self.family = family
+        self.labels = labels
+        self._started = None
+
+    def __enter__(self):
+        if METRICS_ENABLED:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._started is not None:
+            self.family.labels(**self.labels).observe(time.perf_counter() - self._started)
+            self._started = None
+        return False
+
+    def __call__(self, fn):
+        family, labels = self.family, self.labels
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                family.labels(**labels).observe(time.perf_counter() - started)
+        return wrapper
+
+
+class StageTimer:
+    """
+    Records consecutive pipeline steps into one labelled histogram.
+
+    ``mark("validation")`` observes the time since the previous mark (or
+    construction) under ``stage="validation"``.
+    """
+
+    def __init__(self, family: MetricFamily, label: str = "stage"):
+        self.family = family
+        self.label = label
+        self._last = time.perf_counter() if METRICS_ENABLED else None
+
+    def mark(self, stage: str):
+        if self._last is None:
+            return
+        now = time.perf_counter()
+        self.family.labels(**{self.label: stage}).observe(now - self._last)
+        self._last = now
+
+
+# --- Exposition ---
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Dict[str, str] = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = []
+    for k, v in pairs:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{k}="{v}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value != value:
+        return "NaN"
+    return repr(float(value))
+
+
+def render_prometheus() -> str:
+    """Render every registered metric in the Prometheus text format (0.0.4)."""
+    lines = []
+    with _REGISTRY_LOCK:
+        families = sorted(_REGISTRY.values(), key=lambda f: f.name)
+
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.documentation}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for label_values, child in family.children():
+            if family.kind == "counter":
+                lines.append(f"{family.name}{_format_labels(family.labelnames, label_values)} {_format_value(child.value)}")
+            elif family.kind == "gauge":
+                lines.append(f"{family.name}{_format_labels(family.labelnames, label_values)} {_format_value(child.read())}")
+            else:
+                snap = child.snapshot()
+                for bound, count in snap["buckets"].items():
+                    labels = _format_labels(family.labelnames, label_values, {"le": bound})
+                    lines.append(f"{family.name}_bucket{labels} {count}")
+                labels = _format_labels(family.labelnames, label_values)
+                lines.append(f"{family.name}_sum{labels} {_format_value(snap['sum'])}")
+                lines.append(f"{family.name}_count{labels} {snap['count']}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Shared metric families ---
+
+PIPELINE_STAGE_SECONDS = histogram(
+    "mediguard_pipeline_stage_seconds", "Latency of each /api/analyze pipeline step", ["stage"]
+)
+AGENT_SECONDS = histogram(
+    "mediguard_agent_seconds", "Latency of agent operations", ["agent", "operation"]
+)
+GEMINI_CALLS = counter("mediguard_gemini_calls_total", "Gemini generate_content calls", ["agent"])
+GEMINI_FAILURES = counter("mediguard_gemini_failures_total", "Gemini calls that raised", ["agent"])
+GEMINI_SECONDS = histogram("mediguard_gemini_seconds", "Gemini call latency", ["agent"])
+BLOCKCHAIN_LENGTH = gauge("mediguard_blockchain_length", "Number of blocks on the audit chain")
+BLOCKCHAIN_APPEND_SECONDS = histogram("mediguard_blockchain_append_seconds", "Time to append one block")
+DB_CHECKOUT_SECONDS = histogram(
+    "mediguard_db_pool_checkout_seconds", "Time waiting for a database connection from the pool"
+)
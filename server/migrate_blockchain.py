@@ -0,0 +1,27 @@
+"""Copy blockchain.json into the BlockRecord table before switching to BLOCKCHAIN_BACKEND=sql."""
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import engine, create_db_and_tables
+from chain_store import FileChainStore, SQLChainStore
+
+
+def migrate_blockchain(chain_file: str = "blockchain.json"):
+    create_db_and_tables()
+    source = FileChainStore(chain_file)
+    target = SQLChainStore(engine)
+
+    if len(target):
+        print(f"BlockRecord already holds {len(target)} blocks; not importing")
+        return 1
+
+    count = target.import_blocks(source.iter_blocks())
+    print(f"Imported {count} blocks from {chain_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(migrate_blockchain(sys.argv[1] if len(sys.argv) > 1 else "blockchain.json"))
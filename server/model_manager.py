@@ -0,0 +1,216 @@
+"""Model Manager
+
+Loads the CatBoost classifier from native ``.cbm`` artifacts and keeps the
+active model up to date without restarting the server.
+
+- Artifacts are discovered in a model directory (``mediguard_catboost*.cbm``).
+  The version is taken from the filename (``mediguard_catboost-<version>.cbm``)
+  or, for an unversioned file, from a short content hash.
+- A background thread polls the directory and loads newer artifacts. The new
+  model is warmed up with one inference before it is swapped in, so the first
+  request after a swap does not pay the cold cost.
+- Each loaded model carries a prebuilt SHAP explainer, so explanations do not
+  rebuild the tree explainer per request and preloading servers share it
+  across forked workers.
+- Requests take a snapshot with ``current()`` and use it for the whole
+  request, so a swap never changes the model under an in-flight request.
+- Setting a pinned version (``MODEL_VERSION``) restricts loading to that
+  artifact only.
+- If no ``.cbm`` artifact exists the legacy joblib pickle is used.
+"""
+from __future__ import annotations
+
+import os
+import glob
+import hashlib
+import logging
+import datetime
+import threading
+from typing import Optional, List, Tuple, Dict, Any
+
+import pandas as pd
+import shap
+from catboost import CatBoostClassifier
+
+logger = logging.getLogger(__name__)
+
+MODEL_PREFIX = "mediguard_catboost"
+LEGACY_PICKLE = f"{MODEL_PREFIX}.pkl"
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def artifact_version(path: str) -> str:
+    """Derive a model version from an artifact filename or its content."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if stem.startswith(MODEL_PREFIX + "-"):
+        return stem[len(MODEL_PREFIX) + 1:]
+    return _file_digest(path)
+
+
+class LoadedModel:
+    """An immutable snapshot of a loaded model and its metadata."""
+
+    def __init__(self, model, version: str, path: str, fingerprint: Tuple[float, int], explainer=None):
+        self.model = model
+        self.explainer = explainer
+        self.version = version
+        self.path = path
+        self.fingerprint = fingerprint
+        self.loaded_at = datetime.datetime.now().isoformat()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "path": os.path.basename(self.path),
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelManager:
+    """Loads, warms up and hot-swaps CatBoost model versions."""
+
+    def __init__(self, model_dir: str, pinned_version: Optional[str] = None, watch_interval: float = 5.0):
+        self.model_dir = model_dir
+        self.pinned_version = pinned_version or None
+        self.watch_interval = watch_interval
+        self._current: Optional[LoadedModel] = None
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    # --- Discovery ---
+
+    def _candidates(self) -> List[str]:
+        return glob.glob(os.path.join(self.model_dir, f"{MODEL_PREFIX}*.cbm"))
+
+    def _select_artifact(self) -> Optional[str]:
+        """Pick the artifact to serve: the pinned version or the newest file."""
+        candidates = self._candidates()
+        if self.pinned_version:
+            for path in candidates:
+                if artifact_version(path) == self.pinned_version:
+                    return path
+            return None
+        if not candidates:
+            return None
+        return max(candidates, key=os.path.getmtime)
+
+    @staticmethod
+    def _fingerprint(path: str) -> Tuple[float, int]:
+        st = os.stat(path)
+        return (st.st_mtime, st.st_size)
+
+    # --- Loading ---
+
+    def _load_artifact(self, path: str) -> LoadedModel:
+        fingerprint = self._fingerprint(path)
+        if path.endswith(".cbm"):
+            model = CatBoostClassifier()
+            model.load_model(path, format="cbm")
+            version = artifact_version(path)
+        else:
+            import joblib
+            model = joblib.load(path)
+            version = f"legacy-{_file_digest(path)}"
+
+        # TreeExplainer is tied to the model, so build it once per version
+        explainer = shap.TreeExplainer(model)
+        loaded = LoadedModel(model, version, path, fingerprint, explainer=explainer)
+        self._warmup(loaded)
+        return loaded
+
+    @staticmethod
+    def _warmup(loaded: LoadedModel):
+        """Run one inference so the first real request is not a cold call."""
+        feature_names = list(loaded.model.feature_names_)
+        sample = pd.DataFrame([[0.0] * len(feature_names)], columns=feature_names)
+        loaded.model.predict(sample, prediction_type="RawFormulaVal")
+        if loaded.explainer is not None:
+            loaded.explainer.shap_values(sample)
+
+    def load(self) -> LoadedModel:
+        """Load the initial model. Raises if no usable artifact exists."""
+        path = self._select_artifact()
+        if path is None:
+            if self.pinned_version:
+                raise FileNotFoundError(
+                    f"Pinned model version '{self.pinned_version}' not found in {self.model_dir}"
+                )
+            path = os.path.join(self.model_dir, LEGACY_PICKLE)
+            logger.warning(f"No .cbm model artifact found, falling back to {path}")
+
+        loaded = self._load_artifact(path)
+        self._swap(loaded)
+        return loaded
+
+    def _swap(self, loaded: LoadedModel):
+        with self._swap_lock:
+            previous = self._current
+            self._current = loaded
+        if previous is None:
+            logger.info(f"Loaded model version {loaded.version} from {loaded.path}")
+        else:
+            logger.info(f"Swapped model version {previous.version} -> {loaded.version}")
+
+    def current(self) -> LoadedModel:
+        """Return the active model snapshot. Hold on to it for the whole request."""
+        if self._current is None:
+            return self.load()
+        return self._current
+
+    def reload_if_changed(self) -> bool:
+        """Load and swap in the selected artifact if it differs from the active one."""
+        path = self._select_artifact()
+        if path is None:
+            return False
+
+        current = self._current
+        try:
+            fingerprint = self._fingerprint(path)
+        except FileNotFoundError:
+            return False
+        if current is not None and current.path == path and current.fingerprint == fingerprint:
+            return False
+
+        try:
+            loaded = self._load_artifact(path)
+        except Exception as e:
+            # Most likely a partially copied file; keep serving the current model
+            logger.error(f"Failed to load model artifact {path}: {e}")
+            return False
+
+        self._swap(loaded)
+        return True
+
+    # --- Watching ---
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.watch_interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logger.error(f"Model watcher error: {e}")
+
+    def start_watching(self):
+        """Start the directory watcher thread (idempotent, safe to call per worker)."""
+        if self.watch_interval <= 0:
+            return
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch_loop, name="model-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching {self.model_dir} for model updates every {self.watch_interval}s")
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.watch_interval + 1)
+            self._watcher = None
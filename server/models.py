@@ -1,5 +1,6 @@
 """Database models for MediGuard."""
 from sqlmodel import SQLModel, Field
+from sqlalchemy import UniqueConstraint, Index
 from typing import Optional
 from datetime import datetime
 import uuid
@@ -44,12 +45,14 @@ class PatientReport(SQLModel, table=True):
     raw_text: Optional[str] = None  # Original input text
     features_json: Optional[str] = None  # JSON dump of clean_features
     warnings_json: Optional[str] = None  # JSON dump of warnings
+    explanation_json: Optional[str] = None  # JSON dump of SHAP explanation
     
     # Metadata
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    blockchain_hash: Optional[str] = None  # Hash from blockchain log
-    blockchain_block_index: Optional[int] = None
+    blockchain_hash: Optional[str] = Field(default=None, index=True)  # Hash from blockchain log
+    blockchain_block_index: Optional[int] = Field(default=None, index=True)
     merkle_proof_json: Optional[str] = None
+    model_version: Optional[str] = None  # CatBoost model version that produced the predictions
     
     class Config:
         arbitrary_types_allowed = True
@@ -77,15 +80,66 @@ class DigitalPassport(SQLModel, table=True):
     
     # Security
     hmac_token: str
-    rsa_signature: str
+    rsa_signature: str  # Signature made with signature_algorithm (RSA-PSS for older rows)
+    signature_algorithm: Optional[str] = None
     
-    # QR Codes
-    qr_code_png_base64: str
-    qr_code_svg: str
+    # QR Codes (legacy rows only; images are now rendered on demand from verification_url)
+    qr_code_png_base64: Optional[str] = None
+    qr_code_svg: Optional[str] = None
     verification_url: str
     
     is_valid: bool = True
-    audit_trail_json: str  # JSON array of audit events
+    audit_trail_json: Optional[str] = None  # Legacy rows only; events are now PassportAuditEvent rows
     
     class Config:
         arbitrary_types_allowed = True
+
+class ChainCommitEntry(SQLModel, table=True):
+    """Durable, ordered queue of audit entries waiting to be signed onto the blockchain."""
+    
+    id: Optional[int] = Field(default=None, primary_key=True)  # Queue order
+    commit_id: str = Field(default_factory=lambda: str(uuid.uuid4()), unique=True, index=True)
+    patient_report_id: Optional[int] = Field(default=None, foreign_key="patientreport.id", index=True)
+    
+    payload_json: str  # Block data to append
+    status: str = Field(default="pending", index=True)  # "pending", "committed", "failed"
+    attempts: int = 0
+    last_error: Optional[str] = None
+    
+    # Filled in once the block is on the chain
+    block_index: Optional[int] = None
+    block_hash: Optional[str] = None
+    
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    committed_at: Optional[datetime] = None
+
+class BlockRecord(SQLModel, table=True):
+    """One block of the audit chain, when BLOCKCHAIN_BACKEND=sql."""
+    
+    block_index: int = Field(primary_key=True)  # 1-based, as in the block itself
+    block_hash: str = Field(unique=True, index=True)
+    prev_hash: str
+    timestamp: datetime = Field(index=True)
+    signature_algorithm: Optional[str] = None
+    
+    block_json: str  # The block exactly as signed and hashed
+
+class ChainHashIndex(SQLModel, table=True):
+    """Maps block hashes and features_hash values to the blocks that carry them."""
+    __table_args__ = (UniqueConstraint("hash", "block_index"),)
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    hash: str = Field(index=True)
+    kind: str  # "block" or "features"
+    block_index: int = Field(index=True)
+
+class PassportAuditEvent(SQLModel, table=True):
+    """One event in a passport's audit history. Append-only: one insert per event."""
+    __table_args__ = (Index("ix_passportauditevent_passport_id_id", "passport_id", "id"),)
+    
+    id: Optional[int] = Field(default=None, primary_key=True)  # Event order
+    passport_id: str  # DigitalPassport.passport_id
+    action: str  # "issued", "verified" or "revoked"
+    status: Optional[str] = None  # Verification outcome ("Valid", "Tampered", ...)
+    detail: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
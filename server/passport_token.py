@@ -0,0 +1,177 @@
+"""Compact, self-contained passport verification tokens.
+
+A token carries the passport claims and an Ed25519 signature over them:
+
+    v1.<base64url(claims JSON)>.<base64url(signature)>
+
+Verifying one is a signature check and an expiry check, with no database
+lookup, so scanning a QR code at a check-in desk never touches Postgres.
+Revoked passports are tracked in a small in-memory ``RevocationList`` that
+each worker refreshes from the database in the background.
+"""
+import os
+import json
+import time
+import base64
+import logging
+import threading
+from typing import Dict, Any, Optional, Callable, Iterable, Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+from signing import publish_new_file
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = "v1"
+
+
+class TokenError(Exception):
+    """Raised when a token is malformed, forged, expired or revoked."""
+
+    def __init__(self, reason: str, status: str = "Invalid"):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def is_compact_token(token: str) -> bool:
+    """Tell compact tokens apart from the legacy hex HMAC tokens."""
+    return token.startswith(TOKEN_VERSION + ".") and token.count(".") == 2
+
+
+def load_or_generate_key(key_file: str) -> Ed25519PrivateKey:
+    """Load the Ed25519 token key from ``key_file``, creating it on first use."""
+    try:
+        with open(key_file, "rb") as f:
+            return serialization.load_pem_private_key(f.read(), password=None)
+    except FileNotFoundError:
+        pass
+
+    key = Ed25519PrivateKey.generate()
+    try:
+        publish_new_file(key_file, key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        ))
+    except FileExistsError:
+        # Another worker or host created it first; every process must sign with the same key
+        with open(key_file, "rb") as f:
+            return serialization.load_pem_private_key(f.read(), password=None)
+    logger.info(f"Generated passport token key {key_file}")
+    return key
+
+
+class RevocationList:
+    """
+    In-memory set of revoked passport IDs.
+
+    Entries remember when the passport would have expired anyway, so they can
+    be dropped once no valid token for them can exist.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    def revoke(self, passport_id: str, expires_at: Optional[float] = None):
+        with self._lock:
+            self._revoked[passport_id] = expires_at
+
+    def is_revoked(self, passport_id: str) -> bool:
+        return passport_id in self._revoked
+
+    def replace(self, entries: Iterable[Tuple[str, Optional[float]]]):
+        """Swap in a fresh list (e.g. loaded from the database)."""
+        now = time.time()
+        revoked = {pid: exp for pid, exp in entries if exp is None or exp > now}
+        with self._lock:
+            self._revoked = revoked
+
+    def prune(self, now: Optional[float] = None):
+        now = now or time.time()
+        with self._lock:
+            self._revoked = {pid: exp for pid, exp in self._revoked.items() if exp is None or exp > now}
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def _refresh_loop(self, loader: Callable[[], Iterable[Tuple[str, Optional[float]]]], interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.replace(loader())
+            except Exception as e:
+                logger.error(f"Revocation list refresh failed: {e}")
+
+    def start_refreshing(self, loader: Callable[[], Iterable[Tuple[str, Optional[float]]]], interval: float):
+        """Reload from ``loader`` every ``interval`` seconds so revocations reach every worker."""
+        if interval <= 0:
+            return
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._stop.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, args=(loader, interval), name="revocation-refresh", daemon=True
+        )
+        self._refresher.start()
+
+    def stop_refreshing(self):
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+
+class PassportTokenSigner:
+    """Issues and verifies compact Ed25519-signed passport tokens."""
+
+    def __init__(self, private_key: Ed25519PrivateKey, ttl_seconds: int = 365 * 24 * 3600,
+                 revocations: Optional[RevocationList] = None):
+        self.private_key = private_key
+        self.public_key: Ed25519PublicKey = private_key.public_key()
+        self.ttl_seconds = ttl_seconds
+        self.revocations = revocations if revocations is not None else RevocationList()
+
+    def issue(self, claims: Dict[str, Any], issued_at: Optional[int] = None) -> str:
+        """Sign ``claims`` (must include ``pid``) with ``iat``/``exp`` added."""
+        issued_at = int(issued_at if issued_at is not None else time.time())
+        body = dict(claims, iat=issued_at, exp=issued_at + self.ttl_seconds)
+        payload = _b64encode(json.dumps(body, separators=(",", ":"), sort_keys=True).encode())
+        signing_input = f"{TOKEN_VERSION}.{payload}".encode("ascii")
+        return f"{TOKEN_VERSION}.{payload}.{_b64encode(self.private_key.sign(signing_input))}"
+
+    def verify(self, token: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """Return the claims of a valid token, or raise ``TokenError``."""
+        if not is_compact_token(token):
+            raise TokenError("Malformed token")
+        version, payload, signature = token.split(".")
+
+        try:
+            self.public_key.verify(_b64decode(signature), f"{version}.{payload}".encode("ascii"))
+        except (InvalidSignature, ValueError):
+            raise TokenError("Invalid signature", status="Tampered")
+
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            raise TokenError("Malformed claims")
+
+        now = now if now is not None else time.time()
+        if claims.get("exp") is not None and now >= claims["exp"]:
+            raise TokenError("Token expired", status="Expired")
+        if self.revocations.is_revoked(claims.get("pid", "")):
+            raise TokenError("Passport revoked", status="Revoked")
+        return claims
@@ -0,0 +1,84 @@
+"""Prediction result cache.
+
+Sparse lab panels collapse to the same scaled feature vector after the
+ScalingBridge, so many requests ask the model (and SHAP) the exact same
+question. This LRU cache stores the scored result per (feature row, model
+version) so repeats skip inference entirely.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+HITS = metrics.counter("mediguard_prediction_cache_hits_total", "Prediction cache hits")
+MISSES = metrics.counter("mediguard_prediction_cache_misses_total", "Prediction cache misses")
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of inference results with hit-rate counters."""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = max(0, capacity)
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(input_df: pd.DataFrame, model_version: str) -> str:
+        """Hash the ordered single-row feature vector together with the model version."""
+        h = hashlib.sha256()
+        h.update(model_version.encode())
+        h.update("\x1f".join(input_df.columns).encode())
+        h.update(np.ascontiguousarray(input_df.iloc[0].to_numpy(dtype=np.float64)).tobytes())
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.capacity == 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        metrics.record_count(MISSES if entry is None else HITS)
+        return entry
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a result. Callers must treat stored values as read-only."""
+        if self.capacity == 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def values(self) -> List[Dict[str, Any]]:
+        """Snapshot of the cached results (for memory diagnostics)."""
+        with self._lock:
+            return list(self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -10,8 +10,10 @@ import os
 import json
 import logging
 from typing import Dict, Any, List
-import google.generativeai as genai
 from dotenv import load_dotenv
+
+import metrics
+from gemini_client import create_gemini_model
 import shap
 import pandas as pd
 import numpy as np
@@ -22,14 +24,11 @@ logger = logging.getLogger(__name__)
 
 class PredictiveAgent:
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-        else:
-            self.model = None
+        self.model = create_gemini_model(agent="predictive")
+        if self.model is None:
             logger.warning("No GEMINI_API_KEY found. Predictive capabilities disabled.")
 
+    @metrics.timed(metrics.AGENT_SECONDS, agent="predictive", operation="generate_predictions")
     def generate_predictions(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Generate predictive insights based on clinical features."""
         if not self.model:
@@ -66,7 +65,8 @@ class PredictiveAgent:
             logger.error(f"Predictive analysis failed: {e}")
             return self._get_mock_predictions()
 
-    def explain_prediction(self, model, input_df: pd.DataFrame, predicted_class_idx: int) -> Dict[str, Any]:
+    @metrics.timed(metrics.AGENT_SECONDS, agent="predictive", operation="explain_prediction")
+    def explain_prediction(self, model, input_df: pd.DataFrame, predicted_class_idx: int, explainer=None) -> Dict[str, Any]:
         """
         Generate SHAP explanations for the model's prediction.
         
@@ -74,13 +74,15 @@ class PredictiveAgent:
             model: The trained CatBoost model.
             input_df: DataFrame containing the single instance to explain.
             predicted_class_idx: The index of the predicted class.
+            explainer: Optional prebuilt TreeExplainer for ``model``. Built on demand if omitted.
             
         Returns:
             Dict containing top contributing features.
         """
         try:
             # Create explainer (TreeExplainer is optimized for CatBoost)
-            explainer = shap.TreeExplainer(model)
+            if explainer is None:
+                explainer = shap.TreeExplainer(model)
             
             # Calculate SHAP values
             shap_values = explainer.shap_values(input_df)
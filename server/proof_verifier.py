@@ -0,0 +1,123 @@
+"""Offline check of a report inclusion proof from ``GET /api/reports/{id}/proof``.
+
+Standalone on purpose (standard library + ``cryptography`` only), so an
+auditor can copy this one file and check a report without the server or
+the chain. The work is O(log n): one hash per proof step, one block hash and
+one signature check.
+
+    python proof_verifier.py proof.json public_key.pem
+
+Pin the public key you trust; the key embedded in the bundle is only used
+when none is given, and then the check only shows internal consistency.
+"""
+import sys
+import json
+import base64
+import hashlib
+from typing import Dict, Any, List, Optional
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+
+RSA_PSS = "RSA-PSS-SHA256"
+ED25519 = "Ed25519"
+
+# Block fields that are not covered by the block hash
+UNHASHED_FIELDS = ("hash", "signature", "rsa_signature", "is_valid")
+
+
+def leaf_hash(data: Dict[str, Any]) -> str:
+    """Merkle leaf for a block's data: canonical JSON without the leaf position."""
+    content = {k: v for k, v in data.items() if k != "merkle_leaf"}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def root_from_proof(leaf: str, proof: List[Dict[str, str]]) -> str:
+    """Fold a directional proof up to the root (parent = sha256(left_hex + right_hex))."""
+    current = leaf
+    for node in proof:
+        combined = current + node["hash"] if node["direction"] == "right" else node["hash"] + current
+        current = hashlib.sha256(combined.encode()).hexdigest()
+    return current
+
+
+def block_hash(block: Dict[str, Any]) -> str:
+    content = {k: v for k, v in block.items() if k not in UNHASHED_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def verify_signature(public_key_pem: bytes, algorithm: str, data: bytes, signature_b64: str) -> bool:
+    public_key = serialization.load_pem_public_key(public_key_pem)
+    try:
+        signature = base64.b64decode(signature_b64)
+        if algorithm == ED25519:
+            public_key.verify(signature, data)
+        elif algorithm == RSA_PSS:
+            public_key.verify(
+                signature, data,
+                padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
+                hashes.SHA256(),
+            )
+        else:
+            return False
+        return True
+    except (InvalidSignature, ValueError, TypeError, AttributeError):
+        # AttributeError/TypeError: key type does not match the algorithm
+        return False
+
+
+def verify_report_proof(bundle: Dict[str, Any], public_key_pem: Optional[bytes] = None,
+                        features: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Check a proof bundle. Returns ``{"is_valid": bool, "errors": [...]}``.
+
+    ``features``, when given, are the report's features as the caller holds
+    them; they must hash to the block's ``features_hash``.
+    """
+    errors = []
+    block = bundle["block"]
+    data = block.get("data") or {}
+
+    leaf = leaf_hash(data)
+    if leaf != bundle.get("leaf"):
+        errors.append("Leaf does not match the block data")
+    if data.get("merkle_leaf") != bundle.get("leaf_index"):
+        errors.append("Leaf index does not match the block")
+    if root_from_proof(leaf, bundle.get("proof", [])) != block.get("merkle_root"):
+        errors.append("Proof does not lead to the block's Merkle root")
+
+    expected_hash = block_hash(block)
+    if expected_hash != block.get("hash"):
+        errors.append("Block hash mismatch")
+
+    key = public_key_pem or (bundle.get("public_key") or "").encode()
+    algorithm = block.get("signature_algorithm") or RSA_PSS
+    if not key:
+        errors.append("No public key to check the signature with")
+    elif not verify_signature(key, algorithm, expected_hash.encode(), block.get("signature", "")):
+        errors.append(f"Invalid {algorithm} block signature")
+
+    if features is not None:
+        # Analysis blocks record an MD5 of the canonical features JSON
+        if hashlib.md5(json.dumps(features, sort_keys=True).encode()).hexdigest() != data.get("features_hash"):
+            errors.append("Features do not match the block's features_hash")
+
+    return {"is_valid": not errors, "errors": errors}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python proof_verifier.py proof.json [public_key.pem]")
+        sys.exit(2)
+    with open(sys.argv[1]) as f:
+        proof_bundle = json.load(f)
+    pinned_key = None
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "rb") as f:
+            pinned_key = f.read()
+    result = verify_report_proof(proof_bundle, pinned_key)
+    print("VALID" if result["is_valid"] else "INVALID")
+    for error in result["errors"]:
+        print(f"  - {error}")
+    sys.exit(0 if result["is_valid"] else 1)
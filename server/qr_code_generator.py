@@ -1,40 +1,80 @@
+import os
+import base64
+import functools
+from io import BytesIO
+from typing import Dict, Any
+
 import qrcode
 import qrcode.image.svg
-from io import BytesIO
-import base64
+
+# Rendered images kept per process, keyed on the encoded data
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "512"))
+
+
+@functools.lru_cache(maxsize=QR_CACHE_SIZE)
+def _render_png(data: str) -> bytes:
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+@functools.lru_cache(maxsize=QR_CACHE_SIZE)
+def _render_svg(data: str) -> bytes:
+    factory = qrcode.image.svg.SvgImage
+    img = qrcode.make(data, image_factory=factory)
+
+    buffered = BytesIO()
+    img.save(buffered)
+    return buffered.getvalue()
+
 
 class QRCodeGenerator:
     """
     Generates QR codes for Digital Passports.
+
+    Images are rendered on demand from the verification URL rather than
+    stored with the passport; renders are memoised in an LRU cache.
     """
-    
+
+    MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+    @staticmethod
+    def render(data: str, fmt: str = "png") -> bytes:
+        """Render ``data`` as a PNG or SVG QR code (cached)."""
+        if fmt == "png":
+            return _render_png(data)
+        if fmt == "svg":
+            return _render_svg(data)
+        raise ValueError(f"Unsupported QR format: {fmt}")
+
     @staticmethod
     def generate_png_base64(data: str) -> str:
         """Generates a PNG QR code and returns it as a base64 string."""
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+        return base64.b64encode(_render_png(data)).decode("utf-8")
 
     @staticmethod
     def generate_svg(data: str) -> str:
         """Generates an SVG QR code and returns it as a string."""
-        factory = qrcode.image.svg.SvgImage
-        img = qrcode.make(data, image_factory=factory)
-        
-        buffered = BytesIO()
-        img.save(buffered)
-        return buffered.getvalue().decode("utf-8")
+        return _render_svg(data).decode("utf-8")
+
+    @staticmethod
+    def cache_info() -> Dict[str, Any]:
+        info = {}
+        for fmt, fn in (("png", _render_png), ("svg", _render_svg)):
+            stats = fn.cache_info()
+            info[fmt] = {"hits": stats.hits, "misses": stats.misses, "size": stats.currsize, "capacity": stats.maxsize}
+        return info
 
     @staticmethod
     def create_verification_url(passport_id: str, token: str, base_url: str = "https://mediguard.io/verify") -> str:
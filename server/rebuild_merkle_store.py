@@ -0,0 +1,43 @@
+"""Rebuild the reports Merkle store (MERKLE_STORE_FILE) from the leaves recorded on the chain.
+
+For a lost or damaged tree file. Only blocks carrying ``merkle_leaf`` contribute,
+in leaf order. Usage: python rebuild_merkle_store.py [workers]
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import engine
+from chain_store import create_chain_store
+from chain_commit_queue import merkle_leaf
+from merkle_store import MerkleStore
+
+
+def _leaves(store):
+    expected = 0
+    for block in store.iter_blocks():
+        data = block.get("data")
+        if not isinstance(data, dict) or "merkle_leaf" not in data:
+            continue
+        if data["merkle_leaf"] != expected:
+            raise ValueError(f"Block {block['index']} records leaf {data['merkle_leaf']}, expected {expected}")
+        expected += 1
+        yield merkle_leaf(data)
+
+
+def rebuild_merkle_store(workers: int = 1):
+    path = os.getenv("MERKLE_STORE_FILE", "merkle_tree.bin")
+    store = create_chain_store(
+        os.getenv("BLOCKCHAIN_BACKEND", "file"), "blockchain.json", engine,
+        segment_dir=os.getenv("BLOCKCHAIN_SEGMENT_DIR", "blockchain_segments"),
+    )
+    tree = MerkleStore.from_leaves(path, _leaves(store), workers=workers)
+    print(f"Rebuilt {path}: {len(tree)} leaves, root {tree.root() or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(rebuild_merkle_store(int(sys.argv[1]) if len(sys.argv) > 1 else 1))
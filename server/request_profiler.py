@@ -0,0 +1,213 @@
+"""On-demand request profiling.
+
+Wraps selected endpoints in a lightweight sampling profiler when a request
+asks for it (admin header) or is picked by a sampling rate, and saves the
+result as collapsed stacks (``frame;frame;frame count`` per line). The files
+load directly into flamegraph.pl, speedscope or inferno.
+
+The sampler is a background thread that reads the handling thread's stack
+from ``sys._current_frames()`` at a fixed interval, so there is no tracing
+overhead on requests that are not profiled. For async endpoints the handling
+thread is the event loop, so samples taken while the request is awaiting may
+show other requests' work.
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import random
+import inspect
+import logging
+import datetime
+import functools
+import threading
+import contextvars
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+
+# Set per request by ProfilingMiddleware when the admin header is valid
+profile_requested: contextvars.ContextVar[bool] = contextvars.ContextVar("profile_requested", default=False)
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(self._frame_label(frame))
+            frame = frame.f_back
+        stack.reverse()
+        self.samples[";".join(stack)] += 1
+        self.sample_count += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+
+class ProfileStore:
+    """Saves collapsed-stack profiles with a JSON sidecar describing each one."""
+
+    SUFFIX = ".collapsed"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def save(self, endpoint: str, profiler: SamplingProfiler) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+        name = f"{stamp}-{endpoint}-{uuid.uuid4().hex[:8]}"
+        with open(os.path.join(self.directory, name + self.SUFFIX), "w") as f:
+            f.write(profiler.collapsed())
+        meta = {
+            "name": name,
+            "endpoint": endpoint,
+            "created_at": datetime.datetime.now().isoformat(),
+            "duration_ms": round(profiler.duration * 1000, 2),
+            "samples": profiler.sample_count,
+            "interval_ms": profiler.interval * 1000,
+        }
+        with open(os.path.join(self.directory, name + ".json"), "w") as f:
+            json.dump(meta, f)
+        return name
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), "r") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda p: p.get("created_at", ""), reverse=True)
+
+    def path_for(self, name: str) -> Optional[str]:
+        """Resolve a profile name to its file, refusing anything outside the store."""
+        if os.path.basename(name) != name:
+            return None
+        path = os.path.join(self.directory, name + self.SUFFIX)
+        return path if os.path.isfile(path) else None
+
+
+class RequestProfiler:
+    """Decides which requests to profile and wraps endpoints accordingly."""
+
+    def __init__(self, store: ProfileStore, sample_rate: float = 0.0, interval_ms: float = 5.0):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000.0
+
+    def _should_profile(self) -> bool:
+        if profile_requested.get():
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _start(self) -> SamplingProfiler:
+        profiler = SamplingProfiler(threading.get_ident(), self.interval)
+        profiler.start()
+        return profiler
+
+    def _finish(self, endpoint: str, profiler: SamplingProfiler):
+        profiler.stop()
+        try:
+            name = self.store.save(endpoint, profiler)
+            logger.info(f"Saved profile {name} ({profiler.sample_count} samples)")
+        except OSError as e:
+            logger.error(f"Failed to save profile for {endpoint}: {e}")
+
+    def profiled(self, endpoint: str):
+        """Decorator for FastAPI endpoints (sync or async)."""
+        def decorator(fn):
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    if not self._should_profile():
+                        return await fn(*args, **kwargs)
+                    profiler = self._start()
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        self._finish(endpoint, profiler)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self._should_profile():
+                    return fn(*args, **kwargs)
+                profiler = self._start()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self._finish(endpoint, profiler)
+            return wrapper
+        return decorator
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that flags a request for profiling when it carries the admin token."""
+
+    def __init__(self, app, admin_token: Optional[str]):
+        self.app = app
+        self.admin_token = admin_token.encode() if admin_token else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.admin_token is None:
+            return await self.app(scope, receive, send)
+
+        requested = False
+        for key, value in scope.get("headers", []):
+            if key == PROFILE_HEADER:
+                requested = hmac.compare_digest(value, self.admin_token)
+                break
+
+        if not requested:
+            return await self.app(scope, receive, send)
+
+        token = profile_requested.set(True)
+        try:
+            return await self.app(scope, receive, send)
+        finally:
+            profile_requested.reset(token)
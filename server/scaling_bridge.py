@@ -8,6 +8,8 @@ from __future__ import annotations
 import json
 from typing import Dict, Any, Optional
 
+import metrics
+
 # Re-use ranges from DataQualityAgent for consistency
 # In a real app, these might be shared in a config file
 PHYSIO_RANGES = {
@@ -29,6 +31,7 @@ PHYSIO_RANGES = {
 class ScalingBridge:
     """Scales features to [0, 1] range."""
 
+    @metrics.timed(metrics.AGENT_SECONDS, agent="scaling", operation="scale_features")
     def scale_features(self, clean_features: Dict[str, Any]) -> Dict[str, Any]:
         scaled_features = {}
         
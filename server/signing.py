@@ -0,0 +1,207 @@
+"""Signature backends for blocks and passports.
+
+Two algorithms are supported:
+
+* ``RSA-PSS-SHA256`` - the original RSA-4096 key with PSS padding. Signing
+  takes several milliseconds; kept so existing chains and passports verify.
+* ``Ed25519`` - roughly two orders of magnitude faster to sign and much
+  cheaper to verify, which matters for full-chain audits.
+
+Every block and passport records the algorithm it was signed with, and
+verification dispatches on that field, so a chain that switched algorithms
+part-way through still validates.
+"""
+import os
+import abc
+import base64
+import logging
+import secrets
+from typing import Dict, Optional
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+logger = logging.getLogger(__name__)
+
+RSA_PSS = "RSA-PSS-SHA256"
+ED25519 = "Ed25519"
+
+# Accepted spellings for SIGNING_ALGORITHM
+ALGORITHM_ALIASES = {
+    "rsa": RSA_PSS, "rsa-pss": RSA_PSS, RSA_PSS.lower(): RSA_PSS,
+    "ed25519": ED25519,
+}
+
+# Key files per algorithm (private, public), relative to the working directory
+KEY_FILES = {
+    RSA_PSS: ("private_key.pem", "public_key.pem"),
+    ED25519: ("ed25519_private_key.pem", "ed25519_public_key.pem"),
+}
+
+
+def normalize_algorithm(name: Optional[str]) -> str:
+    algorithm = ALGORITHM_ALIASES.get((name or "rsa").strip().lower())
+    if algorithm is None:
+        raise ValueError(f"Unsupported signing algorithm: {name}")
+    return algorithm
+
+
+class Signer(abc.ABC):
+    """Signs with a private key and verifies with the matching public key."""
+
+    algorithm = ""
+
+    def __init__(self, private_key=None, public_key=None):
+        self.private_key = private_key
+        self.public_key = public_key if public_key is not None else private_key.public_key()
+
+    @abc.abstractmethod
+    def _sign(self, data: bytes) -> bytes:
+        """Raw signature over ``data``."""
+
+    @abc.abstractmethod
+    def _verify(self, signature: bytes, data: bytes):
+        """Raise ``InvalidSignature`` unless ``signature`` is valid for ``data``."""
+
+    def sign(self, data: bytes) -> str:
+        """Sign ``data`` and return the base64 signature."""
+        if self.private_key is None:
+            raise RuntimeError(f"No {self.algorithm} private key loaded")
+        return base64.b64encode(self._sign(data)).decode("utf-8")
+
+    def verify(self, data: bytes, signature_b64: str) -> bool:
+        try:
+            self._verify(base64.b64decode(signature_b64), data)
+            return True
+        except (InvalidSignature, ValueError, TypeError):
+            return False
+
+    def private_pem(self) -> bytes:
+        return self.private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+
+    def public_pem(self) -> bytes:
+        return self.public_key.public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+
+
+class RSAPSSSigner(Signer):
+    algorithm = RSA_PSS
+
+    @staticmethod
+    def _padding():
+        return padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+    @classmethod
+    def generate(cls) -> "RSAPSSSigner":
+        return cls(rsa.generate_private_key(public_exponent=65537, key_size=4096))
+
+    def _sign(self, data: bytes) -> bytes:
+        return self.private_key.sign(data, self._padding(), hashes.SHA256())
+
+    def _verify(self, signature: bytes, data: bytes):
+        self.public_key.verify(signature, data, self._padding(), hashes.SHA256())
+
+
+class Ed25519Signer(Signer):
+    algorithm = ED25519
+
+    @classmethod
+    def generate(cls) -> "Ed25519Signer":
+        return cls(Ed25519PrivateKey.generate())
+
+    def _sign(self, data: bytes) -> bytes:
+        return self.private_key.sign(data)
+
+    def _verify(self, signature: bytes, data: bytes):
+        self.public_key.verify(signature, data)
+
+
+SIGNER_CLASSES = {RSA_PSS: RSAPSSSigner, ED25519: Ed25519Signer}
+
+
+def publish_new_file(path: str, data: bytes, mode: int = 0o600):
+    """
+    Create ``path`` holding ``data``, or raise ``FileExistsError`` if it exists.
+
+    The data is written to an exclusive temp file and hard-linked into place,
+    so readers never see a partial key file and, unlike ``os.replace``, a
+    concurrent creator (another worker, or another host on a shared volume)
+    cannot overwrite it.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{secrets.token_hex(4)}.tmp"
+    fd = os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, mode)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.link(tmp_path, path)
+    finally:
+        os.unlink(tmp_path)
+
+
+def signer_from_pem(algorithm: str, private_pem: bytes) -> Signer:
+    """Rebuild a signer from a private key PEM (e.g. inside a worker process)."""
+    return SIGNER_CLASSES[algorithm](serialization.load_pem_private_key(private_pem, password=None))
+
+
+def load_signer(algorithm: str, generate: bool = True) -> Optional[Signer]:
+    """
+    Load the key pair for ``algorithm`` from its key files.
+
+    Generates and saves a new pair when none exists and ``generate`` is set;
+    otherwise returns None. A public key on its own is loaded verify-only.
+    """
+    key_file, pub_file = KEY_FILES[algorithm]
+    cls = SIGNER_CLASSES[algorithm]
+
+    if os.path.exists(key_file):
+        with open(key_file, "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None)
+        public_key = None
+        if os.path.exists(pub_file):
+            with open(pub_file, "rb") as f:
+                public_key = serialization.load_pem_public_key(f.read())
+        return cls(private_key, public_key)
+
+    if os.path.exists(pub_file):
+        with open(pub_file, "rb") as f:
+            return cls(public_key=serialization.load_pem_public_key(f.read()))
+
+    if not generate:
+        return None
+
+    signer = cls.generate()
+    try:
+        publish_new_file(key_file, signer.private_pem())
+    except FileExistsError:
+        # Another worker generated the pair first; sign with theirs
+        return load_signer(algorithm, generate=False)
+    try:
+        publish_new_file(pub_file, signer.public_pem(), mode=0o644)
+    except FileExistsError:
+        pass
+    logger.info(f"Generated {algorithm} signing key {key_file}")
+    return signer
+
+
+class SignatureVerifier:
+    """Verifies signatures of any configured algorithm, dispatching on the recorded name."""
+
+    def __init__(self, signers: Dict[str, Signer]):
+        self.signers = signers
+
+    def verify(self, data: bytes, signature_b64: str, algorithm: Optional[str]) -> bool:
+        # Records predating the algorithm field were always RSA-PSS
+        signer = self.signers.get(algorithm or RSA_PSS)
+        if signer is None:
+            return False
+        return signer.verify(data, signature_b64)
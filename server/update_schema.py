@@ -28,6 +28,50 @@ def update_schema():
             print("Added merkle_proof_json")
         except Exception as e:
             print(f"merkle_proof_json might already exist: {e}")
+
+        try:
+            # Add model_version
+            conn.execute(text("ALTER TABLE patientreport ADD COLUMN model_version VARCHAR;"))
+            print("Added model_version")
+        except Exception as e:
+            print(f"model_version might already exist: {e}")
+
+        try:
+            # Add explanation_json
+            conn.execute(text("ALTER TABLE patientreport ADD COLUMN explanation_json TEXT;"))
+            print("Added explanation_json")
+        except Exception as e:
+            print(f"explanation_json might already exist: {e}")
+
+        try:
+            # QR images are rendered on demand; stop requiring them on new passports
+            conn.execute(text("ALTER TABLE digitalpassport ALTER COLUMN qr_code_png_base64 DROP NOT NULL;"))
+            conn.execute(text("ALTER TABLE digitalpassport ALTER COLUMN qr_code_svg DROP NOT NULL;"))
+            print("Made passport QR columns nullable")
+        except Exception as e:
+            print(f"Could not relax passport QR columns: {e}")
+
+        try:
+            # Add signature_algorithm (NULL means the original RSA-PSS signature)
+            conn.execute(text("ALTER TABLE digitalpassport ADD COLUMN signature_algorithm VARCHAR;"))
+            print("Added signature_algorithm")
+        except Exception as e:
+            print(f"signature_algorithm might already exist: {e}")
+
+        try:
+            # Provenance lookups go by block hash and index
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_patientreport_blockchain_hash ON patientreport (blockchain_hash);"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_patientreport_blockchain_block_index ON patientreport (blockchain_block_index);"))
+            print("Indexed blockchain_hash and blockchain_block_index")
+        except Exception as e:
+            print(f"Could not index blockchain columns: {e}")
+
+        try:
+            # Audit events moved to the passportauditevent table; new passports leave this empty
+            conn.execute(text("ALTER TABLE digitalpassport ALTER COLUMN audit_trail_json DROP NOT NULL;"))
+            print("Made audit_trail_json nullable")
+        except Exception as e:
+            print(f"Could not relax audit_trail_json: {e}")
             
         conn.commit()
     print("Schema update complete.")
@@ -0,0 +1,100 @@
+"""Passport verification result cache.
+
+A passport's signed data never changes after issuance, so checking the same
+(passport_id, token) again - the same QR code scanned at every door of an
+event - always gives the same answer until the passport is revoked. This
+cache keeps successful verifications for a TTL, so repeat scans skip the
+full row fetch, payload reconstruction, HMAC and signature check.
+
+Only "Valid" outcomes are cached: forged tokens cannot fill the cache, and a
+revoked passport is never served from it. Revocation state lives in the
+database and is shared by every worker, so callers re-read the passport's
+``is_valid`` flag (an indexed single-column lookup) on every hit and
+invalidate the entry when it has been revoked, wherever that happened.
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set, Tuple
+
+import metrics
+
+LOOKUPS = metrics.counter(
+    "mediguard_passport_verification_cache_total", "Passport verification cache lookups by outcome", ["result"]
+)
+
+
+class VerificationCache:
+    """Thread-safe LRU of verification results with a TTL and per-passport invalidation."""
+
+    def __init__(self, capacity: int = 10000, ttl_seconds: float = 300.0):
+        self.capacity = max(0, capacity)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._by_passport: Dict[str, Set[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, key: Tuple[str, str]):
+        self._entries.pop(key, None)
+        keys = self._by_passport.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_passport[key[0]]
+
+    def get(self, passport_id: str, token: str) -> Optional[Dict[str, Any]]:
+        if self.capacity == 0:
+            return None
+        key = (passport_id, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                metrics.record_count(LOOKUPS, result="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        metrics.record_count(LOOKUPS, result="hit")
+        return entry[1]
+
+    def put(self, passport_id: str, token: str, result: Dict[str, Any]):
+        """Store a result. Callers must treat stored values as read-only."""
+        if self.capacity == 0:
+            return
+        key = (passport_id, token)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            self._by_passport.setdefault(passport_id, set()).add(key)
+            while len(self._entries) > self.capacity:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, passport_id: str):
+        """Forget every cached result for a passport (e.g. on revocation)."""
+        with self._lock:
+            for key in list(self._by_passport.get(passport_id, ())):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_passport.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "ttl_seconds": self.ttl_seconds,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,113 @@
+import sys
+import os
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+import main
+from main import app, get_session
+from models import PatientReport
+from auth_tokens import AccessTokenSigner, AuthTokenError, PasswordHasher, PasswordHasherBusy, load_or_generate_secret
+
+
+def test_tokens_round_trip_and_reject_tampering_and_expiry(tmp_path):
+    secret = load_or_generate_secret(str(tmp_path / "secret.key"))
+    assert load_or_generate_secret(str(tmp_path / "secret.key")) == secret
+    assert os.stat(tmp_path / "secret.key").st_mode & 0o777 == 0o600
+    assert os.listdir(tmp_path) == ["secret.key"]
+    signer = AccessTokenSigner(secret, ttl_seconds=60)
+
+    token = signer.issue({"sub": 7, "pid": "p-7"}, issued_at=1000)
+    claims = signer.verify(token, now=1030)
+    assert (claims["sub"], claims["pid"], claims["exp"]) == (7, "p-7", 1060)
+
+    with pytest.raises(AuthTokenError, match="expired"):
+        signer.verify(token, now=1060)
+    version, payload, signature = token.split(".")
+    forged_payload = signer.issue({"sub": 8, "pid": "p-8"}, issued_at=1000).split(".")[1]
+    with pytest.raises(AuthTokenError, match="signature"):
+        signer.verify(f"{version}.{forged_payload}.{signature}", now=1030)
+    with pytest.raises(AuthTokenError, match="signature"):
+        AccessTokenSigner(b"other secret").verify(token, now=1030)
+    with pytest.raises(AuthTokenError, match="Malformed"):
+        signer.verify("not-a-token")
+
+
+def test_password_pool_refuses_work_beyond_its_bound():
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=4)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(hasher._run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.verify("password", "hash")
+        release.set()
+        await first
+        hashed = await hasher.hash("password")
+        assert await hasher.verify("password", hashed)
+        assert not await hasher.verify("wrong", hashed)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+
+
+def test_login_issues_token_used_instead_of_patient_id(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+
+    def get_test_session():
+        with Session(engine) as session:
+            yield session
+
+    hasher = PasswordHasher(rounds=4)
+    monkeypatch.setattr(main, "password_hasher", hasher)
+
+    # Database calls must run on the threadpool, not on the event loop
+    lookups_on_loop = []
+    user_by_email = main._user_by_email
+
+    def recording_user_by_email(session, email):
+        try:
+            asyncio.get_running_loop()
+            lookups_on_loop.append(email)
+        except RuntimeError:
+            pass
+        return user_by_email(session, email)
+
+    monkeypatch.setattr(main, "_user_by_email", recording_user_by_email)
+    client = TestClient(app)
+    app.dependency_overrides[get_session] = get_test_session
+    try:
+        user = client.post("/api/auth/signup", json={"name": "Ana", "email": "ana@example.com", "password": "pw"}).json()["user"]
+        assert client.post("/api/auth/login", json={"email": "ana@example.com", "password": "nope"}).status_code == 401
+
+        login = client.post("/api/auth/login", json={"email": "ana@example.com", "password": "pw"}).json()
+        assert login["token_type"] == "bearer"
+        headers = {"Authorization": f"Bearer {login['access_token']}"}
+
+        me = client.get("/api/auth/me", headers=headers).json()
+        assert (me["id"], me["patient_id"], me["email"]) == (user["id"], user["patient_id"], "ana@example.com")
+        assert client.get("/api/auth/me").status_code == 401
+        assert client.get("/api/auth/me", headers={"Authorization": "Bearer v1.e30.AAAA"}).status_code == 401
+
+        with Session(engine) as session:
+            for patient_id in (user["patient_id"], "someone-else"):
+                session.add(PatientReport(patient_id=patient_id, health_score=80, triage_category="Green", features_json="{}"))
+            session.commit()
+        assert lookups_on_loop == []
+
+        reports = client.get("/api/reports", headers=headers).json()["reports"]
+        assert len(reports) == 1
+        assert len(client.get("/api/reports").json()["reports"]) == 2
+    finally:
+        app.dependency_overrides.pop(get_session, None)
+        hasher.shutdown()
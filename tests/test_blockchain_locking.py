@@ -0,0 +1,60 @@
+import sys
+import os
+import json
+import multiprocessing
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from blockchain_manager import BlockchainManager
+
+APPENDS_PER_WORKER = 15
+
+
+def _append_many(chain_file, worker):
+    # Each process has its own manager, like separate uvicorn workers
+    manager = BlockchainManager(chain_file, signing_algorithm="ed25519")
+    for n in range(APPENDS_PER_WORKER):
+        manager.append_block({"worker": worker, "n": n})
+
+
+def test_concurrent_appends_from_several_processes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    chain_file = str(tmp_path / "chain.json")
+
+    # No key pair yet: the workers race to create it and must all end up signing with the same key
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_append_many, args=(chain_file, w)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+
+    manager = BlockchainManager(chain_file, signing_algorithm="ed25519")
+    chain = manager.chain
+    assert len(chain) == 4 * APPENDS_PER_WORKER
+    assert [b["index"] for b in chain] == list(range(1, len(chain) + 1))
+    report = manager.validate_chain()
+    assert report["is_valid"], report["errors"]
+    # Every process's blocks landed, in its own order
+    for w in range(4):
+        assert [b["data"]["n"] for b in chain if b["data"]["worker"] == w] == list(range(APPENDS_PER_WORKER))
+
+
+def test_stale_manager_reloads_before_appending(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    chain_file = str(tmp_path / "chain.json")
+    first = BlockchainManager(chain_file, signing_algorithm="ed25519")
+    second = BlockchainManager(chain_file, signing_algorithm="ed25519")
+
+    first.append_block({"n": 1})
+    block = second.append_block({"n": 2})
+
+    assert block["index"] == 2
+    assert block["prev_hash"] == first.chain[0]["hash"]
+    with open(chain_file) as f:
+        assert len(json.load(f)) == 2
+    # No temp files are left behind by the atomic rewrite
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ["chain.json", "chain.json.lock", "ed25519_private_key.pem", "ed25519_public_key.pem"]
+    )
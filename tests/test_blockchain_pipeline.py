@@ -9,6 +9,7 @@ from sqlmodel.pool import StaticPool
 # Add server directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
 
+import main
 from main import app, get_session
 from models import PatientReport, DigitalPassport
 from blockchain_manager import BlockchainManager
@@ -29,6 +30,8 @@ def get_test_session():
         yield session
 
 app.dependency_overrides[get_session] = get_test_session
+main.commit_queue.engine = engine
+main.chain_index.engine = engine
 
 client = TestClient(app)
 
@@ -84,10 +87,22 @@ def test_full_pipeline(session):
     assert "report_id" in data
     report_id = data["report_id"]
     
+    # The block is queued, then signed and appended by the commit worker
+    pending = data["blockchain_log"]
+    assert pending["status"] == "pending"
+    assert main.commit_queue.process_pending() >= 1
+    
+    response = client.get(pending["status_url"])
+    assert response.status_code == 200
+    commit = response.json()
+    assert commit["status"] == "committed"
+    assert commit["patient_report_id"] == report_id
+    
     # Verify Block
-    block = data["blockchain_log"]
-    assert block["rsa_signature"] is not None
+    block = client.get(f"/api/blockchain/block/{commit['block_index']}").json()
+    assert block["signature"] is not None
     assert block["is_valid"] is True
+    assert session.get(PatientReport, report_id).blockchain_hash == block["hash"]
     
     # 2. Issue Passport
     response = client.post(f"/api/passport/issue?report_id={report_id}")
@@ -97,7 +112,12 @@ def test_full_pipeline(session):
     passport_id = passport_data["passport_id"]
     token = passport_data["hmac_token"]
     
-    assert passport_data["qr_code_png_base64"] is not None
+    assert passport_data["verification_url"] is not None
+
+    # QR image is rendered on demand rather than stored with the passport
+    response = client.get(f"/api/passport/{passport_id}/qr")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
     
     # 3. Verify Passport
     response = client.get(f"/api/passport/verify/{passport_id}?token={token}")
@@ -0,0 +1,57 @@
+import sys
+import os
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+import main
+from chain_store import FileChainStore
+from signing import Ed25519Signer
+
+client = TestClient(main.app)
+
+
+@pytest.fixture
+def chain(tmp_path, monkeypatch):
+    # A scratch chain behind the app's manager, signed with a throwaway key
+    store = FileChainStore(str(tmp_path / "chain.json"))
+    signer = Ed25519Signer.generate()
+    monkeypatch.setattr(main.blockchain_manager, "store", store)
+    monkeypatch.setattr(main.blockchain_manager, "signer", signer)
+    monkeypatch.setattr(main.blockchain_manager, "signing_algorithm", signer.algorithm)
+    monkeypatch.setitem(main.blockchain_manager.verifier.signers, signer.algorithm, signer)
+    monkeypatch.setattr(main, "BLOCKCHAIN_VERIFY_PROGRESS_EVERY", 2)
+    for n in range(5):
+        main.blockchain_manager.append_block({"n": n})
+    return store
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_ndjson_export(chain):
+    response = client.get("/api/blockchain/export?start=2&end=4")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [b["data"]["n"] for b in _lines(response)] == [1, 2, 3]
+
+    assert len(_lines(client.get("/api/blockchain/export"))) == 5
+
+
+def test_streaming_verify_reports_progress_and_errors(chain):
+    events = _lines(client.get("/api/blockchain/verify/stream"))
+    assert events[0] == {"type": "start", "total_blocks": 5, "full": False}
+    assert [e["checked"] for e in events if e["type"] == "progress"] == [2, 4]
+    assert events[-1] == {"type": "result", "is_valid": True, "length": 5, "trusted_segments": 0}
+
+    chain.blocks[2]["data"]["n"] = 99
+    events = _lines(client.get("/api/blockchain/verify/stream"))
+    errors = [e for e in events if e["type"] == "error"]
+    assert errors == [{"type": "error", "block_index": 3, "message": "Block 3: Hash mismatch"}]
+    # The error is sent before the pass finishes
+    assert events.index(errors[0]) < len(events) - 2
+    assert events[-1]["is_valid"] is False
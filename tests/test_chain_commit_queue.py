@@ -0,0 +1,110 @@
+import sys
+import os
+import json
+import shutil
+
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from blockchain_manager import BlockchainManager
+from chain_commit_queue import ChainCommitQueue
+from models import ChainCommitEntry, PatientReport
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _setup(tmp_path, monkeypatch, **queue_kwargs):
+    for name in ("private_key.pem", "public_key.pem"):
+        shutil.copy(os.path.join(REPO_ROOT, name), tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    manager = BlockchainManager(str(tmp_path / "chain.json"), signing_algorithm="ed25519")
+    return engine, manager, ChainCommitQueue(manager, engine, **queue_kwargs)
+
+
+def _enqueue_reports(engine, count):
+    commit_ids = []
+    with Session(engine) as session:
+        for i in range(count):
+            report = PatientReport(health_score=i, triage_category="Green", features_json="{}")
+            session.add(report)
+            session.flush()
+            commit_ids.append(ChainCommitQueue.enqueue(session, {"n": i}, report.id).commit_id)
+        session.commit()
+    return commit_ids
+
+
+def test_entries_are_appended_in_order(tmp_path, monkeypatch):
+    engine, manager, queue = _setup(tmp_path, monkeypatch)
+    commit_ids = _enqueue_reports(engine, 3)
+
+    assert queue.process_pending() == 3
+    assert [b["data"]["n"] for b in manager.chain] == [0, 1, 2]
+    assert [b["data"]["commit_id"] for b in manager.chain] == commit_ids
+    assert manager.validate_chain()["is_valid"]
+
+    with Session(engine) as session:
+        assert ChainCommitQueue.stats(session) == {"pending": 0, "committed": 3, "failed": 0}
+        report = session.get(PatientReport, 2)
+        assert report.blockchain_block_index == 2
+        assert report.blockchain_hash == manager.chain[1]["hash"]
+
+
+def test_crash_after_append_does_not_duplicate_block(tmp_path, monkeypatch):
+    engine, manager, queue = _setup(tmp_path, monkeypatch)
+    commit_id = _enqueue_reports(engine, 1)[0]
+
+    # Block made it to the chain but the process died before marking the entry
+    manager.append_block({"n": 0, "commit_id": commit_id})
+
+    restarted = ChainCommitQueue(BlockchainManager(manager.chain_file, signing_algorithm="ed25519"), engine)
+    assert restarted.process_pending() == 1
+    assert len(restarted.blockchain_manager.chain) == 1
+
+    with Session(engine) as session:
+        entry = session.get(ChainCommitEntry, 1)
+        assert entry.status == "committed"
+        assert entry.block_hash == manager.chain[0]["hash"]
+
+
+def test_failing_entry_blocks_later_ones_until_it_gives_up(tmp_path, monkeypatch):
+    engine, manager, queue = _setup(tmp_path, monkeypatch, max_attempts=2)
+    _enqueue_reports(engine, 2)
+
+    original = manager.append_block
+    def failing_append(data, merkle_root=None):
+        if data["n"] == 0:
+            raise OSError("disk full")
+        return original(data, merkle_root)
+    monkeypatch.setattr(manager, "append_block", failing_append)
+
+    assert queue.process_pending() == 0
+    assert manager.chain == []
+
+    assert queue.process_pending() == 1
+    assert [b["data"]["n"] for b in manager.chain] == [1]
+    with Session(engine) as session:
+        failed = session.get(ChainCommitEntry, 1)
+        assert failed.status == "failed"
+        assert failed.attempts == 2
+        assert failed.last_error == "disk full"
+        assert json.loads(failed.payload_json) == {"n": 0}
+
+
+def test_commit_index_stays_bounded(tmp_path, monkeypatch):
+    engine, manager, queue = _setup(tmp_path, monkeypatch, batch_size=2)
+    other_process = ChainCommitQueue(BlockchainManager(manager.chain_file, signing_algorithm="ed25519"), engine, batch_size=2)
+    for _ in range(10):
+        _enqueue_reports(engine, 2)
+        assert queue.process_pending() == 2
+        # The other worker scans every block the first one appends, but keeps only the newest
+        other_process.blockchain_manager.refresh_if_changed()
+        other_process._committed_index()
+
+    assert len(manager.chain) == 20
+    for worker in (queue, other_process):
+        assert list(worker._committed) == [b["data"]["commit_id"] for b in manager.chain[-8:]]
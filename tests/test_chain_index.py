@@ -0,0 +1,47 @@
+import sys
+import os
+
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from blockchain_manager import BlockchainManager
+from chain_index import BloomFilter, ChainIndex
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    values = [f"value-{i}" for i in range(1000)]
+    for value in values:
+        bloom.add(value)
+    assert all(value in bloom for value in values)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_lookup_by_block_hash_and_features_hash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    manager = BlockchainManager(str(tmp_path / "chain.json"), signing_algorithm="ed25519")
+    blocks = [manager.append_block({"features_hash": f"{n % 2:032x}"}) for n in range(4)]
+
+    index = ChainIndex(manager, engine, bloom_capacity=100)
+    with Session(engine) as session:
+        # The first lookup indexes the existing chain
+        assert [r.block_index for r in index.lookup(blocks[2]["hash"], session)] == [3]
+        assert [r.block_index for r in index.lookup(f"{1:032x}", session)] == [2, 4]
+        assert index.lookup("f" * 64, session) == []
+
+        # Blocks appended later (here: by "another process") are picked up before a negative answer
+        other = BlockchainManager(manager.chain_file, signing_algorithm="ed25519")
+        late = other.append_block({"features_hash": "a" * 32})
+        assert [r.kind for r in index.lookup(late["hash"], session)] == ["block"]
+        assert index.stats()["indexed_upto"] == 5
+
+    # A second index (e.g. after a restart) loads from the table without duplicating rows
+    restarted = ChainIndex(manager, engine, bloom_capacity=100)
+    assert restarted.sync() == 0
+    with Session(engine) as session:
+        assert [r.block_index for r in restarted.lookup("a" * 32, session)] == [5]
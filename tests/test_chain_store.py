@@ -0,0 +1,87 @@
+import sys
+import os
+import json
+
+import pytest
+from sqlmodel import SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from blockchain_manager import BlockchainManager
+from chain_store import ChainStore, FileChainStore, SQLChainStore, ChainConflictError, create_chain_store
+
+
+@pytest.fixture
+def sql_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return SQLChainStore(engine)
+
+
+def test_sql_backed_chain(sql_store):
+    manager = BlockchainManager(signing_algorithm="ed25519", store=sql_store)
+    blocks = [manager.append_block({"n": n}) for n in range(5)]
+
+    assert len(manager) == 5
+    assert manager.get_block(3) == blocks[2]
+    assert manager.get_block(6) is None
+    assert sql_store.get_by_hash(blocks[4]["hash"]) == blocks[4]
+    assert blocks[1]["prev_hash"] == blocks[0]["hash"]
+
+    # Newest-first page, as /api/blockchain?offset=1&limit=2 asks for it
+    assert [b["index"] for b in manager.iter_blocks(3, 4, reverse=True)] == [4, 3]
+
+    report = manager.validate_chain()
+    assert report["is_valid"], report["errors"]
+    assert report["length"] == 5
+
+
+def test_sql_store_rejects_forked_append(sql_store):
+    manager = BlockchainManager(signing_algorithm="ed25519", store=sql_store)
+    block = manager.append_block({"n": 1})
+
+    # A second node that appended from the same tip
+    forked = dict(block, hash="f" * 64)
+    with pytest.raises(ChainConflictError):
+        sql_store.append(forked)
+    assert len(sql_store) == 1
+
+
+def test_import_file_chain_into_sql(sql_store, tmp_path):
+    chain_file = str(tmp_path / "chain.json")
+    file_manager = BlockchainManager(chain_file, signing_algorithm="ed25519")
+    for n in range(3):
+        file_manager.append_block({"n": n})
+
+    assert sql_store.import_blocks(FileChainStore(chain_file).iter_blocks()) == 3
+
+    sql_manager = BlockchainManager(signing_algorithm="ed25519", store=sql_store)
+    assert sql_manager.chain == file_manager.chain
+    assert sql_manager.validate_chain()["is_valid"]
+    # Appending continues from the imported tip
+    assert sql_manager.append_block({"n": 3})["prev_hash"] == file_manager.chain[-1]["hash"]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_chain_store("redis")
+
+
+def test_incomplete_store_fails_at_construction():
+    class ReadOnlyStore(ChainStore):
+        def __len__(self):
+            return 0
+
+        def last(self):
+            return None
+
+        def get(self, index):
+            return None
+
+        def iter_blocks(self, start=1, end=None, reverse=False):
+            return iter(())
+
+    with pytest.raises(TypeError):
+        ReadOnlyStore()
@@ -0,0 +1,67 @@
+import sys
+import os
+import asyncio
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from inference_batcher import InferenceBatcher
+
+
+class _FakeModel:
+    """Returns each row's own values as logits and records batch sizes."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, frame, prediction_type=None):
+        self.calls.append(len(frame))
+        return frame.to_numpy() * 2
+
+
+class _Loaded:
+    def __init__(self):
+        self.model = _FakeModel()
+
+
+def _row(value):
+    return pd.DataFrame([[value, value + 1]], columns=["a", "b"])
+
+
+def test_concurrent_rows_share_one_predict_call():
+    loaded = _Loaded()
+    batcher = InferenceBatcher(max_batch_size=16, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*[batcher.predict(loaded, _row(i)) for i in range(10)])
+
+    results = asyncio.run(run())
+
+    assert loaded.model.calls == [10]
+    for i, logits in enumerate(results):
+        assert np.allclose(logits, [2 * i, 2 * (i + 1)])
+    assert batcher.stats()["rows"] == 10
+
+
+def test_batches_are_capped_and_split_by_model():
+    old, new = _Loaded(), _Loaded()
+    batcher = InferenceBatcher(max_batch_size=4, max_wait_ms=20)
+
+    async def run():
+        calls = [batcher.predict(old if i % 2 else new, _row(i)) for i in range(6)]
+        return await asyncio.gather(*calls)
+
+    results = asyncio.run(run())
+
+    assert sum(old.model.calls) == 3 and sum(new.model.calls) == 3
+    assert max(old.model.calls + new.model.calls) <= 4
+    assert np.allclose(results[5], [10, 12])
+
+
+def test_disabled_batcher_predicts_inline():
+    loaded = _Loaded()
+    batcher = InferenceBatcher(enabled=False)
+    logits = asyncio.run(batcher.predict(loaded, _row(3)))
+    assert np.allclose(logits, [6, 8])
+    assert loaded.model.calls == [1]
@@ -0,0 +1,40 @@
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from memory_diagnostics import MemoryDiagnostics, deep_sizeof
+
+
+def test_deep_sizeof_counts_nested_and_array_buffers():
+    small = deep_sizeof({"a": [1, 2, 3]})
+    big = deep_sizeof({"a": [1, 2, 3], "b": ["x" * 10000]})
+    assert big - small >= 10000
+    assert deep_sizeof([np.zeros(1000)]) >= 8000
+
+
+def test_top_reports_growth_since_baseline():
+    diagnostics = MemoryDiagnostics()
+    diagnostics.start(frames=1)
+    try:
+        diagnostics.take_baseline()
+        retained = [bytearray(1024) for _ in range(200)]
+        top = diagnostics.top(limit=5)
+    finally:
+        diagnostics.stop()
+
+    assert top["compared_to_baseline"] is True
+    assert any("test_memory_diagnostics.py" in site["site"] and site["size_diff_kb"] >= 200
+               for site in top["sites"])
+    del retained
+
+
+def test_structures_report_errors_without_failing():
+    diagnostics = MemoryDiagnostics()
+    diagnostics.register_structure("ok", lambda: {"size": 1})
+    diagnostics.register_structure("broken", lambda: 1 / 0)
+    structures = diagnostics.structures()
+    assert structures["ok"] == {"size": 1}
+    assert "error" in structures["broken"]
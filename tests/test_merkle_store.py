@@ -0,0 +1,145 @@
+import sys
+import os
+import json
+import shutil
+import hashlib
+
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from merkle_tree import MerkleTree, build_levels, bulk_merkle_root
+from merkle_store import MerkleStore
+from blockchain_manager import BlockchainManager
+from chain_store import SQLChainStore
+from chain_commit_queue import ChainCommitQueue, merkle_leaf
+from models import PatientReport
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _leaves(count):
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(count)]
+
+
+def test_matches_merkle_tree_while_growing(tmp_path):
+    store = MerkleStore(str(tmp_path / "tree.bin"), initial_capacity=2)
+    leaves = _leaves(37)
+    for n, leaf in enumerate(leaves, start=1):
+        assert store.append(leaf) == n - 1
+        tree = MerkleTree(leaves[:n])
+        assert store.root() == tree.get_root()
+        for i in range(n):
+            assert store.get_proof_with_direction(i) == tree.get_proof_with_direction(i)
+    assert store.capacity == 64
+
+
+def test_reopen_and_truncate(tmp_path):
+    path = str(tmp_path / "tree.bin")
+    leaves = _leaves(20)
+    MerkleStore(path).extend(leaves)
+
+    store = MerkleStore(path)
+    assert len(store) == 20
+    assert store.leaf(7) == leaves[7]
+    assert store.root() == MerkleTree(leaves).get_root()
+
+    store.truncate(13)
+    tree = MerkleTree(leaves[:13])
+    assert store.root() == tree.get_root()
+    assert store.get_proof_with_direction(12) == tree.get_proof_with_direction(12)
+
+
+def test_bulk_builder_matches_merkle_tree():
+    for count in (0, 1, 2, 3, 5, 8, 13, 100):
+        leaves = _leaves(count)
+        tree = MerkleTree(leaves)
+        assert bulk_merkle_root(iter(leaves)) == tree.get_root()
+        assert [level.hex() for level in build_levels(leaves)] == ["".join(level) for level in tree.tree]
+
+
+def test_bulk_builder_with_worker_processes(tmp_path):
+    # Enough leaves to be split into subtrees, with an odd tail
+    leaves = _leaves(70001)
+    root = MerkleTree(leaves).get_root()
+    assert bulk_merkle_root(leaves, workers=2) == root
+
+    store = MerkleStore.from_leaves(str(tmp_path / "tree.bin"), leaves, workers=2)
+    assert len(store) == len(leaves)
+    assert store.root() == root
+    store.append(_leaves(1)[0])
+    assert store.root() == MerkleTree(leaves + _leaves(1)).get_root()
+
+
+def test_commit_queue_stores_proof_against_block_root(tmp_path, monkeypatch):
+    for name in ("private_key.pem", "public_key.pem"):
+        shutil.copy(os.path.join(REPO_ROOT, name), tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    manager = BlockchainManager(str(tmp_path / "chain.json"), signing_algorithm="ed25519")
+    store = MerkleStore(str(tmp_path / "tree.bin"))
+    queue = ChainCommitQueue(manager, engine, merkle_store=store)
+
+    with Session(engine) as session:
+        for i in range(3):
+            report = PatientReport(health_score=i, triage_category="Green", features_json="{}")
+            session.add(report)
+            session.flush()
+            ChainCommitQueue.enqueue(session, {"n": i}, report.id)
+        session.commit()
+    assert queue.process_pending() == 3
+
+    with Session(engine) as session:
+        for report in session.exec(PatientReport.__table__.select()).all():
+            block = manager.get_block(report.blockchain_block_index)
+            proof = json.loads(report.merkle_proof_json)
+            assert MerkleTree.verify_proof_with_direction(merkle_leaf(block["data"]), proof, block["merkle_root"])
+    assert [b["data"]["merkle_leaf"] for b in manager.chain] == [0, 1, 2]
+    assert manager.validate_chain()["is_valid"]
+
+    # Leaves whose block never reached the chain are dropped on the next pass
+    store.append(_leaves(1)[0])
+    restarted = ChainCommitQueue(manager, engine, merkle_store=store)
+    restarted._committed_index()
+    restarted._reconcile_merkle()
+    assert len(store) == 3
+
+
+def test_nodes_sharing_a_sql_chain_keep_identical_trees(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    nodes = [
+        ChainCommitQueue(BlockchainManager(signing_algorithm="ed25519", store=SQLChainStore(engine)), engine,
+                         merkle_store=MerkleStore(str(tmp_path / f"tree-{n}.bin")))
+        for n in range(2)
+    ]
+
+    def enqueue(count):
+        with Session(engine) as session:
+            for i in range(count):
+                report = PatientReport(health_score=i, triage_category="Green", features_json="{}")
+                session.add(report)
+                session.flush()
+                ChainCommitQueue.enqueue(session, {"n": i}, report.id)
+            session.commit()
+
+    for node, count in ((0, 2), (1, 3), (0, 1), (1, 2)):
+        enqueue(count)
+        assert nodes[node].process_pending() == count
+
+    manager = nodes[0].blockchain_manager
+    blocks = list(manager.iter_blocks())
+    assert [b["data"]["merkle_leaf"] for b in blocks] == list(range(8))
+    leaves = [merkle_leaf(b["data"]) for b in blocks]
+    assert blocks[-1]["merkle_root"] == MerkleTree(leaves).get_root()
+    assert nodes[1].merkle_store.root() == MerkleTree(leaves).get_root()
+    assert nodes[0].merkle_store.root() == MerkleTree(leaves[:6]).get_root()
+    with Session(engine) as session:
+        for report in session.exec(PatientReport.__table__.select()).all():
+            block = manager.get_block(report.blockchain_block_index)
+            proof = json.loads(report.merkle_proof_json)
+            assert MerkleTree.verify_proof_with_direction(merkle_leaf(block["data"]), proof, block["merkle_root"])
+    assert manager.validate_chain()["is_valid"]
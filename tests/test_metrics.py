@@ -0,0 +1,52 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+import metrics
+
+
+def test_recording_is_a_noop_when_disabled():
+    family = metrics.counter("test_disabled_total", "Test counter", ["kind"])
+    metrics.set_enabled(False)
+    metrics.record_count(family, kind="a")
+    assert family.children() == []
+
+
+def test_prometheus_rendering():
+    metrics.set_enabled(True)
+    try:
+        calls = metrics.counter("test_calls_total", "Test calls", ["agent"])
+        latency = metrics.histogram("test_latency_seconds", "Test latency", buckets=(0.1, 1.0))
+        length = metrics.gauge("test_length", "Test length")
+
+        metrics.record_count(calls, agent="intake")
+        metrics.record_count(calls, agent="intake")
+        metrics.record_duration(latency, 0.5)
+        metrics.record_value(length, 7)
+
+        text = metrics.render_prometheus()
+    finally:
+        metrics.set_enabled(False)
+
+    assert "# TYPE test_calls_total counter" in text
+    assert 'test_calls_total{agent="intake"} 2.0' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "test_latency_seconds_count 1" in text
+    assert "test_length 7.0" in text
+
+
+def test_stage_timer_labels_each_step():
+    metrics.set_enabled(True)
+    try:
+        family = metrics.histogram("test_stage_seconds", "Test stages", ["stage"])
+        timer = metrics.StageTimer(family)
+        timer.mark("first")
+        timer.mark("second")
+    finally:
+        metrics.set_enabled(False)
+
+    stages = {labels[0]: child.snapshot()["count"] for labels, child in family.children()}
+    assert stages == {"first": 1, "second": 1}
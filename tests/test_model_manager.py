@@ -0,0 +1,53 @@
+import sys
+import os
+import shutil
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from model_manager import ModelManager, artifact_version
+
+SERVER_DIR = os.path.join(os.path.dirname(__file__), "../server")
+CBM_PATH = os.path.join(SERVER_DIR, "mediguard_catboost.cbm")
+
+
+def test_loads_native_artifact(tmp_path):
+    shutil.copy(CBM_PATH, tmp_path / "mediguard_catboost-v1.cbm")
+    manager = ModelManager(str(tmp_path), watch_interval=0)
+    loaded = manager.load()
+    assert loaded.version == "v1"
+    assert manager.current() is loaded
+
+
+def test_hot_swap_keeps_old_snapshot(tmp_path):
+    shutil.copy(CBM_PATH, tmp_path / "mediguard_catboost-v1.cbm")
+    manager = ModelManager(str(tmp_path), watch_interval=0)
+    in_flight = manager.load()
+    assert not manager.reload_if_changed()
+
+    new_path = tmp_path / "mediguard_catboost-v2.cbm"
+    shutil.copy(CBM_PATH, new_path)
+    future = time.time() + 10
+    os.utime(new_path, (future, future))
+
+    assert manager.reload_if_changed()
+    assert manager.current().version == "v2"
+    # A request holding the old snapshot keeps its model
+    assert in_flight.version == "v1"
+    assert in_flight.model is not manager.current().model
+
+
+def test_pinned_version(tmp_path):
+    shutil.copy(CBM_PATH, tmp_path / "mediguard_catboost-v1.cbm")
+    newer = tmp_path / "mediguard_catboost-v2.cbm"
+    shutil.copy(CBM_PATH, newer)
+    future = time.time() + 10
+    os.utime(newer, (future, future))
+
+    manager = ModelManager(str(tmp_path), pinned_version="v1", watch_interval=0)
+    assert manager.load().version == "v1"
+    assert not manager.reload_if_changed()
+
+
+def test_unversioned_artifact_uses_content_hash():
+    assert len(artifact_version(CBM_PATH)) == 12
@@ -0,0 +1,65 @@
+import sys
+import os
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from main import app, get_session
+from models import PatientReport, DigitalPassport, PassportAuditEvent
+from blockchain_manager import BlockchainManager
+from digital_passport import PassportManager
+
+
+def test_events_are_appended_and_paginated(tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    manager = PassportManager(BlockchainManager(str(tmp_path / "chain.json"), signing_algorithm="ed25519"))
+
+    def get_test_session():
+        with Session(engine) as session:
+            yield session
+
+    with Session(engine) as session:
+        report = PatientReport(health_score=80, triage_category="Green", features_json="{}", blockchain_block_index=1)
+        session.add(report)
+        session.commit()
+        passport = manager.issue_passport(report.id, session)
+        passport_id, token = passport.passport_id, passport.hmac_token
+        assert passport.audit_trail_json is None
+
+        assert manager.verify_passport(passport_id, token, session)["status"] == "Valid"
+        assert manager.verify_passport(passport_id, "forged", session)["status"] == "Tampered"
+        assert manager.verify_passport("unknown", token, session)["status"] == "Invalid"
+        manager.revoke(passport_id, session)
+        assert manager.verify_passport(passport_id, token, session)["status"] == "Revoked"
+
+        # The passport row is never rewritten for a scan
+        events = session.exec(select(PassportAuditEvent).order_by(PassportAuditEvent.id)).all()
+        assert [(e.action, e.status) for e in events] == [
+            ("issued", None), ("verified", "Valid"), ("verified", "Tampered"), ("revoked", None), ("verified", "Revoked"),
+        ]
+
+    client = TestClient(app)
+    app.dependency_overrides[get_session] = get_test_session
+    try:
+        first = client.get(f"/api/passport/{passport_id}/audit?limit=2").json()
+        assert [e["action"] for e in first["events"]] == ["verified", "revoked"]
+        second = client.get(f"/api/passport/{passport_id}/audit?limit=2&before_id={first['next_before_id']}").json()
+        assert [e["status"] for e in second["events"]] == ["Tampered", "Valid"]
+        last = client.get(f"/api/passport/{passport_id}/audit?limit=2&before_id={second['next_before_id']}").json()
+        assert [e["action"] for e in last["events"]] == ["issued"]
+        assert last["next_before_id"] is None
+
+        assert client.get("/api/passport/unknown/audit").status_code == 404
+    finally:
+        app.dependency_overrides.pop(get_session, None)
+
+    # Rows from before the audit table keep their JSON trail
+    with Session(engine) as session:
+        legacy = session.exec(select(DigitalPassport)).first()
+        legacy.audit_trail_json = '[{"action": "issued", "timestamp": "2024-01-01T00:00:00"}]'
+        history = PassportManager.audit_history(legacy, session)
+        assert history["legacy_events"][0]["action"] == "issued"
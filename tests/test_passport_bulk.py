@@ -0,0 +1,57 @@
+import sys
+import os
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from models import PatientReport, DigitalPassport
+from blockchain_manager import BlockchainManager
+from digital_passport import PassportManager
+
+
+def _make_reports(session, count, on_chain=True):
+    reports = []
+    for i in range(count):
+        report = PatientReport(
+            health_score=70 + i,
+            triage_category="Yellow",
+            features_json="{}",
+            blockchain_block_index=i + 1 if on_chain else None,
+        )
+        session.add(report)
+        reports.append(report)
+    session.commit()
+    return [r.id for r in reports]
+
+
+def test_bulk_issue_signs_in_pool_and_reports_partial_failures(tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    manager = PassportManager(
+        BlockchainManager(str(tmp_path / "chain.json")), signing_workers=2, parallel_threshold=2
+    )
+
+    try:
+        with Session(engine) as session:
+            good = _make_reports(session, 3)
+            off_chain = _make_reports(session, 1, on_chain=False)
+            result = manager.issue_passports_bulk(good + off_chain + [9999, good[0]], session)
+
+            assert result["requested"] == 5
+            assert result["issued"] == 3
+            assert result["failed"] == 2
+            statuses = {r["report_id"]: r for r in result["results"]}
+            assert statuses[off_chain[0]]["error"] == "Report not yet on blockchain"
+            assert statuses[9999]["error"] == "Report not found"
+
+            for report_id in good:
+                passport_id = statuses[report_id]["passport_id"]
+                passport = session.exec(
+                    select(DigitalPassport).where(DigitalPassport.passport_id == passport_id)
+                ).first()
+                assert passport is not None
+                verified = manager.verify_passport(passport_id, passport.hmac_token, session)
+                assert verified["status"] == "Valid"
+    finally:
+        manager.shutdown()
@@ -0,0 +1,82 @@
+import sys
+import os
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from main import app, get_session
+from models import DigitalPassport
+from qr_code_generator import QRCodeGenerator
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+def get_test_session():
+    with Session(engine) as session:
+        yield session
+
+
+def _issue_test_passport() -> DigitalPassport:
+    SQLModel.metadata.create_all(engine)
+    passport = DigitalPassport(
+        patient_report_id=1,
+        health_score=80,
+        triage_category="Green",
+        predicted_class="Healthy",
+        issued_timestamp="2025-01-01T00:00:00",
+        blockchain_block_index=1,
+        merkle_proof_json="[]",
+        passport_hash="h",
+        hmac_token="t",
+        rsa_signature="s",
+        audit_trail_json="[]",
+    )
+    passport.verification_url = QRCodeGenerator.create_verification_url(passport.passport_id, "t")
+    with Session(engine) as session:
+        session.add(passport)
+        session.commit()
+        session.refresh(passport)
+    return passport
+
+
+def test_render_is_cached():
+    url = "https://mediguard.io/verify?passport_id=cache-test&token=x"
+    first = QRCodeGenerator.render(url, "png")
+    hits = QRCodeGenerator.cache_info()["png"]["hits"]
+    assert QRCodeGenerator.render(url, "png") is first
+    assert QRCodeGenerator.cache_info()["png"]["hits"] == hits + 1
+    assert first.startswith(b"\x89PNG")
+    assert b"<svg" in QRCodeGenerator.render(url, "svg")
+
+
+def test_qr_endpoint_formats_and_conditional_requests():
+    previous = app.dependency_overrides.get(get_session)
+    app.dependency_overrides[get_session] = get_test_session
+    try:
+        client = TestClient(app)
+        passport = _issue_test_passport()
+
+        response = client.get(f"/api/passport/{passport.passport_id}/qr?format=svg")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("image/svg+xml")
+
+        response = client.get(f"/api/passport/{passport.passport_id}/qr")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        etag = response.headers["etag"]
+        assert "max-age" in response.headers["cache-control"]
+
+        response = client.get(f"/api/passport/{passport.passport_id}/qr", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        assert client.get(f"/api/passport/{passport.passport_id}/qr?format=gif").status_code == 400
+        assert client.get("/api/passport/missing/qr").status_code == 404
+    finally:
+        if previous is None:
+            app.dependency_overrides.pop(get_session, None)
+        else:
+            app.dependency_overrides[get_session] = previous
+        SQLModel.metadata.drop_all(engine)
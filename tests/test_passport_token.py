@@ -0,0 +1,101 @@
+import sys
+import os
+from urllib.parse import urlparse, parse_qs
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+import pytest
+from models import PatientReport
+from blockchain_manager import BlockchainManager
+from digital_passport import PassportManager
+import passport_token
+from passport_token import PassportTokenSigner, TokenError, is_compact_token, load_or_generate_key
+
+
+def test_token_roundtrip_and_expiry():
+    signer = PassportTokenSigner(Ed25519PrivateKey.generate(), ttl_seconds=60)
+    token = signer.issue({"pid": "p1", "hs": 80}, issued_at=1000)
+
+    assert is_compact_token(token)
+    assert not is_compact_token("ab" * 32)
+    claims = signer.verify(token, now=1030)
+    assert claims["pid"] == "p1" and claims["exp"] == 1060
+
+    with pytest.raises(TokenError) as err:
+        signer.verify(token, now=1060)
+    assert err.value.status == "Expired"
+
+
+def _public_bytes(key):
+    return key.public_key().public_bytes_raw()
+
+
+def test_key_file_is_private_and_first_writer_wins(tmp_path, monkeypatch):
+    key_file = str(tmp_path / "token_key.pem")
+    key = load_or_generate_key(key_file)
+    assert os.stat(key_file).st_mode & 0o777 == 0o600
+    assert _public_bytes(load_or_generate_key(key_file)) == _public_bytes(key)
+
+    # Another worker publishes its key between our existence check and our write
+    raced_file = str(tmp_path / "raced_key.pem")
+    generate = Ed25519PrivateKey.generate
+
+    def generate_after_other_worker():
+        monkeypatch.setattr(passport_token.Ed25519PrivateKey, "generate", generate)
+        other_worker_key = load_or_generate_key(raced_file)
+        generate_after_other_worker.winner = other_worker_key
+        return generate()
+
+    monkeypatch.setattr(passport_token.Ed25519PrivateKey, "generate", generate_after_other_worker)
+    loaded = load_or_generate_key(raced_file)
+    assert _public_bytes(loaded) == _public_bytes(generate_after_other_worker.winner)
+    assert sorted(os.listdir(tmp_path)) == ["raced_key.pem", "token_key.pem"]
+
+
+def test_tampered_and_foreign_tokens_are_rejected():
+    signer = PassportTokenSigner(Ed25519PrivateKey.generate())
+    other = PassportTokenSigner(Ed25519PrivateKey.generate())
+    token = signer.issue({"pid": "p1", "hs": 80})
+
+    version, payload, signature = token.split(".")
+    forged = other.issue({"pid": "p1", "hs": 99}).split(".")[1]
+    for bad in (f"{version}.{forged}.{signature}", other.issue({"pid": "p1"})):
+        with pytest.raises(TokenError) as err:
+            signer.verify(bad)
+        assert err.value.status == "Tampered"
+
+
+def test_issued_passport_verifies_offline_until_revoked(tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    signer = PassportTokenSigner(Ed25519PrivateKey.generate())
+    manager = PassportManager(
+        BlockchainManager(str(tmp_path / "chain.json")), token_signer=signer, compact_tokens=True
+    )
+
+    with Session(engine) as session:
+        report = PatientReport(health_score=75, triage_category="Yellow", features_json="{}", blockchain_block_index=3)
+        session.add(report)
+        session.commit()
+        passport = manager.issue_passport(report.id, session)
+
+        token = parse_qs(urlparse(passport.verification_url).query)["token"][0]
+        assert is_compact_token(token)
+        assert passport.expiry_timestamp is not None
+
+        result = manager.verify_token(token)
+        assert result["status"] == "Valid"
+        assert result["passport"]["passport_id"] == passport.passport_id
+        assert result["passport"]["blockchain_block_index"] == 3
+
+        manager.revoke(passport.passport_id, session)
+        assert manager.verify_token(token)["status"] == "Revoked"
+        assert manager.verify_passport(passport.passport_id, passport.hmac_token, session)["status"] == "Revoked"
+
+        # A fresh worker rebuilds the list from the database
+        signer.revocations.replace([])
+        signer.revocations.replace(PassportManager.revoked_passports(session))
+        assert manager.verify_token(token)["status"] == "Revoked"
@@ -0,0 +1,64 @@
+import sys
+import os
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+import metrics
+import prediction_cache
+from prediction_cache import PredictionCache
+
+
+def _row(*values):
+    return pd.DataFrame([list(values)], columns=["Glucose", "BMI", "Hemoglobin"])
+
+
+def test_key_depends_on_vector_and_model_version():
+    key = PredictionCache.make_key(_row(0.1, 0.0, 0.0), "v1")
+    assert key == PredictionCache.make_key(_row(0.1, 0.0, 0.0), "v1")
+    assert key != PredictionCache.make_key(_row(0.1, 0.0, 0.0), "v2")
+    assert key != PredictionCache.make_key(_row(0.0, 0.1, 0.0), "v1")
+
+
+def test_lru_eviction_and_stats():
+    cache = PredictionCache(capacity=2)
+    cache.put("a", {"predictions": 1})
+    cache.put("b", {"predictions": 2})
+    assert cache.get("a") == {"predictions": 1}  # "a" is now most recent
+    cache.put("c", {"predictions": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.75
+
+
+def test_zero_capacity_disables_cache():
+    cache = PredictionCache(capacity=0)
+    cache.put("a", {"predictions": 1})
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_hits_and_misses_are_exported_as_counters():
+    metrics.set_enabled(True)
+    try:
+        before = {f.name: f.labels().value for f in (prediction_cache.HITS, prediction_cache.MISSES)}
+        cache = PredictionCache(capacity=2)
+        cache.put("a", {"predictions": 1})
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+        text = metrics.render_prometheus()
+    finally:
+        metrics.set_enabled(False)
+
+    assert "# TYPE mediguard_prediction_cache_hits_total counter" in text
+    assert "# TYPE mediguard_prediction_cache_misses_total counter" in text
+    assert prediction_cache.HITS.labels().value - before["mediguard_prediction_cache_hits_total"] == 2
+    assert prediction_cache.MISSES.labels().value - before["mediguard_prediction_cache_misses_total"] == 1
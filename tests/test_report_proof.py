@@ -0,0 +1,95 @@
+import sys
+import os
+import copy
+import json
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+import main
+from main import app, get_session
+from chain_store import FileChainStore
+from chain_commit_queue import ChainCommitQueue
+from merkle_store import MerkleStore
+from models import PatientReport
+from signing import Ed25519Signer
+from proof_verifier import verify_report_proof, leaf_hash
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    # Scratch chain, tree and database behind the app, signed with a throwaway key
+    signer = Ed25519Signer.generate()
+    monkeypatch.setattr(main.blockchain_manager, "store", FileChainStore(str(tmp_path / "chain.json")))
+    monkeypatch.setattr(main.blockchain_manager, "signer", signer)
+    monkeypatch.setattr(main.blockchain_manager, "signing_algorithm", signer.algorithm)
+    monkeypatch.setitem(main.blockchain_manager.verifier.signers, signer.algorithm, signer)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+
+    def get_test_session():
+        with Session(engine) as session:
+            yield session
+
+    features = [{"age": 40 + i} for i in range(5)]
+    with Session(engine) as session:
+        for i, f in enumerate(features):
+            report = PatientReport(health_score=i, triage_category="Green", features_json="{}")
+            session.add(report)
+            session.flush()
+            payload = {"type": "ANALYSIS_RESULT",
+                       "features_hash": hashlib.md5(json.dumps(f, sort_keys=True).encode()).hexdigest()}
+            ChainCommitQueue.enqueue(session, payload, report.id)
+        session.add(PatientReport(health_score=9, triage_category="Green", features_json="{}"))
+        session.commit()
+    queue = ChainCommitQueue(main.blockchain_manager, engine, merkle_store=MerkleStore(str(tmp_path / "tree.bin")))
+    assert queue.process_pending() == 5
+
+    app.dependency_overrides[get_session] = get_test_session
+    yield features, signer
+    app.dependency_overrides.pop(get_session, None)
+
+
+def test_proof_verifies_offline(reports):
+    features, signer = reports
+    for report_id in range(1, 6):
+        response = client.get(f"/api/reports/{report_id}/proof")
+        assert response.status_code == 200
+        bundle = response.json()
+        assert bundle["leaf_index"] == report_id - 1
+        result = verify_report_proof(bundle, signer.public_pem(), features=features[report_id - 1])
+        assert result == {"is_valid": True, "errors": []}
+
+    # Report 6 was never queued; 7 does not exist
+    assert client.get("/api/reports/6/proof").status_code == 404
+    assert client.get("/api/reports/7/proof").status_code == 404
+
+
+def test_tampered_bundles_are_rejected(reports):
+    features, signer = reports
+    bundle = client.get("/api/reports/3/proof").json()
+
+    wrong_features = verify_report_proof(bundle, signer.public_pem(), features={"age": 1})
+    assert wrong_features["errors"] == ["Features do not match the block's features_hash"]
+
+    forged = copy.deepcopy(bundle)
+    forged["proof"][0]["hash"] = "0" * 64
+    assert verify_report_proof(forged, signer.public_pem())["errors"] == [
+        "Proof does not lead to the block's Merkle root"
+    ]
+
+    forged = copy.deepcopy(bundle)
+    forged["block"]["data"]["health_score"] = 100
+    forged["leaf"] = leaf_hash(forged["block"]["data"])
+    assert not verify_report_proof(forged, signer.public_pem())["is_valid"]
+
+    other_key = Ed25519Signer.generate().public_pem()
+    assert verify_report_proof(bundle, other_key)["errors"] == ["Invalid Ed25519 block signature"]
@@ -0,0 +1,45 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from request_profiler import RequestProfiler, ProfileStore, profile_requested
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return "done"
+
+
+def test_unflagged_requests_are_not_profiled(tmp_path):
+    profiler = RequestProfiler(ProfileStore(str(tmp_path)), sample_rate=0.0)
+    endpoint = profiler.profiled("busy")(_busy)
+    assert endpoint(0.01) == "done"
+    assert profiler.store.list() == []
+
+
+def test_flagged_request_saves_collapsed_stacks(tmp_path):
+    profiler = RequestProfiler(ProfileStore(str(tmp_path)), interval_ms=1)
+    endpoint = profiler.profiled("busy")(_busy)
+
+    token = profile_requested.set(True)
+    try:
+        assert endpoint(0.05) == "done"
+    finally:
+        profile_requested.reset(token)
+
+    profiles = profiler.store.list()
+    assert len(profiles) == 1
+    assert profiles[0]["endpoint"] == "busy"
+    assert profiles[0]["samples"] > 0
+
+    with open(profiler.store.path_for(profiles[0]["name"])) as f:
+        assert "_busy (test_request_profiler.py:" in f.read()
+
+
+def test_path_for_rejects_traversal(tmp_path):
+    store = ProfileStore(str(tmp_path))
+    assert store.path_for("../etc/passwd") is None
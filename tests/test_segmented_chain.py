@@ -0,0 +1,135 @@
+import sys
+import os
+import json
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from blockchain_manager import BlockchainManager
+from chain_store import SegmentedChainStore
+
+
+@pytest.fixture
+def segment_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / "segments")
+
+
+def _manager(segment_dir, **kwargs):
+    return BlockchainManager(signing_algorithm="ed25519", store=SegmentedChainStore(segment_dir, segment_size=4, **kwargs))
+
+
+def test_full_segments_are_sealed_and_compressed(segment_dir):
+    manager = _manager(segment_dir)
+    blocks = [manager.append_block({"n": n}) for n in range(10)]
+
+    assert sorted(os.listdir(segment_dir)) == [
+        ".lock",
+        "segment-000001.manifest.json", "segment-000001.ndjson.gz",
+        "segment-000002.manifest.json", "segment-000002.ndjson.gz",
+        "segment-000003.ndjson",
+    ]
+    manifests = manager.store.sealed_segments()
+    assert [(m["first_index"], m["last_index"]) for m in manifests] == [(1, 4), (5, 8)]
+    assert manifests[1]["prev_hash"] == blocks[3]["hash"]
+    assert manifests[1]["tip_hash"] == blocks[7]["hash"]
+
+    # A fresh process reads only manifests and the open segment, yet sees every block
+    reopened = _manager(segment_dir)
+    assert len(reopened) == 10
+    assert reopened.chain == blocks
+    assert reopened.get_block(6) == blocks[5]
+    assert [b["index"] for b in reopened.iter_blocks(3, 6, reverse=True)] == [6, 5, 4, 3]
+
+    for full in (False, True):
+        report = reopened.validate_chain(full=full)
+        assert report["is_valid"], report["errors"]
+        assert report["length"] == 10
+    assert reopened.validate_chain(full=False)["trusted_segments"] == 2
+
+
+def test_fast_verify_does_not_need_archived_segments(segment_dir):
+    manager = _manager(segment_dir)
+    for n in range(9):
+        manager.append_block({"n": n})
+
+    # Move the first sealed segment to cold storage
+    os.remove(os.path.join(segment_dir, "segment-000001.ndjson.gz"))
+    reopened = _manager(segment_dir)
+    assert reopened.validate_chain(full=False)["is_valid"]
+    with pytest.raises(FileNotFoundError):
+        reopened.get_block(2)
+
+
+def test_tampered_manifest_and_segment_are_detected(segment_dir):
+    manager = _manager(segment_dir, compress=False)
+    for n in range(8):
+        manager.append_block({"n": n})
+
+    manifest_path = os.path.join(segment_dir, "segment-000002.manifest.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["count"] = 3
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    assert not _manager(segment_dir, compress=False).validate_chain(full=False)["is_valid"]
+
+    # Segment data edited under an intact manifest: only a full pass reads it
+    manifest["count"] = 4
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    segment_path = os.path.join(segment_dir, "segment-000001.ndjson")
+    with open(segment_path) as f:
+        lines = f.readlines()
+    block = json.loads(lines[1])
+    block["data"]["n"] = 99
+    lines[1] = json.dumps(block, sort_keys=True) + "\n"
+    with open(segment_path, "w") as f:
+        f.writelines(lines)
+
+    reopened = _manager(segment_dir, compress=False)
+    assert reopened.validate_chain(full=False)["is_valid"]
+    report = reopened.validate_chain(full=True)
+    assert not report["is_valid"]
+    assert "Block 2: Hash mismatch" in report["errors"]
+
+
+def test_torn_append_is_discarded(segment_dir):
+    manager = _manager(segment_dir)
+    manager.append_block({"n": 0})
+    with open(os.path.join(segment_dir, "segment-000001.ndjson"), "a") as f:
+        f.write('{"index": 2, "trunc')
+
+    reopened = _manager(segment_dir)
+    assert len(reopened) == 1
+    reopened.append_block({"n": 1})
+    assert _manager(segment_dir).validate_chain()["is_valid"]
+
+
+def test_corrupted_sealed_file_fails_its_checksum(segment_dir):
+    manager = _manager(segment_dir)
+    for n in range(9):
+        manager.append_block({"n": n})
+    assert manager.validate_chain(full=True)["is_valid"]
+
+    def flip_byte(name, offset):
+        path = os.path.join(segment_dir, name)
+        with open(path, "r+b") as f:
+            f.seek(offset)
+            byte = f.read(1)[0]
+            f.seek(offset)
+            f.write(bytes([byte ^ 0xFF]))
+
+    # In the gzip header's mtime: the blocks still decode, only the checksum catches it
+    flip_byte("segment-000001.ndjson.gz", 5)
+    # In the middle of the compressed data: the segment no longer decodes
+    flip_byte("segment-000002.ndjson.gz", os.path.getsize(os.path.join(segment_dir, "segment-000002.ndjson.gz")) // 2)
+
+    report = _manager(segment_dir).validate_chain(full=True)
+    assert not report["is_valid"]
+    assert report["length"] == 9
+    assert "Segment 1: Segment file checksum mismatch" in report["errors"]
+    assert "Segment 2: Segment file checksum mismatch" in report["errors"]
+    assert "Segment 2: Segment file cannot be read" in report["errors"]
+    assert not any(e.startswith("Block") for e in report["errors"])
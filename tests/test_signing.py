@@ -0,0 +1,108 @@
+import sys
+import os
+import json
+import shutil
+import hashlib
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+from blockchain_manager import BlockchainManager
+import signing
+from signing import RSA_PSS, ED25519, Ed25519Signer, Signer, load_signer, normalize_algorithm
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _use_repo_rsa_key(tmp_path, monkeypatch):
+    # Reuse the checked-in RSA pair instead of generating a 4096-bit key per test
+    for name in ("private_key.pem", "public_key.pem"):
+        shutil.copy(os.path.join(REPO_ROOT, name), tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+
+
+def test_algorithm_names():
+    assert normalize_algorithm("rsa") == RSA_PSS
+    assert normalize_algorithm("ED25519") == ED25519
+
+
+def test_ed25519_signer_roundtrip():
+    signer = Ed25519Signer.generate()
+    signature = signer.sign(b"block hash")
+    assert signer.verify(b"block hash", signature)
+    assert not signer.verify(b"other", signature)
+
+
+def test_generated_key_is_private_and_first_writer_wins(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generate = Ed25519Signer.generate.__func__
+
+    def generate_after_other_worker(cls):
+        # Another worker publishes its pair between our existence check and our write
+        monkeypatch.setattr(Ed25519Signer, "generate", classmethod(generate))
+        generate_after_other_worker.winner = load_signer(ED25519)
+        return generate(cls)
+
+    monkeypatch.setattr(Ed25519Signer, "generate", classmethod(generate_after_other_worker))
+    signer = load_signer(ED25519)
+    assert signer.public_pem() == generate_after_other_worker.winner.public_pem()
+    assert signer.verify(b"block", generate_after_other_worker.winner.sign(b"block"))
+
+    private_file, public_file = signing.KEY_FILES[ED25519]
+    assert os.stat(private_file).st_mode & 0o777 == 0o600
+    assert sorted(os.listdir(tmp_path)) == sorted([private_file, public_file])
+
+
+def test_incomplete_signer_fails_at_construction():
+    class SignOnly(Signer):
+        def _sign(self, data):
+            return b""
+
+    with pytest.raises(TypeError):
+        SignOnly(Ed25519PrivateKey.generate())
+
+
+def test_mixed_chain_validates(tmp_path, monkeypatch):
+    _use_repo_rsa_key(tmp_path, monkeypatch)
+    chain_file = str(tmp_path / "chain.json")
+
+    rsa_manager = BlockchainManager(chain_file, signing_algorithm="rsa")
+    rsa_manager.append_block({"n": 1})
+
+    ed_manager = BlockchainManager(chain_file, signing_algorithm="ed25519")
+    block = ed_manager.append_block({"n": 2})
+    assert block["signature_algorithm"] == ED25519
+
+    report = ed_manager.validate_chain()
+    assert report["is_valid"], report["errors"]
+    assert [b["signature_algorithm"] for b in ed_manager.chain] == [RSA_PSS, ED25519]
+
+
+def test_legacy_rsa_block_and_algorithm_tampering(tmp_path, monkeypatch):
+    _use_repo_rsa_key(tmp_path, monkeypatch)
+    chain_file = str(tmp_path / "chain.json")
+    manager = BlockchainManager(chain_file, signing_algorithm="ed25519")
+    manager.append_block({"n": 1})
+
+    # A block in the pre-algorithm format: rsa_signature and no signature_algorithm
+    chain = manager.chain
+    legacy = {k: v for k, v in chain[0].items() if k not in ("signature", "signature_algorithm", "hash")}
+    legacy["hash"] = hashlib.sha256(json.dumps(
+        {k: v for k, v in legacy.items() if k != "is_valid"}, sort_keys=True
+    ).encode()).hexdigest()
+    legacy["rsa_signature"] = BlockchainManager(chain_file, signing_algorithm="rsa").sign_data(legacy["hash"].encode())
+    with open(chain_file, "w") as f:
+        json.dump([legacy], f)
+    manager.load_blockchain()
+    assert manager.validate_chain()["is_valid"]
+
+    # Relabelling an Ed25519 block as RSA breaks its hash
+    manager.append_block({"n": 2})
+    chain = manager.chain
+    chain[1]["signature_algorithm"] = RSA_PSS
+    with open(chain_file, "w") as f:
+        json.dump(chain, f)
+    manager.load_blockchain()
+    assert not manager.validate_chain()["is_valid"]
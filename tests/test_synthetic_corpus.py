@@ -0,0 +1,37 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../benchmarks"))
+
+import intake_extraction_agent
+import data_quality_agent
+from synthetic_corpus import ANALYTES, generate_corpus
+
+# Data quality agent names for the keys the intake agent spells differently
+MODEL_KEYS = {
+    "cholesterol": "cholesterol_total",
+    "systolic_blood_pressure": "blood_pressure_systolic",
+    "diastolic_blood_pressure": "blood_pressure_diastolic",
+}
+
+
+def test_corpus_covers_every_canonical_feature():
+    corpus = generate_corpus(400, seed=3, pdf_fraction=0.3)
+    expected = set(intake_extraction_agent.CANONICAL_FEATURES)
+    expected |= {MODEL_KEYS.get(key, key) for key in data_quality_agent.CANONICAL_FEATURES}
+
+    for kind in ("text", "pdf"):
+        reports = [r for r in corpus if r.kind == kind]
+        emitted = set().union(*(r.values for r in reports))
+        assert expected - emitted == set(), kind
+
+    abnormal = set().union(*(r.abnormal for r in corpus))
+    assert set(ANALYTES) - abnormal == set()
+
+
+def test_insulin_and_heart_rate_are_rendered():
+    report = next(r for r in generate_corpus(50, seed=1, pdf_fraction=0.0)
+                  if "insulin" in r.values and "heart_rate" in r.values and r.style == "lab_list")
+    assert "insulin" in report.text.lower()
+    assert any(label in report.text for label in ANALYTES["heart_rate"][0])
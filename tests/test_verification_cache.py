@@ -0,0 +1,105 @@
+import sys
+import os
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../server"))
+
+import verification_cache
+from verification_cache import VerificationCache
+from models import PatientReport
+from blockchain_manager import BlockchainManager
+from digital_passport import PassportManager
+from passport_token import PassportTokenSigner
+
+
+def test_ttl_lru_and_invalidation(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(verification_cache.time, "monotonic", lambda: now[0])
+    cache = VerificationCache(capacity=2, ttl_seconds=60)
+
+    cache.put("p1", "t1", {"status": "Valid"})
+    cache.put("p1", "t2", {"status": "Valid"})
+    assert cache.get("p1", "t1") == {"status": "Valid"}
+    cache.put("p2", "t1", {"status": "Valid"})  # Evicts ("p1", "t2")
+    assert cache.get("p1", "t2") is None
+
+    cache.invalidate("p1")
+    assert cache.get("p1", "t1") is None
+    assert cache.get("p2", "t1") is not None
+
+    now[0] += 61
+    assert cache.get("p2", "t1") is None
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 3
+
+
+def test_repeat_scans_hit_the_cache_until_revoked(tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    signer = PassportTokenSigner(Ed25519PrivateKey.generate())
+    cache = VerificationCache()
+    manager = PassportManager(
+        BlockchainManager(str(tmp_path / "chain.json"), signing_algorithm="ed25519"),
+        token_signer=signer, verification_cache=cache,
+    )
+
+    with Session(engine) as session:
+        reports = [PatientReport(health_score=70, triage_category="Yellow", features_json="{}", blockchain_block_index=1)
+                   for _ in range(2)]
+        session.add_all(reports)
+        session.commit()
+        first = manager.issue_passport(reports[0].id, session)
+        second = manager.issue_passport(reports[1].id, session)
+
+        for _ in range(3):
+            result = manager.verify_passport(first.passport_id, first.hmac_token, session)
+            assert result["status"] == "Valid"
+            assert result["passport"]["passport_id"] == first.passport_id
+        assert (cache.hits, cache.misses) == (2, 1)
+
+        # Failed checks are never cached
+        for _ in range(2):
+            assert manager.verify_passport(first.passport_id, "forged", session)["status"] == "Tampered"
+        assert cache.hits == 2
+
+        manager.revoke(first.passport_id, session)
+        assert manager.verify_passport(first.passport_id, first.hmac_token, session)["status"] == "Revoked"
+
+        second_id, second_token = second.passport_id, second.hmac_token
+        assert manager.verify_passport(second_id, second_token, session)["status"] == "Valid"
+
+    # Revoked by another worker: the cached result is dropped on the next scan,
+    # before this worker's revocation list has refreshed
+    other_worker = PassportManager(manager.blockchain_manager, verification_cache=VerificationCache())
+    with Session(engine) as session:
+        other_worker.revoke(second_id, session)
+    assert not signer.revocations.is_revoked(second_id)
+    with Session(engine) as session:
+        assert manager.verify_passport(second_id, second_token, session)["status"] == "Revoked"
+    assert len(cache) == 0
+
+
+def test_cached_result_checks_revocation_without_a_token_signer(tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    blockchain_manager = BlockchainManager(str(tmp_path / "chain.json"), signing_algorithm="ed25519")
+    first_worker = PassportManager(blockchain_manager, verification_cache=VerificationCache())
+    second_worker = PassportManager(blockchain_manager, verification_cache=VerificationCache())
+
+    with Session(engine) as session:
+        report = PatientReport(health_score=70, triage_category="Yellow", features_json="{}", blockchain_block_index=1)
+        session.add(report)
+        session.commit()
+        passport = first_worker.issue_passport(report.id, session)
+        passport_id, token = passport.passport_id, passport.hmac_token
+        for _ in range(2):
+            assert first_worker.verify_passport(passport_id, token, session)["status"] == "Valid"
+
+    with Session(engine) as session:
+        second_worker.revoke(passport_id, session)
+    with Session(engine) as session:
+        assert first_worker.verify_passport(passport_id, token, session)["status"] == "Revoked"